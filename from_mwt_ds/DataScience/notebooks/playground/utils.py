@@ -1,14 +1,17 @@
-from vw_executor.vw_opts import VwOpts
-from pathlib import Path
+from vw_executor.stream import Stream
 
 import pandas as pd
 import json
 
 
+def dump_example(example):
+    return json.dumps(example, separators=(",", ":"))
+
+
 def save_examples(examples, path):
     with open(path, 'w') as f:
         for ex in examples:
-            f.write(f'{json.dumps(ex, separators=(",", ":"))}\n')
+            f.write(f'{dump_example(ex)}\n')
 
 
 def load_examples(path):
@@ -17,15 +20,10 @@ def load_examples(path):
             yield json.loads(line)
 
 
-def get_simulation(folder, simulator, **kwargs):
-    path = Path(folder).joinpath(f'{str(VwOpts(kwargs)).replace(" ", "-")}.json')
-    if not path.exists():
-        Path(folder).mkdir(parents=True, exist_ok=True)
-        examples = list(simulator(**kwargs))
-        save_examples(examples, path)
-    else:
-        examples = list(load_examples(path))
-    return examples, path
+def get_simulation(simulator, **kwargs):
+    examples = list(simulator(**kwargs))
+    # stream name is derived from its content, so vw results are reused only for the same examples
+    return examples, Stream([dump_example(ex) for ex in examples])
 
 
 def cb_df(examples):
@@ -1,5 +1,4 @@
 from ipywidgets import interactive, VBox, Accordion, Layout, GridBox, fixed, HTML
-from pathlib import Path
 from vw_executor.vw import Vw
 from functools import reduce
 from playground.utils import get_simulation
@@ -29,15 +28,14 @@ def _grid_layout(elements, columns=4):
 
 
 class VwPlayground:
-    def __init__(self, simulation, visualization, vw_binary=None, cache_path='.cache'):
-        self.data_folder = Path(cache_path).joinpath('datasets').joinpath(str(hash(simulation.__code__)))
+    def __init__(self, simulation, visualization, cache_path='.cache'):
         self.simulation = simulation
         self.sim_opts = {}
         self.examples = None
-        self.examples_path = None
+        self.stream = None
         self.visualization = visualization
         self.last_job = None
-        self.vw = Vw(cache_path, vw_binary, handler=None)
+        self.vw = Vw(cache_path, handler=None)
         self.exception = None
 
     def run(self, simulator_grid, vw_grid, columns=4):
@@ -48,10 +46,9 @@ class VwPlayground:
                 self.visualization.reset()
                 if sim_opts != self.sim_opts:
                     self.sim_opts = sim_opts
-                    self.examples, self.examples_path = get_simulation(self.data_folder, self.simulation, **sim_opts)
+                    self.examples, self.stream = get_simulation(self.simulation, **sim_opts)
                 self.visualization.after_simulation(self.examples)
-                self.last_job = self.vw.train(
-                    [self.examples_path], train_opts, self.visualization.vw_outputs)
+                self.last_job = self.vw.train([self.stream], train_opts, self.visualization.vw_outputs)
                 self.visualization.after_train(self.examples, self.last_job)
             except Exception as e:
                 self.exception = e
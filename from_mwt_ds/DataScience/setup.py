@@ -23,11 +23,12 @@ setuptools.setup(
     classifiers=[
         "Intended Audience :: Science/Research",
         "License :: OSI Approved :: BSD License",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.8",
         "Operating System :: OS Independent",
         "Topic :: Scientific/Engineering"
     ],
-    install_requires = ['pandas>=1.0.0', 'tqdm>=4.0.0', 'vowpalwabbit >= 8.10.0'],
-    python_requires=">=3.6",
+    install_requires = ['numpy>=1.20.0', 'pandas>=1.0.0', 'tqdm>=4.0.0', 'vowpalwabbit >= 8.10.0'],
+    entry_points={'console_scripts': ['vw-executor=vw_executor.cli:main']},
+    python_requires=">=3.8",
     tests_require=['unittest']
 )
\ No newline at end of file
@@ -0,0 +1,3 @@
+from vw_executor.cli import main
+
+main()
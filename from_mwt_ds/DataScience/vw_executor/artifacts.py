@@ -1,7 +1,14 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Union, List, Any, Generator, Dict
+from typing import Optional, Tuple, Dict, Union, List, Any, Generator, Dict, Iterable
 import json
+import os
+import re
+import uuid
+
+from vw_executor.compression import open_text, sniff, text_reader
 
 
 def _safe_to_float(num: str, default: Optional[float]) -> Optional[float]:
@@ -33,12 +40,43 @@ def _to(value: str, types: list) -> Any:
 # metric_name = metric_value
 
 def _parse_loss(loss_str: str) -> Optional[float]:
-    if loss_str.strip()[-1] == 'h':
-        loss_str = loss_str.strip()[:-1]
-    return _safe_to_float(loss_str, None)
+    loss_str = loss_str.strip()
+    if loss_str.endswith('h'):
+        loss_str = loss_str[:-1]
+    # value is empty if the log is truncated (e.g. vw is killed while writing it)
+    return _safe_to_float(loss_str, None) if loss_str else None
+
+
+def _is_progress_header(line: str) -> bool:
+    fields = line.split()
+    return len(fields) >= 3 and fields[0] == 'loss' and fields[1] == 'last' and fields[2] == 'counter'
+
+
+def _parse_progress_row(line: str) -> Optional[Tuple[str, float, float]]:
+    counter_line = line.split()
+    try:
+        count, average_loss, since_last = counter_line[2], counter_line[0], counter_line[1]
+        return count, float(average_loss), float(since_last)
+    except (ValueError, TypeError, IndexError):
+        return None  # todo: handle
+
+
+def _parse_metric(line: str, metrics: Dict[str, Any]) -> None:
+    key_value = [p.strip() for p in line.split('=')]
+    if key_value[0] == 'average loss':
+        metrics[key_value[0]] = _parse_loss(key_value[1])
+    else:
+        metrics[key_value[0]] = _to(key_value[1], [int, float])
+
+
+def _loss_table(i: List[str], loss: List[float], since_last: List[float]) -> pd.DataFrame:
+    return pd.DataFrame({'i': i, 'loss': loss, 'since_last': since_last}).set_index('i')
 
 
 def _extract_metrics(out_lines) -> Tuple[pd.DataFrame, Dict[str, Optional[Union[str, int, float]]]]:
+    '''
+    Line by line parser, reference implementation of _parse_metrics.
+    '''
     loss_table = {'i': [], 'loss': [], 'since_last': []}
     metrics = {}
     try:
@@ -49,28 +87,222 @@ def _extract_metrics(out_lines) -> Tuple[pd.DataFrame, Dict[str, Optional[Union[
                 if line == '':
                     record = False
                 else:
-                    counter_line = line.split()
-                    try:
-                        count, average_loss, since_last = counter_line[2], counter_line[0], counter_line[1]
-                        average_loss_f = float(average_loss)
-                        since_last_f = float(since_last)
-                        loss_table['i'].append(count)
-                        loss_table['loss'].append(average_loss_f)
-                        loss_table['since_last'].append(since_last_f)
-                    except (ValueError, TypeError):
-                        ...  # todo: handle
+                    row = _parse_progress_row(line)
+                    if row is not None:
+                        loss_table['i'].append(row[0])
+                        loss_table['loss'].append(row[1])
+                        loss_table['since_last'].append(row[2])
             elif line.startswith('loss'):
-                fields = line.split()
-                if fields[0] == 'loss' and fields[1] == 'last' and fields[2] == 'counter':
+                if _is_progress_header(line):
                     record = True
             elif '=' in line:
-                key_value = [p.strip() for p in line.split('=')]
-                if key_value[0] == 'average loss':
-                    metrics[key_value[0]] = _parse_loss(key_value[1])
-                else:
-                    metrics[key_value[0]] = _to(key_value[1], [int, float])
+                _parse_metric(line, metrics)
     finally:
-        return pd.DataFrame(loss_table).set_index('i'), metrics
+        return _loss_table(loss_table['i'], loss_table['loss'], loss_table['since_last']), metrics
+
+
+# both patterns start with a literal, so they are searched fast in large logs
+_PROGRESS_HEADER = re.compile(r'loss[ \t\f\v]+last[ \t\f\v]+counter(?:[ \t\r\f\v][^\n]*)?$', re.M)
+_BLANK_LINE = re.compile(r'\n[ \t\r\f\v]*(?:\n|$)')
+_FINISHED = re.compile(r'^[ \t]*finished run[ \t\r]*$', re.M)
+_CHUNK_CHARS = 16 * 1024 ** 2
+_TAIL_BYTES = 64 * 1024
+
+
+def _split_progress(text: str) -> Tuple[List[str], List[str]]:
+    '''
+    Splits vw log into progress blocks (rows between the header and the first blank line) and the rest.
+    '''
+    blocks, rest = [], []
+    position = search = 0
+    while True:
+        header = _PROGRESS_HEADER.search(text, search)
+        if header is None:
+            rest.append(text[position:])
+            return blocks, rest
+        line_start = text.rfind('\n', 0, header.start()) + 1
+        if text[line_start:header.start()].strip():
+            search = header.end()
+            continue
+        rest.append(text[position:line_start])
+        blank = _BLANK_LINE.search(text, header.end())
+        end = blank.start() if blank is not None else len(text)
+        blocks.append(text[header.end() + 1:end])
+        position = search = end + 1
+
+
+def _chunks(text: str, size: int) -> Generator[str, None, None]:
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start + size)
+        end = len(text) if end < 0 else end + 1
+        yield text[start:end]
+        start = end
+
+
+def _substrings(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    lengths = ends - starts
+    width = int(lengths.max(initial=1))
+    windows = sliding_window_view(np.concatenate([data, np.zeros(width, np.uint8)]), width)
+    chars = windows[starts]
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return chars.view(f'S{width}').ravel()
+
+
+def _first_fields(data: bytes, n: int) -> List[np.ndarray]:
+    '''
+    First n whitespace separated fields of every line that has at least n fields, as fixed width byte strings.
+    '''
+    data = np.frombuffer(data, np.uint8)
+    edges = np.diff((data > 32).view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    newlines = np.flatnonzero(data == 10)
+    line_starts = np.r_[0, newlines + 1]
+    line_ends = np.r_[newlines, len(data)]
+    first = np.searchsorted(starts, line_starts)
+    valid = first + n - 1 < len(starts)
+    valid[valid] = starts[first[valid] + n - 1] < line_ends[valid]
+    first = first[valid]
+    return [_substrings(data, starts[first + k], ends[first + k]) for k in range(n)]
+
+
+def _to_float(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Vectorized float(): converted values and mask of values that float() accepts.
+    Holdout losses ('h' suffix) are rejected without conversion, other values are checked one by one
+    only if numpy cannot convert all of them.
+    '''
+    ok = ~np.char.endswith(values, b'h')
+    converted = np.full(len(values), np.nan)
+    try:
+        converted[ok] = values[ok].astype(float)
+    except ValueError:
+        for i in np.flatnonzero(ok):
+            parsed = _safe_to_float(values[i].decode(), None)
+            ok[i] = parsed is not None
+            converted[i] = np.nan if parsed is None else parsed
+    return converted, ok
+
+
+def _parse_progress_block(block: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Converts counter, average loss and since last columns of the progress block in vectorized passes.
+    Rows with less than 3 fields or non numeric losses (e.g. holdout losses) are skipped as in _parse_progress_row.
+    '''
+    if not block.isascii() or any(c in block for c in '\x1c\x1d\x1e\x1f'):
+        # str.split() whitespace that is not handled by the byte level tokenizer
+        rows = [r for r in map(_parse_progress_row, block.split('\n')) if r is not None]
+        return (np.array([r[0] for r in rows], dtype=str), np.array([r[1] for r in rows], dtype=float),
+                np.array([r[2] for r in rows], dtype=float))
+    parsed = [(np.array([], dtype=str), np.array([]), np.array([]))]
+    for chunk in _chunks(block, _CHUNK_CHARS):
+        average_loss, since_last, counter = _first_fields(chunk.encode(), 3)
+        (loss, loss_ok), (since, since_ok) = _to_float(average_loss), _to_float(since_last)
+        valid = loss_ok & since_ok
+        parsed.append((counter[valid].astype(str), loss[valid], since[valid]))
+    return tuple(np.concatenate([p[k] for p in parsed]) for k in range(3))
+
+
+def _parse_metrics(text: str) -> Tuple[pd.DataFrame, Dict[str, Optional[Union[str, int, float]]]]:
+    '''
+    Bulk parser of vw log with the same results as _extract_metrics:
+    progress blocks are located once and their numeric columns are converted in a vectorized pass,
+    only the rest of the lines is parsed for metrics.
+    '''
+    blocks, rest = _split_progress(text)
+    metrics = {}
+    for chunk in rest:
+        for line in chunk.split('\n'):
+            line = line.strip()
+            if not line.startswith('loss') and '=' in line:
+                _parse_metric(line, metrics)
+    if not blocks:
+        return _loss_table([], [], []), metrics
+    parsed = [_parse_progress_block(b) for b in blocks]
+    i, loss, since_last = (np.concatenate([p[k] for p in parsed]) for k in range(3))
+    if len(i) == 0:
+        return _loss_table([], [], []), metrics
+    return _loss_table(i, loss, since_last), metrics
+
+
+def _parse_final_metrics(tail: str) -> Optional[Dict[str, Optional[Union[str, int, float]]]]:
+    '''
+    Metrics printed after 'finished run' line, None if the line is not in the tail.
+    '''
+    finished = None
+    for finished in _FINISHED.finditer(tail):
+        ...
+    if finished is None:
+        return None
+    metrics = {}
+    for line in tail[finished.end():].split('\n'):
+        line = line.strip()
+        if not line.startswith('loss') and '=' in line:
+            _parse_metric(line, metrics)
+    return metrics
+
+
+def _head_rows(lines: Iterable[str], n: int) -> List[Tuple[str, float, float]]:
+    rows = []
+    record = False
+    for line in lines:
+        if len(rows) >= n:
+            break
+        line = line.strip()
+        if record:
+            if line == '':
+                record = False
+            else:
+                row = _parse_progress_row(line)
+                if row is not None:
+                    rows.append(row)
+        elif line.startswith('loss'):
+            record = _is_progress_header(line)
+    return rows
+
+
+class ProgressTail:
+    '''
+    Incremental reader of vw progress table from a file that is still being written.
+    Every read returns only rows that were appended since the previous read.
+    If the file is rewritten from the start (e.g. by the next attempt of the task), it is read from the start again.
+    '''
+    path: Path
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._position = 0
+        self._partial = ''
+        self._record = False
+
+    def read(self) -> List[Tuple[str, float, float]]:
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self._position:
+                    self._position, self._partial, self._record = 0, '', False
+                if sniff(f) is not None:
+                    # file is compressed in place once the task is finished, progress is not tailed from it
+                    return []
+                f.seek(self._position)
+                chunk = f.read().decode(errors='replace')
+                self._position = f.tell()
+        except FileNotFoundError:
+            return []
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        rows = []
+        for line in lines:
+            line = line.strip()
+            if self._record:
+                if line == '':
+                    self._record = False
+                else:
+                    row = _parse_progress_row(line)
+                    if row is not None:
+                        rows.append(row)
+            elif _is_progress_header(line):
+                self._record = True
+        return rows
 
 
 class Artifact:
@@ -81,15 +313,21 @@ class Artifact:
 
     @property
     def raw(self) -> List[str]:
-        with open(self.path, 'r') as f:
+        with open_text(self.path) as f:
             return f.readlines()
 
+    @property
+    def text(self) -> str:
+        with open_text(self.path) as f:
+            return f.read()
+
 
 class Output(Artifact):
     _processed: bool
     _loss: Optional[float]
     _loss_table: Optional[pd.DataFrame]
     _metrics: Optional[Dict[str, Any]]
+    _final_metrics: Optional[Dict[str, Any]]
 
     def __init__(self, path: Union[str, Path]):
         super().__init__(path)
@@ -97,15 +335,73 @@ class Output(Artifact):
         self._loss = None
         self._loss_table = None
         self._metrics = None
+        self._final_metrics = None
+
+    @property
+    def sidecar(self) -> Path:
+        return self.path.parent / (self.path.name + '.metrics.json')
+
+    def _load_sidecar(self) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        try:
+            with open(self.sidecar) as f:
+                content = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return pd.DataFrame(content['loss_table']).set_index('i'), content['metrics']
+
+    def save_sidecar(self) -> None:
+        '''
+        Saves parsed loss table and metrics next to the stdout, so they are not parsed again by other sessions.
+        '''
+        if not self._processed:
+            self._process()
+        temp = self.sidecar.parent / f'{self.sidecar.name}.{uuid.uuid4().hex}.pending'
+        with open(temp, 'w') as f:
+            json.dump({'loss_table': self._loss_table.reset_index().to_dict('list'), 'metrics': self._metrics}, f)
+        os.replace(temp, self.sidecar)
 
     def _process(self) -> None:
         self._processed = True
-        self._loss_table, self._metrics = _extract_metrics(self.raw)
+        parsed = self._load_sidecar()
+        self._loss_table, self._metrics = parsed if parsed is not None else _parse_metrics(self.text)
         if 'average loss' in self._metrics:
             self._loss = self._metrics['average loss']
 
+    def _tail(self) -> Tuple[str, bool]:
+        with open(self.path, 'rb') as f:
+            if sniff(f) is not None:
+                with text_reader(f) as text:
+                    return text.read(), True
+            start = max(0, os.fstat(f.fileno()).st_size - _TAIL_BYTES)
+            f.seek(start)
+            return f.read().decode(errors='replace'), start == 0
+
+    @property
+    def final_metrics(self) -> Optional[Dict[str, Any]]:
+        '''
+        Metrics printed after the end of the run, None if the run is not finished.
+        Only the tail of the file is parsed.
+        '''
+        if self._final_metrics is None:
+            tail, whole = self._tail()
+            final = _parse_final_metrics(tail)
+            self._final_metrics = final if final is not None or whole else _parse_final_metrics(self.text)
+        return self._final_metrics
+
+    def loss_table_head(self, n: int) -> pd.DataFrame:
+        '''
+        First n rows of the loss table, file is read only until they are found.
+        '''
+        if self._processed:
+            return self._loss_table.head(n)
+        with open_text(self.path) as f:
+            rows = _head_rows(f, n)
+        return _loss_table([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+
     @property
     def loss(self) -> Optional[float]:
+        if not self._processed and not self.sidecar.exists() and 'average loss' in (self.final_metrics or {}):
+            return self.final_metrics['average loss']
         if not self._processed:
             self._process()
         return self._loss
@@ -129,7 +425,7 @@ class Predictions(Artifact):
 
     @property
     def cb(self) -> Generator[Dict, None, None]:
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             for line in f:
                 line = line.strip()
                 if len(line) == 0:
@@ -141,7 +437,7 @@ class Predictions(Artifact):
     def ccb_slot(self) -> Generator[Dict, None, None]:
         session = 0
         slot = 0
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             for line in f:
                 line = line.strip()
                 if len(line) == 0:
@@ -158,13 +454,13 @@ class Predictions(Artifact):
 
     @property
     def scalar(self) -> Generator[Dict, None, None]:
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             for line in f:
                 yield {'y': _safe_to_float(line.strip(), None)}
 
     @property
     def cats(self) -> Generator[Dict, None, None]:
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             for line in f:
                 line = line.strip()
                 if len(line) == 0:
@@ -241,7 +537,7 @@ class Model(Artifact):
     def weights(self) -> pd.DataFrame:
         def flatten_terms(terms):
             return "*".join([f"{term['namespace']}^{term['name']}" for term in terms]) if terms else None
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             weight_rows = json.load(f)["weights"]
         return pd.DataFrame([dict({
             "name": flatten_terms(x.get("terms", None)),
@@ -0,0 +1,102 @@
+import argparse
+import json
+import multiprocessing
+import time
+
+from typing import Dict, List, Optional
+
+
+def _worker(args: argparse.Namespace) -> None:
+    from vw_executor.vw import serve_queue
+    completed = serve_queue(args.cache, args.vw, args.lease, args.poll_interval, args.max_idle, args.max_tasks)
+    print(f'{completed} tasks are completed')
+
+
+def _daemon(args: argparse.Namespace) -> None:
+    from vw_executor.daemon import Daemon
+    Daemon(args.cache, args.vw, args.procs, args.socket, args.worker_max_tasks).serve_forever()
+
+
+def _stats(args: argparse.Namespace) -> None:
+    from vw_executor.daemon import call, default_socket
+    print(json.dumps(call(args.socket or default_socket(args.cache), {'type': 'stats'}), indent=2))
+
+
+def _budget(value: str) -> Dict[Optional[str], int]:
+    from vw_executor.eviction import parse_size
+    output, size = value.split('=')
+    output = None if output == 'stdout' else f'-{output}' if len(output) == 1 else f'--{output}'
+    return {output: parse_size(size)}
+
+
+def _gc(args: argparse.Namespace) -> None:
+    from vw_executor.eviction import collect
+    from vw_executor.vw_cache import VwCache
+    cache = VwCache(args.cache)
+    budgets = {k: v for b in args.budget for k, v in b.items()}
+    while True:
+        deleted = collect(cache, budgets, args.max_deletes, args.grace)
+        print(f'{len(deleted)} artifacts are evicted')
+        if args.watch is None:
+            break
+        if args.max_deletes is None or len(deleted) < args.max_deletes:
+            time.sleep(args.watch)
+
+
+def _trace(args: argparse.Namespace) -> None:
+    from vw_executor.trace import to_chrome
+    to_chrome(args.source, args.target)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='vw-executor')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker = commands.add_parser('worker', help='Execute tasks from the work queue of the cache folder')
+    worker.add_argument('cache', help='Path to the vw cache folder')
+    worker.add_argument('--vw', default=None, help='Path to vw binary. pyvw is used if not provided')
+    worker.add_argument('--lease', type=float, default=60, help='Seconds after which claims of dead workers expire')
+    worker.add_argument('--poll_interval', type=float, default=1, help='Seconds between polls of empty queue')
+    worker.add_argument('--max_idle', type=float, default=None, help='Exit after this many seconds without tasks')
+    worker.add_argument('--max_tasks', type=int, default=None, help='Exit after this many tasks')
+    worker.set_defaults(func=_worker)
+
+    daemon = commands.add_parser('daemon', help='Execute tasks submitted by Vw(daemon=True) clients')
+    daemon.add_argument('cache', help='Path to the vw cache folder')
+    daemon.add_argument('--vw', default=None, help='Path to vw binary. pyvw is used if not provided')
+    daemon.add_argument('--procs', type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                        help='Number of concurrently running tasks')
+    daemon.add_argument('--socket', default=None, help='Path to unix socket. daemon.sock in the cache by default')
+    daemon.add_argument('--worker_max_tasks', type=int, default=1000, help='Restart pyvw workers after this many tasks')
+    daemon.set_defaults(func=_daemon)
+
+    stats = commands.add_parser('stats', help='Print counters of the running daemon')
+    stats.add_argument('cache', help='Path to the vw cache folder')
+    stats.add_argument('--socket', default=None, help='Path to unix socket. daemon.sock in the cache by default')
+    stats.set_defaults(func=_stats)
+
+    gc = commands.add_parser('gc', help='Evict least recently used artifacts of the cache folder')
+    gc.add_argument('cache', help='Path to the vw cache folder')
+    gc.add_argument('--budget', type=_budget, action='append', required=True,
+                    help='Budget of artifact type, e.g. f=20G, p=5G, cache_file=50G, stdout=1G')
+    gc.add_argument('--max_deletes', type=int, default=None, help='Evict at most this many artifacts per pass')
+    gc.add_argument('--grace', type=float, default=60, help='Keep artifacts used less than this many seconds ago')
+    gc.add_argument('--watch', type=float, default=None, help='Repeat passes with this many seconds between them')
+    gc.set_defaults(func=_gc)
+
+    trace = commands.add_parser('trace', help='Convert JSONL execution trace to Chrome trace event format')
+    trace.add_argument('source', help='Path to JSONL trace written by Vw(trace=...)')
+    trace.add_argument('target', help='Path to Chrome trace json')
+    trace.set_defaults(func=_trace)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parser().parse_args(argv)
+    # pyvw workers are started from multithreaded process
+    multiprocessing.set_start_method('spawn', force=True)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
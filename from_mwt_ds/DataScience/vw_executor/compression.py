@@ -0,0 +1,98 @@
+import gzip
+import io
+import lzma
+import os
+import shutil
+from pathlib import Path
+
+from typing import IO, Optional, Union
+
+_OPENERS = {
+    'gzip': gzip.open,
+    'xz': lzma.open,
+}
+
+_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\xfd7zXZ\x00': 'xz',
+}
+
+
+class _TextReader(io.TextIOWrapper):
+    '''
+    Text reader that also closes the file it was opened from, since decompressors leave passed file objects open.
+    '''
+    def __init__(self, buffer: IO[bytes], source: IO[bytes]):
+        super().__init__(buffer)
+        self._source = source
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._source.close()
+
+
+def sniff(f: IO[bytes]) -> Optional[str]:
+    '''
+    Detects compression of binary file object from its first bytes, file position is restored.
+    '''
+    position = f.tell()
+    head = f.read(6)
+    f.seek(position)
+    return next((method for magic, method in _MAGIC.items() if head.startswith(magic)), None)
+
+
+def detect(path: Union[str, Path]) -> Optional[str]:
+    with open(path, 'rb') as f:
+        return sniff(f)
+
+
+def text_reader(f: IO[bytes]) -> IO[str]:
+    '''
+    Wraps binary file object into text reader, gzip and xz compressed content is decompressed on the fly.
+    Reader owns the file object and closes it.
+    '''
+    method = sniff(f)
+    if method == 'gzip':
+        return _TextReader(gzip.GzipFile(fileobj=f, mode='rb'), f)
+    if method == 'xz':
+        return _TextReader(lzma.LZMAFile(f), f)
+    return io.TextIOWrapper(f)
+
+
+def open_text(path: Union[str, Path]) -> IO[str]:
+    '''
+    Opens text file for reading, gzip and xz compressed files are decompressed on the fly.
+    File is opened only once, so it is read consistently even if it is compressed in place meanwhile.
+    '''
+    f = open(path, 'rb')
+    try:
+        return text_reader(f)
+    except BaseException:
+        f.close()
+        raise
+
+
+def compress(path: Union[str, Path], method: str = 'gzip') -> bool:
+    '''
+    Compresses file in place, so it keeps its name. File is left as is if it is already compressed,
+    or if it was changed or removed while it was being compressed. Returns True if file is compressed.
+    '''
+    path = Path(path)
+    temp = path.parent / f'{path.name}.{method}.pending'
+    try:
+        if detect(path) is not None:
+            return False
+        before = os.stat(path)
+        with open(path, 'rb') as source, _OPENERS[method](temp, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        after = os.stat(path)
+        if (before.st_mtime_ns, before.st_size, before.st_ino) == (after.st_mtime_ns, after.st_size, after.st_ino):
+            os.replace(temp, path)
+            return True
+    except FileNotFoundError:
+        ...
+    if temp.exists():
+        temp.unlink()
+    return False
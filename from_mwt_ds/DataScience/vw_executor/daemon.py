@@ -0,0 +1,269 @@
+import json
+import multiprocessing
+import os
+import select
+import socket
+import socketserver
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from threading import Condition, Event, Lock, Thread
+
+from vw_executor.vw import _VwCore, _VwBin, _VwPy, _run_descriptor, _cancel_descriptor, _remote_result, Monitor
+
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Union
+
+
+def default_socket(cache_path: Union[str, Path]) -> Path:
+    return Path(cache_path).joinpath('daemon.sock')
+
+
+def call(socket_path: Union[str, Path], message: Dict[str, Any]) -> Dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(socket_path))
+        with s.makefile('rw') as f:
+            f.write(json.dumps(message) + '\n')
+            f.flush()
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f'Daemon at {socket_path} closed connection')
+    return json.loads(line)
+
+
+class _Request:
+    def __init__(self, client: str, descriptor: Dict[str, Any]):
+        self.client = client
+        self.descriptor = descriptor
+        self.result = None
+        self.cancelled = False
+        self.done = Event()
+
+
+class Daemon:
+    '''
+    Executor daemon: owns the cache folder and a pool of warm vw workers and executes tasks submitted
+    by Vw(daemon=...) clients over a unix socket. Clients are served round robin, so a large grid of one client
+    does not block small requests of others.
+    '''
+    socket_path: Path
+    procs: int
+    core: _VwCore
+
+    def __init__(self,
+                 cache_path: Union[str, Path],
+                 path: Optional[Union[str, Path]] = None,
+                 procs: int = max(1, multiprocessing.cpu_count() // 2),
+                 socket_path: Optional[Union[str, Path]] = None,
+                 worker_max_tasks: Optional[int] = 1000):
+        self.socket_path = Path(socket_path) if socket_path is not None else default_socket(cache_path)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.procs = procs
+        self.core = _VwBin(path) if path is not None else _VwPy(procs, worker_max_tasks)
+        self._name = f'{socket.gethostname()}:{os.getpid()}'
+        self._condition = Condition()
+        self._pending: Dict[str, Deque[_Request]] = {}
+        self._running: Set[_Request] = set()
+        self._completed = 0
+        self._failed = 0
+        self._recent: Deque[float] = deque()
+        self._started = time.monotonic()
+        self._closed = False
+        self._server = None
+        self._threads: List[Thread] = []
+
+    def _next(self) -> Optional[_Request]:
+        while self._pending:
+            client = next(iter(self._pending))
+            requests = self._pending.pop(client)
+            request = requests.popleft()
+            if requests:
+                self._pending[client] = requests
+            if not request.cancelled:
+                return request
+        return None
+
+    def submit(self, client: str, descriptor: Dict[str, Any]) -> _Request:
+        request = _Request(client, descriptor)
+        with self._condition:
+            self._pending.setdefault(client, deque()).append(request)
+            self._condition.notify()
+        return request
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._condition:
+                request = None
+                while not self._closed and request is None:
+                    request = self._next()
+                    if request is None:
+                        self._condition.wait()
+                if request is None:
+                    return
+                self._running.add(request)
+            try:
+                result = _run_descriptor(self.core, request.descriptor)
+            except Exception as e:
+                result = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+            request.result = dict(result, worker=self._name)
+            with self._condition:
+                self._running.discard(request)
+                self._completed += 1
+                self._failed += result['status'] != 'ok'
+                self._recent.append(time.monotonic())
+            request.done.set()
+
+    def _cancel(self, request: _Request) -> None:
+        '''
+        Withdraws pending request or kills the running one, result of the request is stopped.
+        '''
+        with self._condition:
+            if request.done.is_set():
+                return
+            request.cancelled = True
+            running = request in self._running
+            if not running:
+                request.result = {'status': 'stopped', 'reason': 'Cancelled', 'worker': self._name}
+                request.done.set()
+        if running:
+            _cancel_descriptor(self.core, request.descriptor)
+
+    def cancel(self, client: str, out_paths: Iterable[str]) -> int:
+        '''
+        Cancels requests of the client for the given out paths. Returns number of cancelled requests.
+        '''
+        out_paths = set(out_paths)
+        with self._condition:
+            requests = [r for r in [*self._pending.get(client, ()), *self._running]
+                        if r.client == client and r.descriptor['out_path'] in out_paths]
+        for request in requests:
+            self._cancel(request)
+        return len(requests)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            now = time.monotonic()
+            while self._recent and self._recent[0] < now - 60:
+                self._recent.popleft()
+            uptime = now - self._started
+            return {
+                'procs': self.procs,
+                'waiting_clients': len(self._pending),
+                'queued': sum(len(r) for r in self._pending.values()),
+                'running': len(self._running),
+                'completed': self._completed,
+                'failed': self._failed,
+                'uptime_s': uptime,
+                'throughput_per_s': self._completed / uptime if uptime > 0 else 0,
+                'throughput_last_min_per_s': len(self._recent) / min(60, uptime) if uptime > 0 else 0}
+
+    def _handle(self, connection: socket.socket) -> None:
+        with connection.makefile('rw') as f:
+            line = f.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if message['type'] == 'stats':
+                response = self.stats()
+            elif message['type'] == 'run':
+                request = self.submit(message['client'], message['descriptor'])
+                while not request.done.wait(0.5):
+                    if _is_closed(connection):
+                        self._cancel(request)
+                        return
+                response = request.result
+            elif message['type'] == 'cancel':
+                response = {'cancelled': self.cancel(message['client'], message['out_paths'])}
+            else:
+                response = {'status': 'error', 'error': f'Unknown message type: {message["type"]}', 'worker': self._name}
+            f.write(json.dumps(response) + '\n')
+            f.flush()
+
+    def start(self) -> 'Daemon':
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon._handle(self.request)
+
+        if isinstance(self.core, _VwPy):
+            self.core.workers.warm()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self._server.daemon_threads = True
+        self._threads = [Thread(target=self._dispatch, daemon=True) for _ in range(self.procs)]
+        self._threads.append(Thread(target=self._server.serve_forever, daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for t in self._threads:
+            t.join()
+        self.core.close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+    def __enter__(self) -> 'Daemon':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def _is_closed(connection: socket.socket) -> bool:
+    readable, _, _ = select.select([connection], [], [], 0)
+    return bool(readable) and connection.recv(1, socket.MSG_PEEK) == b''
+
+
+class _VwDaemon(_VwCore):
+    '''
+    Thin client of the executor daemon: tasks are executed by the daemon, results are written to its cache.
+    '''
+    socket_path: Path
+    client: str
+
+    def __init__(self, socket_path: Path):
+        super().__init__(None)
+        self.socket_path = socket_path
+        self.client = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._running: List[Path] = []
+        self._lock = Lock()
+
+    def run(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        with self._lock:
+            self._running.append(out_path)
+        try:
+            result = call(self.socket_path, {
+                'type': 'run',
+                'client': self.client,
+                'descriptor': {'args': args, 'out_path': str(out_path), 'cwd': os.getcwd(), 'timeout': timeout}})
+        finally:
+            with self._lock:
+                self._running.remove(out_path)
+        return _remote_result(result, timeout)
+
+    def kill(self, out_paths: Optional[Iterable[Path]] = None) -> None:
+        with self._lock:
+            running = set(self._running) if out_paths is None else set(out_paths) & set(self._running)
+        if running:
+            call(self.socket_path, {'type': 'cancel', 'client': self.client, 'out_paths': [str(p) for p in running]})
+
+    def stats(self) -> Dict[str, Any]:
+        return call(self.socket_path, {'type': 'stats'})
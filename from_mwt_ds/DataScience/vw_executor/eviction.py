@@ -0,0 +1,145 @@
+import os
+import socket
+import time
+from pathlib import Path
+from threading import Event, Thread
+
+from vw_executor.index import _transaction
+from vw_executor.vw_cache import VwCache
+
+from typing import Dict, List, Optional
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(size: str) -> int:
+    '''
+    Parses sizes like 500M or 20G.
+    '''
+    size = size.strip().upper().rstrip('B')
+    unit = size[-1] if size and size[-1] in _UNITS else ''
+    return int(float(size[:len(size) - len(unit)]) * _UNITS[unit])
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        ...
+    return True
+
+
+def _scan(folder: Path) -> Dict[str, List]:
+    '''
+    Artifacts of the folder: base name -> [size, last modification, files].
+    Artifacts that are being written (.pending files) are skipped.
+    '''
+    result = {}
+    pending = set()
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            base = entry.name.split('.')[0]
+            if entry.name.endswith('.pending'):
+                pending.add(base)
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            artifact = result.setdefault(base, [0, 0, []])
+            artifact[0] += stat.st_size
+            artifact[1] = max(artifact[1], stat.st_mtime)
+            artifact[2].append(Path(entry.path))
+    return {k: v for k, v in result.items() if k not in pending}
+
+
+def collect(cache: VwCache,
+            budgets: Dict[Optional[str], int],
+            max_deletes: Optional[int] = None,
+            grace: float = 60) -> List[str]:
+    '''
+    Evicts least recently used artifacts until every artifact type fits its budget in bytes.
+    budgets are keyed by vw output option ('-f', '-p', '--cache_file', None for stdout).
+    Pinned artifacts, artifacts leased by in-flight tasks and artifacts used less than grace seconds ago are kept.
+    At most max_deletes artifacts are deleted per call. Returns deleted artifacts (paths relative to the cache).
+    Cache folder should be opened with eviction enabled before tasks are run on it, otherwise they hold no leases.
+    '''
+    if not cache.evictable:
+        raise ValueError(f'Eviction is not enabled for {cache.path}, open it with eviction=True before running tasks')
+    index = cache.index
+    connection = index._connect()
+    deleted = []
+    for output, budget in budgets.items():
+        context = f'cache{output}'
+        folder = cache.path.joinpath(context)
+        if not folder.exists():
+            continue
+        artifacts = _scan(folder)
+        total = sum(a[0] for a in artifacts.values())
+        if total <= budget:
+            continue
+        accessed = dict(connection.execute('SELECT path, accessed_at FROM access WHERE path LIKE ?',
+                                           (f'{context}/%',)).fetchall())
+        now = time.time()
+        candidates = sorted(((max(accessed.get(f'{context}/{base}', 0), a[1]), base) for base, a in artifacts.items()))
+        with _transaction(connection):
+            host = socket.gethostname()
+            stale = [pid for (pid,) in connection.execute('SELECT DISTINCT pid FROM leases WHERE host = ?', (host,))
+                     if not _alive(pid)]
+            connection.executemany('DELETE FROM leases WHERE pid = ? AND host = ?', [(pid, host) for pid in stale])
+            protected = {p for (p,) in connection.execute('SELECT path FROM leases UNION SELECT path FROM pins')}
+            for last_access, base in candidates:
+                if total <= budget or (max_deletes is not None and len(deleted) >= max_deletes):
+                    break
+                path = f'{context}/{base}'
+                if path in protected or last_access > now - grace:
+                    continue
+                for f in artifacts[base][2]:
+                    try:
+                        f.unlink()
+                    except FileNotFoundError:
+                        ...
+                connection.execute('DELETE FROM access WHERE path = ?', (path,))
+                total -= artifacts[base][0]
+                deleted.append(path)
+        if max_deletes is not None and len(deleted) >= max_deletes:
+            break
+    return deleted
+
+
+class Collector:
+    '''
+    Background thread that runs incremental collect every interval seconds.
+    '''
+    def __init__(self,
+                 cache: VwCache,
+                 budgets: Dict[Optional[str], int],
+                 interval: float = 60,
+                 max_deletes: Optional[int] = 1000,
+                 grace: float = 60):
+        self.cache = cache
+        self.budgets = budgets
+        self.interval = interval
+        self.max_deletes = max_deletes
+        self.grace = grace
+        self.deleted = 0
+        self._stop = Event()
+        self._thread = Thread(target=self._loop, daemon=True)
+
+    def _loop(self) -> None:
+        while True:
+            deleted = collect(self.cache, self.budgets, self.max_deletes, self.grace)
+            self.deleted += len(deleted)
+            # continue immediately while there is a backlog of artifacts to evict
+            if self._stop.wait(0 if self.max_deletes and len(deleted) >= self.max_deletes else self.interval):
+                return
+
+    def start(self) -> 'Collector':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
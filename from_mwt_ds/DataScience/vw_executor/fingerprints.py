@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CHUNK = 1024 ** 2
+
+
+def fingerprint(path: Path) -> str:
+    '''
+    Content hash of the file computed in streaming chunks.
+    '''
+    result = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            result.update(chunk)
+    return result.hexdigest()
+
+
+def _stat_key(path: Path) -> Tuple[int, int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class Fingerprints:
+    '''
+    Persistent memo of file fingerprints keyed by (path, size, mtime, inode):
+    file is hashed once, and only stat-checked afterwards until it is changed.
+    '''
+    path: Path
+    procs: int
+
+    def __init__(self, path: Path, procs: int = 4):
+        self.path = Path(path)
+        self.procs = procs
+        self._memo: Optional[Dict[str, List]] = None
+        self._lock = Lock()
+
+    def _load(self) -> Dict[str, List]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _lookup(self, path: Path) -> Tuple[str, Tuple[int, int, int], Optional[str]]:
+        key = str(path.resolve())
+        stat = _stat_key(path)
+        with self._lock:
+            if self._memo is None:
+                self._memo = self._load()
+            entry = self._memo.get(key)
+        digest = entry[3] if entry is not None and tuple(entry[:3]) == stat else None
+        return key, stat, digest
+
+    def _save(self, computed: Dict[str, List]) -> None:
+        with self._lock:
+            self._memo = {**self._load(), **self._memo, **computed}
+            temp = self.path.parent / f'.{self.path.name}.{uuid.uuid4().hex}'
+            with open(temp, 'w') as f:
+                json.dump(self._memo, f)
+            os.replace(temp, self.path)
+
+    def get(self, path: Path) -> str:
+        key, stat, digest = self._lookup(path)
+        if digest is None:
+            digest = fingerprint(path)
+            self._save({key: [*stat, digest]})
+        return digest
+
+    def prefetch(self, paths: Iterable[Path]) -> None:
+        '''
+        Hashes files that are not in the memo yet in parallel.
+        '''
+        missing = {}
+        for path in paths:
+            key, stat, digest = self._lookup(Path(path))
+            if digest is None:
+                missing[key] = (Path(path), stat)
+        if not missing:
+            return
+        with ThreadPoolExecutor(min(self.procs, len(missing))) as executor:
+            digests = executor.map(fingerprint, [p for p, _ in missing.values()])
+            computed = {key: [*stat, digest] for (key, (_, stat)), digest in zip(missing.items(), digests)}
+        self._save(computed)
@@ -23,6 +23,14 @@ class HandlerBase:
     def on_task_finish(self, job, task_idx):
         ...
 
+    def on_task_progress(self, job, task_idx, rows):
+        '''
+        Called from the progress monitor thread with progress rows (example counter, average loss, since last)
+        appended to the log of the running task since the previous call.
+        Live only for the vw binary, tasks of in-process pyvw report all rows once they are finished.
+        '''
+        ...
+
 class SymLinkResult(HandlerBase):
     def __init__(self, base_dir: Optional[Union[str, Path]] = None):
         self.base_dir = Path(base_dir) if base_dir else Path.cwd() / "_results"
@@ -69,6 +77,11 @@ class ProgressBars(HandlerBase):
             self.jobs[job.name].update(1)
             self.jobs[job.name].refresh()
 
+    def on_task_progress(self, job, _task_idx, rows):
+        if self.verbose and job.name in self.jobs:
+            i, loss, _ = rows[-1]
+            self.jobs[job.name].set_postfix(examples=i, loss=loss)
+
 
 class ArtifactCopy(HandlerBase):
     def __init__(self, path, stdout_copy=True, outputs=None, reset=True):
@@ -149,3 +162,7 @@ class MultiHandler(HandlerBase):
     def on_task_finish(self, job, task_idx):
         for h in self.handlers:
             h.on_task_finish(job, task_idx)
+
+    def on_task_progress(self, job, task_idx, rows):
+        for h in self.handlers:
+            h.on_task_progress(job, task_idx, rows)
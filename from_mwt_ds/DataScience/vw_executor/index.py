@@ -0,0 +1,188 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from threading import local
+
+import pandas as pd
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    key TEXT PRIMARY KEY,
+    opts TEXT NOT NULL,
+    opts_hash TEXT NOT NULL,
+    input TEXT,
+    fingerprint TEXT,
+    status TEXT NOT NULL,
+    runtime_s REAL,
+    loss REAL,
+    metrics TEXT,
+    artifacts TEXT,
+    finished_at REAL NOT NULL,
+    resource_usage TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_opts_hash ON runs (opts_hash);
+CREATE INDEX IF NOT EXISTS runs_fingerprint ON runs (fingerprint);
+CREATE INDEX IF NOT EXISTS runs_status_loss ON runs (status, loss);
+CREATE TABLE IF NOT EXISTS access (
+    path TEXT PRIMARY KEY,
+    accessed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pins (
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (name, path)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_path ON leases (path);
+'''
+
+_COLUMNS = ['key', 'opts', 'opts_hash', 'input', 'fingerprint', 'status', 'runtime_s', 'loss', 'metrics',
+            'artifacts', 'finished_at', 'resource_usage']
+
+
+class RunIndex:
+    '''
+    SQLite index of completed tasks in the cache: one row per stdout file with canonical opts, input fingerprint,
+    artifact paths and sizes, status, runtime, final loss, metrics and resource usage (json).
+    It also keeps access times, pins and leases of in-flight tasks for cache artifacts (paths relative to the cache).
+    Every thread uses its own connection, database is in WAL mode, so it can be written by several threads
+    and processes at once.
+    '''
+    path: Path
+
+    def __init__(self, path: Path, timeout: float = 60):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = local()
+        self._connect()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'path': self.path, 'timeout': self.timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = local()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            _migrate(connection)
+            self._local.connection = connection
+        return connection
+
+    def record(self,
+               key: str,
+               opts: str,
+               opts_hash: str,
+               input: Optional[str],
+               fingerprint: Optional[str],
+               status: str,
+               runtime_s: Optional[float],
+               loss: Optional[float],
+               metrics: Optional[Dict[str, Any]],
+               artifacts: Dict[str, Tuple[str, Optional[int]]],
+               replace: bool = True,
+               resource_usage: Optional[Dict[str, Any]] = None) -> None:
+        row = (key, opts, opts_hash, input, fingerprint, status, runtime_s, loss,
+               json.dumps(metrics, default=str) if metrics is not None else None,
+               json.dumps(artifacts), time.time(), json.dumps(resource_usage) if resource_usage else None)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        self._connect().execute(f'{verb} INTO runs ({", ".join(_COLUMNS)}) VALUES ({", ".join("?" * len(_COLUMNS))})',
+                                row)
+
+    def status(self, key: str) -> Optional[str]:
+        row = self._connect().execute('SELECT status FROM runs WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def run(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        '''
+        Status and resource usage of the recorded run.
+        '''
+        row = self._connect().execute('SELECT status, resource_usage FROM runs WHERE key = ?', (key,)).fetchone()
+        return (row[0], json.loads(row[1]) if row[1] else {}) if row else None
+
+    def resource_usage(self, limit: int = 1000) -> List[Tuple[str, Dict[str, Any]]]:
+        '''
+        Opts and resource usage of the most recently finished runs, oldest first.
+        '''
+        rows = self._connect().execute('SELECT opts, resource_usage FROM runs WHERE resource_usage IS NOT NULL '
+                                       'ORDER BY finished_at DESC LIMIT ?', (limit,)).fetchall()
+        return [(opts, json.loads(usage)) for opts, usage in reversed(rows)]
+
+    def query(self, where: Optional[str] = None, params: Iterable[Any] = (), **equals: Any) -> pd.DataFrame:
+        '''
+        Rows of the index as a DataFrame. where is a sql condition with ? placeholders for params,
+        keyword arguments are added as equality conditions, e.g. query('loss < ?', [0.5], status='Success').
+        '''
+        conditions = [f'({where})'] if where else []
+        conditions += [f'{column} = ?' for column in equals]
+        sql = 'SELECT * FROM runs' + (f' WHERE {" AND ".join(conditions)}' if conditions else '')
+        return pd.read_sql_query(sql, self._connect(), params=[*params, *equals.values()])
+
+    def touch(self, paths: Iterable[str]) -> None:
+        now = time.time()
+        self._connect().executemany('INSERT OR REPLACE INTO access (path, accessed_at) VALUES (?, ?)',
+                                    [(p, now) for p in paths])
+
+    def lease(self, paths: Iterable[str]) -> str:
+        '''
+        Protects paths from eviction until release(lease) or death of the current process.
+        '''
+        paths = list(paths)
+        lease = uuid.uuid4().hex
+        host, pid, now = socket.gethostname(), os.getpid(), time.time()
+        connection = self._connect()
+        with _transaction(connection):
+            connection.executemany('INSERT INTO leases (id, path, host, pid) VALUES (?, ?, ?, ?)',
+                                   [(lease, p, host, pid) for p in paths])
+            connection.executemany('INSERT OR REPLACE INTO access (path, accessed_at) VALUES (?, ?)',
+                                   [(p, now) for p in paths])
+        return lease
+
+    def release(self, lease: str) -> None:
+        self._connect().execute('DELETE FROM leases WHERE id = ?', (lease,))
+
+    def pin(self, name: str, paths: Iterable[str]) -> None:
+        self._connect().executemany('INSERT OR IGNORE INTO pins (name, path) VALUES (?, ?)',
+                                    [(name, p) for p in paths])
+
+    def unpin(self, name: str) -> None:
+        self._connect().execute('DELETE FROM pins WHERE name = ?', (name,))
+
+
+def _migrate(connection: sqlite3.Connection) -> None:
+    columns = {row[1] for row in connection.execute('PRAGMA table_info(runs)')}
+    for column in _COLUMNS:
+        if column not in columns:
+            try:
+                connection.execute(f'ALTER TABLE runs ADD COLUMN {column} TEXT')
+            except sqlite3.OperationalError:
+                # column is added by another connection
+                ...
+
+
+@contextmanager
+def _transaction(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
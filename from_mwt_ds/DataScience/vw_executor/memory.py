@@ -0,0 +1,139 @@
+import argparse
+import math
+from collections import deque
+from threading import Lock
+
+from vw_executor.vw_opts import VwOpts, VwOptsLike
+
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+_MB = 1024 ** 2
+
+# options that multiply number of weights: name -> extra models on top of the value
+_WEIGHTS_PER_PROBLEM = {
+    '--oaa': 0,
+    '--ect': 0,
+    '--csoaa': 0,
+    '--cover': 1,
+    '--bag': 0,
+    '--boosting': 0,
+    '--nn': 1,
+}
+
+# floats per weight for optimizer state
+_STRIDE = {
+    '--sgd': 1,
+    '--ftrl': 4,
+    '--pistol': 4,
+    '--coin': 8,
+}
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('-b', '--bit_precision', type=int, default=18)
+    parser.add_argument('-q', '--quadratic', action='append', default=[])
+    parser.add_argument('--cubic', action='append', default=[])
+    parser.add_argument('--interactions', action='append', default=[])
+    for o in _WEIGHTS_PER_PROBLEM:
+        parser.add_argument(o, type=int)
+    for o in _STRIDE:
+        parser.add_argument(o, action='store_true')
+    return parser
+
+
+class MemoryEstimator:
+    '''
+    Estimates peak resident memory of vw process from bit precision and reduction stack.
+    Estimate is corrected by memory measured for recent runs of the same shape
+    (same bit precision, reductions and number of interactions): the quantile of ratios of measured memory
+    to the base estimate over the last window runs, so single outliers and old runs stop inflating it.
+    '''
+    overhead: int
+    quantile: float
+    window: int
+    _history: Dict[Tuple, Deque[float]]
+
+    def __init__(self, overhead: int = 64 * _MB, quantile: float = 0.9, window: int = 20):
+        self.overhead = overhead
+        self.quantile = quantile
+        self.window = window
+        self._parser = _parser()
+        self._history = {}
+        self._lock = Lock()
+
+    def _parse(self, opts: VwOptsLike) -> Tuple[argparse.Namespace, Tuple]:
+        tokens = str(VwOpts(opts)).split()
+        namespace, _ = self._parser.parse_known_args(tokens)
+        reductions = tuple(sorted(t for t in tokens if t.startswith('--') and t not in ('--quadratic', '--cubic',
+                                                                                       '--interactions')))
+        interactions = len(namespace.quadratic) + len(namespace.cubic) + len(namespace.interactions)
+        return namespace, (namespace.bit_precision, reductions, interactions)
+
+    def _base(self, namespace: argparse.Namespace) -> int:
+        wpp = 1
+        for o, extra in _WEIGHTS_PER_PROBLEM.items():
+            value = getattr(namespace, o.lstrip('-'))
+            if value:
+                wpp *= value + extra
+        stride = next((s for o, s in _STRIDE.items() if getattr(namespace, o.lstrip('-'))), 4)
+        per_weight = 2 ** math.ceil(math.log2(wpp * stride))
+        return 2 ** namespace.bit_precision * per_weight * 4 + self.overhead
+
+    def _ratio(self, shape: Tuple) -> Optional[float]:
+        ratios = sorted(self._history.get(shape, ()))
+        if not ratios:
+            return None
+        # nearest rank, so it is the maximum until there are enough observations
+        return ratios[min(len(ratios) - 1, max(0, math.ceil(self.quantile * len(ratios)) - 1))]
+
+    def estimate(self, opts: VwOptsLike) -> int:
+        namespace, shape = self._parse(opts)
+        base = self._base(namespace)
+        with self._lock:
+            ratio = self._ratio(shape)
+        return int(base * ratio) if ratio is not None else base
+
+    def observe(self, opts: VwOptsLike, max_rss: Optional[int]) -> None:
+        if not max_rss:
+            return
+        namespace, shape = self._parse(opts)
+        ratio = max_rss / self._base(namespace)
+        with self._lock:
+            self._history.setdefault(shape, deque(maxlen=self.window)).append(ratio)
+
+    def load(self, observations: Iterable[Tuple[VwOptsLike, Optional[int]]]) -> None:
+        '''
+        Observes peak memory of runs from previous sessions (e.g. from the run index), oldest first.
+        '''
+        for opts, max_rss in observations:
+            self.observe(opts, max_rss)
+
+
+class MemoryBudget:
+    '''
+    Admission control for concurrently running vw processes: task is admitted only if
+    sum of estimates of running tasks stays under the budget (single task is always admitted).
+    '''
+    budget: int
+    estimator: MemoryEstimator
+    in_use: int
+
+    def __init__(self, budget: int, estimator: Optional[MemoryEstimator] = None):
+        self.budget = budget
+        self.estimator = estimator or MemoryEstimator()
+        self.in_use = 0
+        self._lock = Lock()
+
+    def try_acquire(self, opts: VwOptsLike, running: int) -> Optional[int]:
+        estimate = self.estimator.estimate(opts)
+        with self._lock:
+            if running > 0 and self.in_use + estimate > self.budget:
+                return None
+            self.in_use += estimate
+            return estimate
+
+    def release(self, opts: VwOptsLike, estimate: int, max_rss: Optional[int]) -> None:
+        with self._lock:
+            self.in_use -= estimate
+        self.estimator.observe(opts, max_rss)
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from vw_executor.vw_opts import VwOpts, VwOptsLike
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+
+
+class Dimension:
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def sample(self, rng: np.random.Generator) -> Any:
+        ...
+
+    def to_unit(self, value: Any) -> float:
+        ...
+
+    def from_unit(self, u: float) -> Any:
+        ...
+
+
+class Real(Dimension):
+    low: float
+    high: float
+    log: bool
+
+    def __init__(self, name: str, low: float, high: float, log: bool = False):
+        if low >= high:
+            raise ValueError(f'Empty range for {name}: [{low}, {high}]')
+        if log and low <= 0:
+            raise ValueError(f'Log scale requires positive range for {name}')
+        super().__init__(name)
+        self.low = low
+        self.high = high
+        self.log = log
+
+    def _scale(self, value: float) -> float:
+        return math.log(value) if self.log else value
+
+    def to_unit(self, value: Any) -> float:
+        low, high = self._scale(self.low), self._scale(self.high)
+        return (self._scale(value) - low) / (high - low)
+
+    def from_unit(self, u: float) -> Any:
+        low, high = self._scale(self.low), self._scale(self.high)
+        value = low + min(max(u, 0.0), 1.0) * (high - low)
+        return math.exp(value) if self.log else value
+
+    def sample(self, rng: np.random.Generator) -> Any:
+        return self.from_unit(rng.random())
+
+
+class Integer(Real):
+    def from_unit(self, u: float) -> Any:
+        return int(min(max(round(super().from_unit(u)), self.low), self.high))
+
+
+class Categorical(Dimension):
+    values: List[Any]
+
+    def __init__(self, name: str, values: List[Any]):
+        if len(values) == 0:
+            raise ValueError(f'No values for {name}')
+        super().__init__(name)
+        self.values = list(values)
+
+    def sample(self, rng: np.random.Generator) -> Any:
+        return self.values[rng.integers(len(self.values))]
+
+
+def real(name: str, low: float, high: float, log: bool = False) -> Real:
+    return Real(name, low, high, log)
+
+
+def integer(name: str, low: int, high: int, log: bool = False) -> Integer:
+    return Integer(name, low, high, log)
+
+
+def categorical(name: str, values: List[Any]) -> Categorical:
+    return Categorical(name, values)
+
+
+def _kde_log_density(u: np.ndarray, centers: np.ndarray, bandwidth: float) -> np.ndarray:
+    # mixture of gaussians around observed points and uniform prior on [0, 1]
+    z = (u[:, None] - centers[None, :]) / bandwidth
+    gaussians = np.exp(-0.5 * z ** 2) / (bandwidth * math.sqrt(2 * math.pi))
+    return np.log((gaussians.sum(axis=1) + 1.0) / (len(centers) + 1))
+
+
+def _bandwidth(centers: np.ndarray) -> float:
+    return max(0.05, float(np.std(centers)) * len(centers) ** -0.2) if len(centers) > 1 else 0.25
+
+
+class Optimizer:
+    '''
+    Model-based hyperparameter search (tree-structured Parzen estimator).
+    Proposes batches of points (procs of the vw by default), trains them and updates the model with Job.loss.
+    Results are journaled into the vw cache folder, so search with the same name, inputs and base options
+    continues after restart. Failed points (without loss) are journaled, but not used by the model.
+    '''
+    space: List[Dimension]
+    base: VwOpts
+    history: List[Tuple[Dict[str, Any], Optional[float]]]
+
+    def __init__(self,
+                 vw: 'Vw',
+                 inputs: Union[str, Path, List[Union[Path, str]]],
+                 space: List[Dimension],
+                 base: Optional[VwOptsLike] = None,
+                 name: str = 'default',
+                 n_initial: int = 10,
+                 gamma: float = 0.25,
+                 n_candidates: int = 64,
+                 seed: Optional[int] = None,
+                 outputs: Optional[List[str]] = None,
+                 input_mode: str = '-d',
+                 input_dir: Union[Path, str] = ''):
+        self.vw = vw
+        self.inputs = inputs
+        self.space = space
+        self.base = VwOpts(base or {})
+        self.n_initial = n_initial
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.outputs = outputs
+        self.input_mode = input_mode
+        self.input_dir = input_dir
+        self._rng = np.random.default_rng(seed)
+        self._journal = vw._cache.path.joinpath('optimizer', f'{name}-{self._journal_key()}.jsonl')
+        self._journal.parent.mkdir(parents=True, exist_ok=True)
+        self.history = []
+        if self._journal.exists():
+            with open(self._journal) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.history.append((record['params'], record['loss']))
+
+    def _journal_key(self) -> str:
+        inputs = self.inputs if isinstance(self.inputs, list) else [self.inputs]
+        identity = [[str(i) for i in inputs], self.input_mode, str(self.input_dir), self.base.hash()]
+        return hashlib.md5(json.dumps(identity).encode('utf-8')).hexdigest()
+
+    def to_opts(self, params: Dict[str, Any]) -> VwOpts:
+        return VwOpts(dict(self.base, **params))
+
+    def _key(self, params: Dict[str, Any]) -> str:
+        return self.to_opts(params).hash()
+
+    def _observed(self) -> List[Tuple[Dict[str, Any], float]]:
+        return [(p, loss) for p, loss in self.history if loss is not None]
+
+    def _split(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        observed = sorted(self._observed(), key=lambda h: h[1])
+        n_good = max(1, math.ceil(self.gamma * len(observed)))
+        return [p for p, _ in observed[:n_good]], [p for p, _ in observed[n_good:]]
+
+    def _propose_tpe(self) -> List[Dict[str, Any]]:
+        good, bad = self._split()
+        candidates = [{} for _ in range(self.n_candidates)]
+        scores = np.zeros(self.n_candidates)
+        for d in self.space:
+            if isinstance(d, Categorical):
+                def weights(points):
+                    counts = np.array([sum(1 for p in points if p.get(d.name) == v) for v in d.values], dtype=float)
+                    return (counts + 1) / (counts.sum() + len(d.values))
+                l, g = weights(good), weights(bad)
+                idx = self._rng.choice(len(d.values), size=self.n_candidates, p=l)
+                scores += np.log(l[idx]) - np.log(g[idx])
+                for c, i in zip(candidates, idx):
+                    c[d.name] = d.values[i]
+            else:
+                good_u = np.array([d.to_unit(p[d.name]) for p in good])
+                bad_u = np.array([d.to_unit(p[d.name]) for p in bad])
+                bandwidth = _bandwidth(good_u)
+                u = np.clip(self._rng.choice(good_u, size=self.n_candidates) +
+                            self._rng.normal(0, bandwidth, size=self.n_candidates), 0, 1)
+                values = [d.from_unit(x) for x in u]
+                u = np.array([d.to_unit(v) for v in values])
+                scores += _kde_log_density(u, good_u, bandwidth)
+                if len(bad_u):
+                    scores -= _kde_log_density(u, bad_u, _bandwidth(bad_u))
+                for c, v in zip(candidates, values):
+                    c[d.name] = v
+        return [candidates[i] for i in np.argsort(-scores)]
+
+    def ask(self, n: int) -> List[Dict[str, Any]]:
+        seen = {self._key(p) for p, _ in self.history}
+        if len(self._observed()) < max(self.n_initial, 1):
+            candidates = [{d.name: d.sample(self._rng) for d in self.space} for _ in range(self.n_candidates)]
+        else:
+            candidates = self._propose_tpe()
+        result = []
+        for c in candidates:
+            key = self._key(c)
+            if key not in seen:
+                seen.add(key)
+                result.append(c)
+            if len(result) == n:
+                break
+        return result
+
+    def tell(self, params: Dict[str, Any], loss: Optional[float]) -> None:
+        self.history.append((params, loss))
+        with open(self._journal, 'a') as f:
+            f.write(json.dumps({'params': params, 'loss': loss}) + '\n')
+
+    def run(self, n_iter: int, batch_size: Optional[int] = None) -> pd.DataFrame:
+        batch_size = batch_size or self.vw.pool.procs
+        for _ in range(n_iter):
+            batch = self.ask(batch_size)
+            if not batch:
+                break
+            jobs = self.vw.train(self.inputs, [self.to_opts(p) for p in batch], list(self.outputs or []),
+                                 self.input_mode, self.input_dir)
+            for params, job in zip(batch, jobs):
+                self.tell(params, job.loss)
+        return self.results
+
+    @property
+    def results(self) -> pd.DataFrame:
+        return pd.DataFrame([dict(p, **{'!Loss': loss}) for p, loss in self.history])
+
+    @property
+    def best(self) -> Optional[VwOpts]:
+        good, _ = self._split()
+        return self.to_opts(good[0]) if good else None
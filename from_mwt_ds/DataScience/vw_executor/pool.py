@@ -1,14 +1,12 @@
 import multiprocessing
-from multiprocessing.pool import ThreadPool
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor, Executor, as_completed
+from threading import Lock
 
-from typing import Callable, List, Any
+from typing import Callable, Dict, List, Any, Optional, Iterable, Generator, Set
 from abc import ABC, abstractmethod
 
 
-def _execute(task_input):
-    return task_input[0](*task_input[1])
-
-
 class Pool(ABC):
     procs: int
 
@@ -19,6 +17,20 @@ class Pool(ABC):
     def map(self, task: Callable, inputs: List[Any]) -> Any:
         ...
 
+    @abstractmethod
+    def submit(self, task: Callable, *args) -> Future:
+        ...
+
+    def as_completed(self, task: Callable, inputs: Iterable[Any]) -> Generator[Any, None, None]:
+        for i in inputs:
+            yield task(*i)
+
+    def cancel(self) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
 
 class SeqPool(Pool):
     def __init__(self):
@@ -31,12 +43,224 @@ class SeqPool(Pool):
             result.append(task(*i))
         return result
 
+    def submit(self, task: Callable, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(task(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
-class MultiThreadPool(Pool):
+
+class FuturesPool(Pool):
+    '''
+    Pool on top of concurrent.futures thread executor that is reused across calls.
+    Tasks are bound methods and closures of the scheduler, so they are not sent to other processes.
+    '''
     def __init__(self, procs: int = multiprocessing.cpu_count()):
         super().__init__(procs)
+        self._executor = None
+        self._futures = set()
+        self._lock = Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.procs)
+            return self._executor
+
+    def _forget(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def submit(self, task: Callable, *args) -> Future:
+        future = self._get_executor().submit(task, *args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
 
     def map(self, task: Callable, inputs: List[Any]) -> Any:
-        args = [(task, i) for i in inputs]
-        with ThreadPool(processes=self.procs) as p:
-            return p.map(_execute, args)
+        futures = [self.submit(task, *i) for i in inputs]
+        try:
+            return [f.result() for f in futures]
+        finally:
+            for f in futures:
+                f.cancel()
+
+    def as_completed(self, task: Callable, inputs: Iterable[Any]) -> Generator[Any, None, None]:
+        futures = [self.submit(task, *i) for i in inputs]
+        try:
+            for f in as_completed(futures):
+                yield f.result()
+        finally:
+            for f in futures:
+                f.cancel()
+
+    def cancel(self) -> None:
+        with self._lock:
+            futures = list(self._futures)
+        for f in futures:
+            f.cancel()
+
+    def close(self) -> None:
+        self.cancel()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+class MultiThreadPool(FuturesPool):
+    def __init__(self, procs: int = multiprocessing.cpu_count()):
+        super().__init__(procs, 'thread')
+
+def _worker_loop(conn, initializer: Optional[Callable]) -> None:
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        fn, args, kwargs = message
+        try:
+            conn.send((True, fn(*args, **kwargs)))
+        except Exception as e:
+            import traceback
+            conn.send((False, f'{type(e).__name__}: {e}\n{traceback.format_exc()}'))
+    conn.close()
+
+
+class _Worker:
+    process: multiprocessing.Process
+    tasks: int
+
+    def __init__(self, initializer: Optional[Callable]):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_loop, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            ...
+        self.process.join(1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    '''
+    Pool of long-lived worker processes.
+    Workers are started lazily, reused across calls and recycled after max_tasks tasks.
+    '''
+    procs: int
+    max_tasks: Optional[int]
+
+    def __init__(self, procs: int, max_tasks: Optional[int] = None, initializer: Optional[Callable] = None):
+        self.procs = procs
+        self.max_tasks = max_tasks
+        self._initializer = initializer
+        self._lock = Lock()
+        self._workers = set()
+        self._busy: Dict[_Worker, Set[Any]] = {}
+        self._slots = queue.Queue()
+        for _ in range(procs):
+            self._slots.put(None)
+        self._closed = False
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Worker pool is closed')
+            worker = _Worker(self._initializer)
+            self._workers.add(worker)
+            return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False) -> None:
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def _acquire(self) -> _Worker:
+        worker = self._slots.get()
+        try:
+            if worker is not None and (not worker.is_alive() or
+                                       (self.max_tasks is not None and worker.tasks >= self.max_tasks)):
+                self._retire(worker)
+                worker = None
+            return worker or self._spawn()
+        except:
+            self._slots.put(None)
+            raise
+
+    def warm(self) -> None:
+        workers = [self._acquire() for _ in range(self.procs)]
+        for w in workers:
+            self._slots.put(w)
+
+    def apply(self, fn: Callable, *args, timeout: Optional[float] = None, tags: Iterable[Any] = (), **kwargs) -> Any:
+        '''
+        Runs fn in a worker. If result is not received within timeout seconds, the worker is killed
+        and TimeoutError is raised. tags identify the call for kill().
+        '''
+        worker = self._acquire()
+        with self._lock:
+            self._busy[worker] = set(tags)
+        try:
+            worker.conn.send((fn, args, kwargs))
+            if not worker.conn.poll(timeout):
+                raise TimeoutError(f'No result in {timeout} seconds')
+            ok, result = worker.conn.recv()
+            worker.tasks += 1
+        except BaseException:
+            self._release(worker)
+            self._retire(worker, kill=True)
+            self._slots.put(None)
+            raise
+        self._release(worker)
+        self._slots.put(worker)
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            self._busy.pop(worker, None)
+
+    def kill(self, tags: Optional[Iterable[Any]] = None) -> Set[Any]:
+        '''
+        Kills workers running calls with any of the given tags (all busy workers if None),
+        these calls raise EOFError. Returns tags of the killed calls.
+        '''
+        tags = None if tags is None else set(tags)
+        with self._lock:
+            busy = [(w, t) for w, t in self._busy.items() if tags is None or t & tags]
+        for worker, _ in busy:
+            if worker.process.is_alive():
+                worker.process.kill()
+        return set().union(*(t for _, t in busy))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, set()
+        for w in workers:
+            w.stop()
@@ -0,0 +1,84 @@
+from pathlib import Path
+from threading import Event, Lock, Thread
+
+from vw_executor.artifacts import ProgressTail
+from vw_executor.trace import span
+
+from typing import Dict, List, Optional, Tuple
+
+
+class ProgressMonitor:
+    '''
+    Background thread that tails vw logs of running tasks and passes newly appended progress rows
+    (example counter, average loss, since last) to on_task_progress of the job handler.
+    Rows are coalesced, so handler is called at most once per interval seconds for every task.
+    Progress is live only for the vw binary: in-process pyvw (and streams) write the log at the end of the task,
+    so all rows of such tasks are passed at once right before on_task_finish.
+    '''
+    interval: float
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._tasks: Dict[Tuple[int, int], Tuple['Job', int, ProgressTail]] = {}
+        self._lock = Lock()
+        self._emit_lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    @staticmethod
+    def _pending(job, task_idx: int) -> Path:
+        stdout = job[task_idx].stdout.path
+        return stdout.parent / (stdout.name + '.pending')
+
+    def add(self, job, task_idx: int) -> None:
+        with self._lock:
+            self._tasks[(id(job), task_idx)] = (job, task_idx, ProgressTail(self._pending(job, task_idx)))
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = Thread(target=self._loop, name='vw-progress', daemon=True)
+                self._thread.start()
+
+    def remove(self, job, task_idx: int) -> None:
+        '''
+        Stops tailing of the task and passes rows that were appended since the last call.
+        '''
+        with self._lock:
+            entry = self._tasks.pop((id(job), task_idx), None)
+        if entry is None or job[task_idx].attempts == 0:
+            return
+        _, _, tail = entry
+        with self._emit_lock:
+            if not tail.path.exists():
+                # log is already moved to the cache, it is read unless it is compressed
+                tail.path = job[task_idx].stdout.path
+            self._emit(job, task_idx, tail)
+
+    def _emit(self, job, task_idx: int, tail: ProgressTail) -> None:
+        try:
+            rows = tail.read()
+            if rows:
+                with span('on_task_progress', 'handler', job._tracer, job=job.name, task=task_idx, rows=len(rows)):
+                    job._handler.on_task_progress(job, task_idx, rows)
+        except Exception as e:
+            job._logger.warning(f'Progress of task {task_idx} is not reported: {e}')
+
+    def _poll(self) -> None:
+        with self._lock:
+            entries = list(self._tasks.values())
+        for job, task_idx, tail in entries:
+            with self._emit_lock:
+                with self._lock:
+                    if (id(job), task_idx) not in self._tasks:
+                        continue
+                self._emit(job, task_idx, tail)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._poll()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
@@ -0,0 +1,171 @@
+import heapq
+import math
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from threading import Event
+
+from vw_executor.memory import MemoryBudget
+from vw_executor.pool import Pool
+
+from typing import Callable, Dict, List, Optional, Set, Tuple, Generator
+
+BatchRunner = Callable[[List[Tuple['Job', int]], bool], None]
+Abort = Callable[[List[Tuple['Job', int]]], None]
+
+
+class _JobState:
+    submitted: int
+    running: int
+    finalized: int
+    completed: Set[int]
+
+    def __init__(self, job: 'Job'):
+        self.job = job
+        self.started = False
+        self.submitted = 0
+        self.running = 0
+        self.finalized = 0
+        self.completed = set()
+        self.dependents = {i: [] for i in range(len(job))}
+        self.waiting = {}
+        for i in range(len(job)):
+            deps = job.dependencies(i)
+            self.waiting[i] = len(deps)
+            for d in deps:
+                self.dependents[d].append(i)
+
+    @property
+    def stopped(self) -> bool:
+        return self.job.failed is not None
+
+    @property
+    def finished(self) -> bool:
+        return self.finalized == len(self.job) or \
+            (self.stopped and self.running == 0 and self.finalized == self.submitted)
+
+    def complete(self, i: int) -> List[int]:
+        self.running -= 1
+        self.completed.add(i)
+        while self.finalized in self.completed:
+            self.job._finish_task(self.finalized)
+            self.finalized += 1
+        if self.stopped:
+            return []
+        ready = []
+        for d in self.dependents[i]:
+            self.waiting[d] -= 1
+            if self.waiting[d] == 0:
+                ready.append(d)
+        return ready
+
+
+class Scheduler:
+    '''
+    Runs tasks of multiple jobs as a dependency graph on a shared pool.
+    Handler callbacks are fired from the calling thread: job start before its first task,
+    task finish in task order and job finish after its last task.
+    If memory budget is provided, the first ready task that fits into the budget is submitted.
+    If batch runner is provided, up to batch_size ready tasks are submitted to the pool as a single item.
+    If abort is provided, it is called with running tasks when the run is left before they are finished
+    (interruption, error or early exit of the caller), so their processes do not outlive it.
+    '''
+    pool: Pool
+    budget: Optional[MemoryBudget]
+    batch_size: int
+    batch_runner: Optional[BatchRunner]
+    abort: Optional[Abort]
+
+    def __init__(self, pool: Pool, budget: Optional[MemoryBudget] = None, batch_size: int = 1,
+                 batch_runner: Optional[BatchRunner] = None, abort: Optional[Abort] = None):
+        self.pool = pool
+        self.budget = budget
+        self.batch_size = batch_size if batch_runner is not None else 1
+        self.batch_runner = batch_runner
+        self.abort = abort
+        self._cancelled = Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def _next(self, ready: List[Tuple[int, int]], states: List[_JobState],
+              running: int) -> Optional[Tuple[int, int, Optional[int]]]:
+        skipped = []
+        try:
+            while ready:
+                j, i = heapq.heappop(ready)
+                if states[j].stopped:
+                    continue
+                if self.budget is None:
+                    return j, i, None
+                estimate = self.budget.try_acquire(states[j].job.opts, running)
+                if estimate is not None:
+                    return j, i, estimate
+                skipped.append((j, i))
+            return None
+        finally:
+            for item in skipped:
+                heapq.heappush(ready, item)
+
+    def run(self, jobs: List['Job'], reset: bool) -> Generator['Job', None, None]:
+        states = [_JobState(job) for job in jobs]
+        ready: List[Tuple[int, int]] = []
+        for j, state in enumerate(states):
+            if len(state.job) == 0:
+                state.job._start()
+                yield state.job._finish()
+            for i, n in state.waiting.items():
+                if n == 0:
+                    heapq.heappush(ready, (j, i))
+
+        in_flight: Dict[Future, List[Tuple[int, int]]] = {}
+        estimates: Dict[Tuple[int, int], int] = {}
+        try:
+            while True:
+                while ready and len(in_flight) < self.pool.procs and not self._cancelled.is_set():
+                    size = min(self.batch_size, math.ceil(len(ready) / (self.pool.procs - len(in_flight))))
+                    batch = []
+                    while len(batch) < size:
+                        selected = self._next(ready, states, len(in_flight) + len(batch))
+                        if selected is None:
+                            break
+                        j, i, estimate = selected
+                        if estimate is not None:
+                            estimates[(j, i)] = estimate
+                        state = states[j]
+                        if not state.started:
+                            state.started = True
+                            state.job._start()
+                        state.job._start_task(i)
+                        state.submitted += 1
+                        state.running += 1
+                        batch.append((j, i))
+                    if not batch:
+                        break
+                    if len(batch) == 1:
+                        j, i = batch[0]
+                        f = self.pool.submit(states[j].job._run_task, i, reset)
+                    else:
+                        f = self.pool.submit(self.batch_runner, [(states[j].job, i) for j, i in batch], reset)
+                    in_flight[f] = batch
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in sorted(done, key=lambda f: in_flight[f]):
+                    batch = in_flight.pop(f)
+                    for j, i in batch:
+                        if (j, i) in estimates:
+                            self.budget.release(states[j].job.opts, estimates.pop((j, i)),
+                                                states[j].job[i].resource_usage.get('max_rss'))
+                    f.result()
+                    for j, i in batch:
+                        state = states[j]
+                        for d in state.complete(i):
+                            heapq.heappush(ready, (j, d))
+                        if state.finished:
+                            yield state.job._finish()
+        finally:
+            for f in in_flight:
+                f.cancel()
+            if self.abort is not None and in_flight:
+                self.abort([(states[j].job, i) for batch in in_flight.values() for j, i in batch])
+            for (j, _), estimate in estimates.items():
+                self.budget.release(states[j].job.opts, estimate, None)
@@ -0,0 +1,87 @@
+import math
+import random
+
+import pandas as pd
+
+from vw_executor.vw_opts import VwOpts, VwOptsLike
+
+from typing import List, Optional, Union
+from pathlib import Path
+
+
+def _budgets(files: int, min_files: int, eta: int) -> List[int]:
+    result = [min(min_files, files)]
+    while result[-1] < files:
+        result.append(min(result[-1] * eta, files))
+    return result
+
+
+def _rank(jobs: List['Job']) -> List['Job']:
+    return sorted(jobs, key=lambda j: (j.loss is None, j.loss if j.loss is not None else 0))
+
+
+def _to_row(job: 'Job', files: int, **extra) -> dict:
+    return dict(job.to_dict(), **{'!Files': files}, **extra)
+
+
+def successive_halving(vw: 'Vw',
+                       inputs: Union[str, Path, List[Union[Path, str]]],
+                       opts: List[VwOptsLike],
+                       eta: int = 3,
+                       min_files: int = 1,
+                       outputs: Optional[List[str]] = None,
+                       input_mode: str = '-d',
+                       input_dir: Union[Path, str] = '') -> pd.DataFrame:
+    '''
+    Successive halving over input files.
+    Every configuration is trained on first min_files files, best 1/eta of them (by loss on the last file)
+    are trained on eta times more files and so on until all files are used.
+    Intermediate models are taken from cache, so survivors never retrain files that were already seen.
+    Returns one row per configuration with loss on the last file it reached (!Loss) and number of such files (!Files).
+    '''
+    if not isinstance(inputs, list):
+        inputs = [inputs]
+    if eta < 2:
+        raise ValueError('eta should be at least 2')
+    survivors = [VwOpts(o) for o in opts]
+    if not survivors:
+        raise ValueError('No configurations to search')
+    rows = {}
+    for budget in _budgets(len(inputs), min_files, eta):
+        jobs = vw.train(inputs[:budget], survivors, list(outputs or []), input_mode, input_dir)
+        for job in jobs:
+            rows[job.opts.hash()] = _to_row(job, budget)
+        ranked = _rank(jobs)
+        survivors = [j.opts for j in ranked[:max(1, math.ceil(len(ranked) / eta))]]
+    return pd.DataFrame(list(rows.values())).sort_values(
+        ['!Files', '!Loss'], ascending=[False, True], na_position='last').reset_index(drop=True)
+
+
+def hyperband(vw: 'Vw',
+              inputs: Union[str, Path, List[Union[Path, str]]],
+              opts: List[VwOptsLike],
+              eta: int = 3,
+              min_files: int = 1,
+              seed: Optional[int] = None,
+              outputs: Optional[List[str]] = None,
+              input_mode: str = '-d',
+              input_dir: Union[Path, str] = '') -> pd.DataFrame:
+    '''
+    Hyperband on top of successive halving.
+    Every bracket samples its own subset of configurations from opts and starts from its own number of files:
+    from many configurations on min_files files to few configurations on all files.
+    Returns concatenation of successive halving results with bracket index (!Bracket).
+    '''
+    if not isinstance(inputs, list):
+        inputs = [inputs]
+    rng = random.Random(seed)
+    opts = list(opts)
+    s_max = len(_budgets(len(inputs), min_files, eta)) - 1
+    result = []
+    for s in reversed(range(s_max + 1)):
+        n = min(len(opts), math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        start = max(min_files, len(inputs) // eta ** s)
+        bracket = successive_halving(
+            vw, inputs, rng.sample(opts, n), eta, start, outputs, input_mode, input_dir)
+        result.append(bracket.assign(**{'!Bracket': s}))
+    return pd.concat(result).reset_index(drop=True)
@@ -0,0 +1,96 @@
+import bisect
+import math
+from threading import Lock
+
+from typing import Dict, List, Optional, Tuple
+
+ProgressRow = Tuple[str, float, float]
+
+
+class StopRule:
+    '''
+    Rule for early termination of running vw process.
+    check is called with progress rows (example counter, average loss, since last) appended since previous call
+    and returns the reason for termination or None.
+    '''
+    def check(self, job: 'Job', task_idx: int, rows: List[ProgressRow]) -> Optional[str]:
+        ...
+
+    def record(self, job: 'Job', task_idx: int) -> None:
+        ...
+
+
+class NotFinite(StopRule):
+    def check(self, job, task_idx, rows):
+        for i, loss, since_last in rows:
+            if not math.isfinite(loss) or not math.isfinite(since_last):
+                return f'Loss is not finite at example {i}'
+        return None
+
+
+class LossAbove(StopRule):
+    threshold: float
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def check(self, job, task_idx, rows):
+        for i, loss, _ in rows:
+            if loss > self.threshold:
+                return f'Loss {loss} is above {self.threshold} at example {i}'
+        return None
+
+
+class WorseThanKth(StopRule):
+    '''
+    Stops the task if its average loss is worse than the k-th best loss of already finished tasks
+    on the same file and position at the same example counter.
+    '''
+    k: int
+    _board: Dict[Tuple[str, int, str], List[float]]
+
+    def __init__(self, k: int = 1, tolerance: float = 0):
+        self.k = k
+        self.tolerance = tolerance
+        self._board = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(job, task_idx: int, i: str) -> Tuple[str, int, str]:
+        return str(job[task_idx].input_file), task_idx, i
+
+    def check(self, job, task_idx, rows):
+        with self._lock:
+            for i, loss, _ in rows:
+                best = self._board.get(self._key(job, task_idx, i), [])
+                if len(best) >= self.k and loss > best[self.k - 1] + self.tolerance:
+                    return f'Loss {loss} is worse than {self.k}-th best {best[self.k - 1]} at example {i}'
+        return None
+
+    def record(self, job, task_idx):
+        table = job[task_idx].loss_table
+        if table is None:
+            return
+        with self._lock:
+            for i, loss in table['loss'].items():
+                best = self._board.setdefault(self._key(job, task_idx, i), [])
+                bisect.insort(best, loss)
+                del best[self.k:]
+
+
+class AnyOf(StopRule):
+    rules: List[StopRule]
+
+    def __init__(self, rules: List[StopRule]):
+        self.rules = rules
+
+    def check(self, job, task_idx, rows):
+        for rule in self.rules:
+            reason = rule.check(job, task_idx, rows)
+            if reason is not None:
+                return reason
+        return None
+
+    def record(self, job, task_idx):
+        for rule in self.rules:
+            rule.record(job, task_idx)
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+
+def _content_hash(lines: Union[Iterable[str], Callable[[], Iterable[str]]]) -> Optional[str]:
+    if callable(lines) or iter(lines) is lines:
+        return None
+    result = hashlib.md5()
+    for line in lines:
+        result.update(line.rstrip('\n').encode('utf-8'))
+        result.update(b'\n')
+    return result.hexdigest()
+
+
+class Stream:
+    '''
+    Examples (dsjson or vw text lines) that are fed to in-process pyvw instead of reading the input file.
+    name and version identify the stream in the cache: results are reused only if both are the same.
+    lines can be a collection, a function returning an iterable or a one-shot iterator (e.g. generator).
+    Default name of a collection is derived from its content, so results of the same lines are reused.
+    Functions and iterators can not be hashed without consuming them, their default name is unique,
+    so name should be set for their results to be reused.
+    If checkpoint_every is set, model is saved into the cache after every checkpoint_every examples.
+    '''
+    name: str
+    version: Optional[Union[int, str]]
+    checkpoint_every: Optional[int]
+
+    def __init__(self,
+                 lines: Union[Iterable[str], Callable[[], Iterable[str]]],
+                 name: Optional[str] = None,
+                 version: Optional[Union[int, str]] = None,
+                 checkpoint_every: Optional[int] = None):
+        self._lines = lines
+        self.name = name or f'stream-{_content_hash(lines) or uuid.uuid4().hex}'
+        self.version = version
+        self.checkpoint_every = checkpoint_every
+        self._consumed = False
+
+    def open(self) -> Iterator[str]:
+        if callable(self._lines):
+            return iter(self._lines())
+        if iter(self._lines) is self._lines:
+            if self._consumed:
+                raise RuntimeError(f'{self.name} is already consumed. Pass a collection or a function to reuse it')
+            self._consumed = True
+        return iter(self._lines)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def _save_checkpoint(workspace, path: Path) -> None:
+    temp = path.parent / (path.name + '.pending')
+    workspace.save(str(temp))
+    os.replace(temp, path)
+
+
+def run_stream(args: str,
+               lines: Iterable[str],
+               filename: Path,
+               checkpoint_every: Optional[int] = None,
+               checkpoint: Optional[Callable[[int], Path]] = None) -> None:
+    '''
+    Learns examples one by one in a pyvw workspace and writes vw log to filename.
+    Multiline vw text examples are separated by empty lines.
+    '''
+    from vowpalwabbit import pyvw
+
+    workspace = pyvw.Workspace(args, enable_logging=True)
+    tokens = args.split()
+    multiline = workspace._is_multiline() and '--dsjson' not in tokens and '--json' not in tokens
+    examples = 0
+
+    def learn(example) -> None:
+        nonlocal examples
+        parsed = workspace.parse(example)
+        if isinstance(parsed, list) and len(parsed) == 0:
+            return
+        workspace.learn(parsed)
+        workspace.finish_example(parsed)
+        examples += 1
+        if checkpoint_every and examples % checkpoint_every == 0:
+            _save_checkpoint(workspace, checkpoint(examples))
+
+    buffer = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if not multiline:
+            if line.strip():
+                learn(line)
+        elif line.strip():
+            buffer.append(line)
+        elif buffer:
+            learn(buffer)
+            buffer = []
+    if buffer:
+        learn(buffer)
+    workspace.finish()
+
+    stderr_temp = filename.parent / (filename.name + '.pending')
+    with open(stderr_temp, 'w') as f:
+        f.writelines(f'{line.rstrip()}\n' for line in workspace.get_log())
+    os.replace(stderr_temp, filename)
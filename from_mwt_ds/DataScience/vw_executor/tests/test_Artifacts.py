@@ -1,5 +1,7 @@
+import shutil
 import unittest
 from vw_executor.artifacts import *
+from vw_executor.artifacts import _extract_metrics, _parse_metrics
 
 
 class TestOutput(unittest.TestCase):
@@ -8,6 +10,64 @@ class TestOutput(unittest.TestCase):
         self.assertEqual(output.loss, -0.88)
         self.assertEqual(len(output.loss_table), 10)
 
+    def test_output_sidecar(self):
+        folder = Path('.vw_cache_artifacts')
+        shutil.rmtree(folder, ignore_errors=True)
+        folder.mkdir()
+        path = Path(shutil.copy('vw_executor/tests/data/artifacts/stdout_cb.txt', folder))
+        parsed = Output(path)
+        parsed.save_sidecar()
+        path.write_text('')
+        loaded = Output(path)
+        self.assertEqual(loaded.loss, -0.88)
+        self.assertEqual(loaded.metrics, parsed.metrics)
+        pd.testing.assert_frame_equal(loaded.loss_table, parsed.loss_table)
+
+        parsed.sidecar.unlink()
+        self.assertIsNone(Output(path).loss)
+
+    def test_bulk_parser_matches_line_parser(self):
+        rows = [f'{i / 1000:.6f} {i / 500:.6f} {i} {i}.0 1:-1:0.5 0:0.5 4' for i in range(1, 20000)]
+        rows[10] = '0.100000h 0.200000h 11 11.0 1:-1:0.5 0:0.5 4'
+        rows[11] = 'nan nan 12 12.0 1:-1:0.5 0:0.5 4'
+        rows[12] = '0.5 0.5'
+        text = '\n'.join(['Num weight bits = 18', 'loss function = squared',
+                          'average  since         example        example  current  current  current',
+                          'loss     last          counter         weight    label  predict features',
+                          *rows, '', 'finished run', 'number of examples = 19999',
+                          'average loss = 0.250000 h', 'total feature number = 79996', ''])
+        truncated = text[:text.index('average loss =') + len('average loss =')]
+        for log in [text, Path('vw_executor/tests/data/artifacts/stdout_cb.txt').read_text(), truncated,
+                    truncated + ' ', '', 'a = 1\n']:
+            expected_table, expected_metrics = _extract_metrics(log.split('\n'))
+            table, metrics = _parse_metrics(log)
+            pd.testing.assert_frame_equal(table, expected_table)
+            self.assertEqual(metrics, expected_metrics)
+        self.assertEqual(len(table), 0)
+        table, metrics = _parse_metrics(text)
+        self.assertEqual(len(table), 19997)
+        self.assertEqual(metrics['average loss'], 0.25)
+
+    def test_truncated_log(self):
+        folder = Path('.vw_cache_artifacts')
+        folder.mkdir(exist_ok=True)
+        path = folder.joinpath('truncated.txt')
+        log = Path('vw_executor/tests/data/artifacts/stdout_cb.txt').read_text()
+        path.write_text(log[:log.index('average loss =') + len('average loss =')])
+        output = Output(path)
+        self.assertIsNone(output.loss)
+        self.assertIsNone(output.metrics['average loss'])
+        self.assertGreater(len(output.loss_table), 0)
+
+    def test_output_head_and_tail(self):
+        path = 'vw_executor/tests/data/artifacts/stdout_cb.txt'
+        output = Output(path)
+        self.assertEqual(output.final_metrics['average loss'], -0.88)
+        self.assertEqual(output.loss, -0.88)
+        self.assertFalse(output._processed)
+        pd.testing.assert_frame_equal(output.loss_table_head(3), Output(path).loss_table.head(3))
+        self.assertFalse(output._processed)
+
 
 class TestPredictions(unittest.TestCase):
     def test_predictions_scalar(self):
@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import unittest
+from pathlib import Path
+from vw_executor.artifacts import Output, Predictions, ProgressTail
+from vw_executor.compression import compress, detect, open_text
+from vw_executor.vw import Vw, ExecutionStatus
+
+_ARTIFACTS = Path('vw_executor/tests/data/artifacts')
+
+
+class TestCompression(unittest.TestCase):
+    folder = Path('.vw_cache_compression')
+
+    def setUp(self):
+        if self.folder.exists():
+            shutil.rmtree(self.folder)
+        self.folder.mkdir(parents=True)
+
+    def _copy(self, name):
+        return Path(shutil.copy(_ARTIFACTS.joinpath(name), self.folder))
+
+    def test_readers_are_transparent(self):
+        for method in ['gzip', 'xz']:
+            stdout = self._copy('stdout_cb.txt')
+            predictions = self._copy('pred_ccb.txt')
+            self.assertTrue(compress(stdout, method))
+            self.assertTrue(compress(predictions, method))
+            self.assertEqual(detect(stdout), method)
+            self.assertEqual(Output(stdout).loss, -0.88)
+            self.assertEqual(len(Output(stdout).loss_table), 10)
+            self.assertEqual(len(list(Predictions(predictions).ccb_slot)), 23)
+
+    def test_file_is_opened_once(self):
+        for method in ['gzip', 'xz', None]:
+            stdout = self._copy('stdout_cb.txt')
+            expected = stdout.read_text()
+            if method:
+                compress(stdout, method)
+            replacement = self._copy('pred_ccb.txt')
+            compress(replacement, 'xz' if method == 'gzip' else 'gzip')
+            with open_text(stdout) as f:
+                # file is replaced in place, reader keeps reading the file it has opened
+                os.replace(replacement, stdout)
+                self.assertEqual(f.read(), expected)
+            self.assertTrue(f.closed)
+            stdout.unlink()
+
+    def test_compressed_progress_is_not_tailed(self):
+        stdout = self._copy('stdout_cb.txt')
+        self.assertTrue(ProgressTail(stdout).read())
+        compress(stdout)
+        self.assertEqual(ProgressTail(stdout).read(), [])
+
+    def test_compress_is_idempotent(self):
+        stdout = self._copy('stdout_cb.txt')
+        self.assertTrue(compress(stdout))
+        compressed = stdout.read_bytes()
+        self.assertFalse(compress(stdout, 'xz'))
+        self.assertEqual(stdout.read_bytes(), compressed)
+        self.assertEqual(list(self.folder.iterdir()), [stdout])
+
+    def test_vw_artifacts_are_compressed(self):
+        vw = Vw(self.folder.joinpath('cache'), procs=2, handler=None, compression='gzip')
+        inputs = ['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json']
+        job = vw.train(inputs, '--cb_explore_adf --dsjson', ['-p'])
+        vw.close()
+        for task in job:
+            self.assertEqual(detect(task.stdout.path), 'gzip')
+            self.assertEqual(detect(task.outputs['-p']), 'gzip')
+            self.assertIsNone(detect(task.outputs['-f']))
+            with gzip.open(task.outputs['-p'], 'rt') as f:
+                self.assertEqual(len(list(task.predictions('-p').cb)), len([l for l in f if l.strip()]))
+
+        cached = Vw(self.folder.joinpath('cache'), procs=2, handler=None, compression='gzip').train(
+            inputs, '--cb_explore_adf --dsjson', ['-p'])
+        self.assertEqual(cached.status, ExecutionStatus.Success)
+        self.assertEqual(cached.loss, job.loss)
+        self.assertEqual(len(cached[1].loss_table), len(job[1].loss_table))
+
+
+if __name__ == '__main__':
+    unittest.main()
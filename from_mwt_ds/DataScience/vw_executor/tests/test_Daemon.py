@@ -0,0 +1,102 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from vw_executor.daemon import Daemon, default_socket, call
+from vw_executor.vw import Vw, ExecutionStatus
+from vw_executor.vw_opts import Grid
+
+
+class TestDaemon(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    @classmethod
+    def setUpClass(cls):
+        import multiprocessing
+        multiprocessing.set_start_method('spawn', force=True)
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_daemon')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+
+    def test_requests_are_served_round_robin(self):
+        daemon = Daemon(self.cache, procs=1)
+        try:
+            requests = [daemon.submit(c, {'i': i}) for c, i in [('a', 0), ('a', 1), ('a', 2), ('b', 3)]]
+            requests[1].cancelled = True
+            order = []
+            while True:
+                request = daemon._next()
+                if request is None:
+                    break
+                order.append(request.descriptor['i'])
+            self.assertEqual(order, [0, 3, 2])
+        finally:
+            daemon.core.close()
+
+    def test_jobs_are_executed_by_daemon(self):
+        with Daemon(self.cache, procs=2) as daemon:
+            vw = Vw(self.cache, procs=4, handler=None, daemon=True)
+            result = vw.train([self.input1, self.input2], Grid({'#base': ['--cb_explore_adf --dsjson'],
+                                                                '--power_t': [0, 0.5]}))
+            for job in result:
+                self.assertEqual(job.status, ExecutionStatus.Success)
+                self.assertIsNotNone(job.loss)
+            stats = vw._vw.stats()
+            self.assertEqual(stats['completed'], 4)
+            self.assertEqual(stats['failed'], 0)
+            self.assertEqual(stats['queued'], 0)
+            self.assertEqual(stats['running'], 0)
+        self.assertFalse(default_socket(self.cache).exists())
+
+    def test_binary_daemon(self):
+        with Daemon(self.cache, f'{sys.executable} vw_executor/tests/vw_stub.py', procs=2):
+            result = Vw(self.cache, handler=None, daemon=default_socket(self.cache)).test(
+                [self.input1, self.input2], '--cb_explore_adf --dsjson')
+            self.assertEqual(result.status, ExecutionStatus.Success)
+            self.assertIsNotNone(result[1].loss)
+
+    def test_cancel_stops_remote_tasks(self):
+        os.environ['VW_STUB_DELAY'] = '0.1'
+        try:
+            with Daemon(self.cache, f'{sys.executable} vw_executor/tests/vw_stub.py', procs=1) as daemon:
+                vw = Vw(self.cache, procs=2, handler=None, daemon=True)
+                result = []
+                thread = threading.Thread(target=lambda: result.append(
+                    vw.test([self.input1], Grid({'#base': ['--cb_explore_adf --dsjson'], '--power_t': [0, 0.5]}))))
+                thread.start()
+                deadline = time.monotonic() + 10
+                while daemon.stats()['running'] + daemon.stats()['queued'] < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                start = time.monotonic()
+                vw.cancel()
+                thread.join(5)
+                self.assertLess(time.monotonic() - start, 3)
+                self.assertEqual([job.status for job in result[0]], [ExecutionStatus.Stopped] * 2)
+                self.assertEqual(daemon.stats()['running'], 0)
+        finally:
+            os.environ.pop('VW_STUB_DELAY')
+
+    def test_cli(self):
+        process = subprocess.Popen([sys.executable, '-m', 'vw_executor', 'daemon', str(self.cache), '--procs', '1'])
+        try:
+            for _ in range(100):
+                if default_socket(self.cache).exists():
+                    break
+                time.sleep(0.1)
+            result = Vw(self.cache, handler=None, daemon=True).test(self.input1, '--cb_explore_adf --dsjson')
+            self.assertEqual(result.status, ExecutionStatus.Success)
+            self.assertEqual(call(default_socket(self.cache), {'type': 'stats'})['completed'], 1)
+        finally:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+from vw_executor.eviction import collect, parse_size
+from vw_executor.vw import Vw, ExecutionStatus
+from vw_executor.vw_cache import VwCache
+
+
+def _artifact(cache, context, name, size, age):
+    path = cache.path.joinpath(context, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'0' * size)
+    timestamp = time.time() - age
+    os.utime(path, (timestamp, timestamp))
+    return f'{context}/{name}'
+
+
+class TestEviction(unittest.TestCase):
+    folder = Path('.vw_cache_eviction')
+
+    def setUp(self):
+        if self.folder.exists():
+            shutil.rmtree(self.folder)
+        self.cache = VwCache(self.folder, eviction=True)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('100'), 100)
+        self.assertEqual(parse_size('1.5K'), 1536)
+        self.assertEqual(parse_size('20G'), 20 * 1024 ** 3)
+        self.assertEqual(parse_size('3mb'), 3 * 1024 ** 2)
+
+    def test_lru(self):
+        paths = [_artifact(self.cache, 'cache-f', f'model{i}', 100, 1000 - i) for i in range(5)]
+        _artifact(self.cache, 'cache-p', 'predictions', 1000, 1000)
+        self.cache.index.touch([paths[0]])
+        deleted = collect(self.cache, {'-f': 250, '-p': 1000})
+        self.assertEqual(deleted, paths[1:4])
+        self.assertTrue(self.cache.path.joinpath(paths[0]).exists())
+        self.assertTrue(self.cache.path.joinpath('cache-p', 'predictions').exists())
+
+    def test_pins_leases_and_pending_files_are_kept(self):
+        paths = [_artifact(self.cache, 'cache-f', f'model{i}', 100, 1000 - i) for i in range(4)]
+        _artifact(self.cache, 'cache-f', 'model3.pending', 100, 0)
+        self.cache.index.pin('experiment', [paths[0]])
+        lease = self.cache.index.lease([paths[1]])
+        os.utime(self.cache.path.joinpath(paths[1]), (0, 0))
+        self.assertEqual(collect(self.cache, {'-f': 0}, grace=0), [paths[2]])
+
+        self.cache.index.release(lease)
+        self.cache.index.unpin('experiment')
+        self.assertEqual(collect(self.cache, {'-f': 0}, grace=0), [paths[0], paths[1]])
+
+    def test_leases_of_dead_processes_expire(self):
+        path = _artifact(self.cache, 'cache-f', 'model', 100, 1000)
+        subprocess.run([sys.executable, '-c',
+                        f'from vw_executor.index import RunIndex; RunIndex("{self.cache.index.path}").lease(["{path}"])'],
+                       check=True, env=dict(os.environ, PYTHONPATH='.'))
+        self.assertEqual(collect(self.cache, {'-f': 0}, grace=0), [path])
+
+    def test_max_deletes_and_grace(self):
+        paths = [_artifact(self.cache, 'cache-f', f'model{i}', 100, 1000 - i) for i in range(4)]
+        _artifact(self.cache, 'cache-f', 'fresh', 100, 0)
+        self.assertEqual(collect(self.cache, {'-f': 0}, max_deletes=1), paths[:1])
+        self.assertEqual(collect(self.cache, {'-f': 0}), paths[1:])
+
+    def test_evicted_artifacts_are_recomputed(self):
+        vw = Vw(self.folder, procs=2, handler=None)
+        inputs = ['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json']
+        job = vw.train(inputs, '--cb_explore_adf --dsjson')
+        vw.pin('experiment', job)
+        self.assertEqual(collect(self.cache, {'-f': 0, None: 0}, grace=0), [])
+
+        vw.unpin('experiment')
+        self.assertEqual(len(collect(self.cache, {'-f': 0}, grace=0)), 2)
+        again = vw.train(inputs, '--cb_explore_adf --dsjson')
+        self.assertEqual(again.status, ExecutionStatus.Success)
+        self.assertEqual(again.loss, job.loss)
+        self.assertTrue(again[1].outputs['-f'].exists())
+
+    def test_artifacts_are_leased_only_if_evictable(self):
+        def accessed():
+            return self.cache.index._connect().execute('SELECT COUNT(*) FROM access').fetchone()[0]
+
+        shutil.rmtree(self.folder)
+        self.cache = VwCache(self.folder)
+        inputs = ['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json']
+        Vw(self.folder, handler=None).train(inputs, '--cb_explore_adf --dsjson')
+        self.assertEqual(accessed(), 0)
+        with self.assertRaises(ValueError):
+            collect(self.cache, {'-f': 0})
+        self.assertFalse(self.cache.evictable)
+
+        Vw(self.folder, handler=None, eviction=True)
+        self.assertTrue(self.cache.evictable)
+        # other processes that open the folder lease artifacts too
+        Vw(self.folder, handler=None).train(inputs, '--cb_explore_adf --dsjson --epsilon 0.1')
+        self.assertGreater(accessed(), 0)
+        self.assertEqual(len(collect(self.cache, {'-f': 0}, grace=0)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
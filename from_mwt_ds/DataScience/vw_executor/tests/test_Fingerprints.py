@@ -0,0 +1,73 @@
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+from vw_executor import fingerprints
+from vw_executor.fingerprints import Fingerprints, fingerprint
+from vw_executor.vw import Vw, ExecutionStatus
+
+
+def _reset(folder):
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+
+
+class TestFingerprints(unittest.TestCase):
+    folder = Path('.vw_cache_fingerprints')
+
+    def setUp(self):
+        _reset(self.folder)
+
+    def _write(self, name, content):
+        path = self.folder.joinpath(name)
+        path.write_text(content)
+        return path
+
+    def test_content_defines_fingerprint(self):
+        first = self._write('first.txt', 'abc')
+        second = self._write('second.txt', 'abd')
+        third = self._write('third.txt', 'abc')
+        self.assertNotEqual(fingerprint(first), fingerprint(second))
+        self.assertEqual(fingerprint(first), fingerprint(third))
+
+    def test_file_is_hashed_once(self):
+        path = self._write('input.txt', 'abc')
+        memo = self.folder.joinpath('memo.json')
+        with mock.patch.object(fingerprints, 'fingerprint', wraps=fingerprint) as hashed:
+            digest = Fingerprints(memo).get(path)
+            self.assertEqual(Fingerprints(memo).get(path), digest)
+            self.assertEqual(hashed.call_count, 1)
+
+            path.write_text('abd')
+            self.assertNotEqual(Fingerprints(memo).get(path), digest)
+            self.assertEqual(hashed.call_count, 2)
+
+    def test_prefetch(self):
+        paths = [self._write(f'{i}.txt', str(i)) for i in range(8)]
+        memo = Fingerprints(self.folder.joinpath('memo.json'))
+        memo.prefetch(paths)
+        expected = [fingerprint(p) for p in paths]
+        with mock.patch.object(fingerprints, 'fingerprint', wraps=fingerprint) as hashed:
+            restored = Fingerprints(self.folder.joinpath('memo.json'))
+            restored.prefetch(paths)
+            self.assertEqual([restored.get(p) for p in paths], expected)
+            self.assertEqual(hashed.call_count, 0)
+
+    def test_same_size_inputs_do_not_share_results(self):
+        lines = Path('vw_executor/tests/data/cb_0.json').read_text().splitlines(keepends=True)
+        first = self.folder.joinpath('first.json')
+        second = self.folder.joinpath('second.json')
+        first.write_text(''.join(lines))
+        second.write_text(''.join(reversed(lines)))
+        self.assertEqual(first.stat().st_size, second.stat().st_size)
+
+        vw = Vw(self.folder.joinpath('cache'), procs=1, handler=None)
+        results = [vw.test(i, '--cb_explore_adf --dsjson') for i in [first, second]]
+        for job in results:
+            self.assertEqual(job.status, ExecutionStatus.Success)
+        self.assertNotEqual(results[0][0].stdout.path, results[1][0].stdout.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import multiprocessing
+import shutil
+import sqlite3
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from vw_executor.index import RunIndex
+from vw_executor.vw import Vw, ExecutionStatus
+
+
+def _reset(folder):
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+
+
+def _write(path, writer, count):
+    index = RunIndex(path)
+    for i in range(count):
+        index.record(f'{writer}/{i}', f'--epsilon {i}', f'hash{i}', 'input', 'fingerprint', 'Success', 1.0,
+                     i / count, {'n': i}, {'-p': (f'cache-p/{writer}{i}', 10)})
+
+
+class TestRunIndex(unittest.TestCase):
+    folder = Path('.vw_cache_index')
+
+    def setUp(self):
+        _reset(self.folder)
+
+    def test_query(self):
+        path = self.folder.joinpath('index.sqlite')
+        _write(path, 'a', 10)
+        index = RunIndex(path)
+        self.assertEqual(len(index.query()), 10)
+        self.assertEqual(len(index.query('loss < ?', [0.5])), 5)
+        self.assertEqual(list(index.query(opts_hash='hash3').key), ['a/3'])
+        self.assertEqual(index.status('a/3'), 'Success')
+        self.assertIsNone(index.status('b/3'))
+
+    def test_record_replaces_unless_asked(self):
+        index = RunIndex(self.folder.joinpath('index.sqlite'))
+        index.record('key', '', '', None, None, 'Failed', None, None, None, {})
+        index.record('key', '', '', None, None, 'Success', None, None, None, {}, replace=False)
+        self.assertEqual(index.status('key'), 'Failed')
+        index.record('key', '', '', None, None, 'Success', None, None, None, {})
+        self.assertEqual(index.status('key'), 'Success')
+
+    def test_resource_usage(self):
+        path = self.folder.joinpath('index.sqlite')
+        connection = sqlite3.connect(str(path))
+        connection.execute('CREATE TABLE runs (key TEXT PRIMARY KEY, opts TEXT NOT NULL, opts_hash TEXT NOT NULL, '
+                           'input TEXT, fingerprint TEXT, status TEXT NOT NULL, runtime_s REAL, loss REAL, '
+                           'metrics TEXT, artifacts TEXT, finished_at REAL NOT NULL)')
+        connection.execute("INSERT INTO runs VALUES ('old', '', '', NULL, NULL, 'Success', NULL, NULL, NULL, '{}', 0)")
+        connection.commit()
+        connection.close()
+        index = RunIndex(path)
+        self.assertEqual(index.run('old'), ('Success', {}))
+        index.record('new', '', '', None, None, 'Success', 1.0, 0.5, None, {}, resource_usage={'max_rss': 10})
+        self.assertEqual(index.run('new'), ('Success', {'max_rss': 10}))
+        self.assertIsNone(index.run('missing'))
+
+    def test_concurrent_writers(self):
+        path = self.folder.joinpath('index.sqlite')
+        RunIndex(path)
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=_write, args=(path, f'p{i}', 50)) for i in range(3)]
+        for p in processes:
+            p.start()
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda i: _write(path, f't{i}', 50), range(4)))
+        for p in processes:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+        self.assertEqual(len(RunIndex(path).query()), 7 * 50)
+
+    def test_vw_runs_are_indexed(self):
+        vw = Vw(self.folder.joinpath('cache'), procs=2, handler=None)
+        grid = [f'--cb_explore_adf --dsjson --epsilon {e}' for e in [0.1, 0.2]]
+        jobs = vw.train(['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json'], grid, ['-p'])
+        runs = vw.runs(status='Success')
+        self.assertEqual(len(runs), 4)
+        for job in jobs:
+            last = runs[runs.key == job[-1]._index_key].iloc[0]
+            self.assertEqual(last.loss, job[-1].loss)
+            self.assertEqual(last.opts, str(job.opts))
+            self.assertIn('"-p"', last.artifacts)
+
+        vw._cache.index.record(jobs[0][0]._index_key, str(jobs[0].opts), jobs[0].opts.hash(), None, None,
+                               'Failed', None, None, None, {})
+        cached = vw.train(['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json'], grid, ['-p'])
+        self.assertEqual(cached[0][0].status, ExecutionStatus.Failed)
+        self.assertEqual(cached[1].status, ExecutionStatus.Success)
+
+
+if __name__ == '__main__':
+    unittest.main()
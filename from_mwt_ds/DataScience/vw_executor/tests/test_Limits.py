@@ -0,0 +1,189 @@
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from vw_executor.vw import Vw, ExecutionStatus, _VwBin, Limits
+from vw_executor.vw_opts import Grid
+
+
+class _FlakyVwBin(_VwBin):
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+        self.calls = 0
+
+    def run(self, args, out_path, monitor=None, timeout=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError('Transient failure')
+        return super().run(args, out_path, monitor, timeout)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            return not any(line.startswith('State:') and 'Z' in line for line in f)
+    except FileNotFoundError:
+        return False
+
+
+class TestLimits(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+    vw_path = f'{sys.executable} vw_executor/tests/vw_stub.py'
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_limits')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+        os.environ['VW_STUB_DELAY'] = '0.05'
+
+    def tearDown(self):
+        os.environ.pop('VW_STUB_DELAY')
+
+    def test_delay(self):
+        limits = Limits(backoff=0.5)
+        self.assertEqual([limits.delay(i) for i in range(3)], [0.5, 1, 2])
+
+    def test_task_timeout(self):
+        vw = Vw(self.cache, self.vw_path, handler=None, task_timeout=0.5)
+        start = time.monotonic()
+        result = vw.test(self.input1, '--cb_explore_adf --dsjson')
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(result.status, ExecutionStatus.Timeout)
+        self.assertEqual(result[0].status, ExecutionStatus.Timeout)
+        self.assertFalse(result[0].stdout.path.exists())
+
+    def test_task_timeout_async(self):
+        import asyncio
+        vw = Vw(self.cache, self.vw_path, handler=None, task_timeout=0.5)
+        result = asyncio.run(vw.test_async(self.input1, '--cb_explore_adf --dsjson'))
+        self.assertEqual(result[0].status, ExecutionStatus.Timeout)
+
+    @unittest.skipUnless(os.path.exists('/proc'), 'requires procfs')
+    def test_cancelled_async_task_is_killed(self):
+        import asyncio
+
+        async def run():
+            vw = Vw(self.cache, self.vw_path, handler=None)
+            task = asyncio.ensure_future(vw.test_async(self.input1, '--cb_explore_adf --dsjson'))
+            while not vw._vw._processes:
+                await asyncio.sleep(0.01)
+            pid = next(iter(vw._vw._processes)).pid
+            start = time.monotonic()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertLess(time.monotonic() - start, 0.5)
+            return pid
+
+        pid = asyncio.run(run())
+        deadline = time.monotonic() + 3
+        while _is_alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(_is_alive(pid))
+
+    def test_job_timeout(self):
+        vw = Vw(self.cache, self.vw_path, handler=None, job_timeout=0.5, retries=3, retry_backoff=0.1)
+        start = time.monotonic()
+        result = vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(result.status, ExecutionStatus.Timeout)
+        self.assertEqual(result[0].attempts, 1)
+        self.assertEqual(result[1].status, ExecutionStatus.NotStarted)
+
+    @unittest.skipUnless(os.path.exists('/proc'), 'requires procfs')
+    def test_process_group_is_killed(self):
+        pid_file = Path('.vw_stub_child')
+        os.environ['VW_STUB_CHILD'] = str(pid_file)
+        try:
+            vw = Vw(self.cache, self.vw_path, handler=None, task_timeout=0.5)
+            result = vw.test(self.input1, '--cb_explore_adf --dsjson')
+            self.assertEqual(result.status, ExecutionStatus.Timeout)
+            self.assertFalse(_is_alive(int(pid_file.read_text())))
+        finally:
+            os.environ.pop('VW_STUB_CHILD')
+            pid_file.unlink()
+
+    @unittest.skipUnless(os.path.exists('/proc') and hasattr(signal, 'pthread_kill'), 'requires procfs')
+    def test_interrupted_grid_kills_processes(self):
+        vw = Vw(self.cache, self.vw_path, procs=2, handler=None)
+        pids = []
+
+        def interrupt():
+            deadline = time.monotonic() + 10
+            while len(vw._vw._processes) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            pids.extend(p.pid for p in list(vw._vw._processes))
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+
+        threading.Thread(target=interrupt, daemon=True).start()
+        start = time.monotonic()
+        try:
+            with self.assertRaises(KeyboardInterrupt):
+                vw.train([self.input1], Grid({'#base': ['--cb_explore_adf --dsjson'], '--power_t': [0, 0.5]}))
+            self.assertEqual(len(pids), 2)
+            while any(_is_alive(pid) for pid in pids) and time.monotonic() - start < 3:
+                time.sleep(0.05)
+            self.assertFalse(any(_is_alive(pid) for pid in pids))
+        finally:
+            vw.close()
+
+    def test_interrupted_pyvw_grid_kills_workers(self):
+        with tempfile.TemporaryDirectory() as folder:
+            large = Path(folder).joinpath('large.json')
+            large.write_text(Path(self.input1).read_text() * 300)
+            vw = Vw(self.cache, procs=2, handler=None)
+            pids = []
+
+            def interrupt():
+                deadline = time.monotonic() + 10
+                while len(vw._vw.workers._busy) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                pids.extend(w.process.pid for w in list(vw._vw.workers._busy))
+                signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+
+            threading.Thread(target=interrupt, daemon=True).start()
+            start = time.monotonic()
+            try:
+                with self.assertRaises(KeyboardInterrupt):
+                    vw.train([str(large)], Grid({'#base': ['--cb_explore_adf --dsjson'], '--power_t': [0, 0.5]}))
+                self.assertEqual(len(pids), 2)
+                while any(_is_alive(pid) for pid in pids) and time.monotonic() - start < 3:
+                    time.sleep(0.05)
+                self.assertFalse(any(_is_alive(pid) for pid in pids))
+            finally:
+                vw.close()
+            self.assertLess(time.monotonic() - start, 5)
+
+    def test_failed_exit_is_retried(self):
+        vw = Vw(self.cache, self.vw_path, handler=None, retries=1, retry_backoff=0.01)
+        result = vw.test(self.input1, '--cb_explore_adf --dsjson --unknown_option')
+        self.assertEqual(result.status, ExecutionStatus.Failed)
+        self.assertEqual(result[0].attempts, 2)
+        self.assertTrue(result[0].stdout.path.exists())
+
+    def test_transient_failures_are_retried(self):
+        os.environ['VW_STUB_DELAY'] = '0'
+        vw = Vw(self.cache, self.vw_path, handler=None, retries=2, retry_backoff=0.01)
+        vw._vw = _FlakyVwBin(vw._vw.path, 2)
+        result = vw.test(self.input1, '--cb_explore_adf --dsjson')
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertEqual(result[0].attempts, 3)
+
+    def test_retries_are_bounded(self):
+        vw = Vw(self.cache, self.vw_path, handler=None, retries=1, retry_backoff=0.01)
+        vw._vw = _FlakyVwBin(vw._vw.path, 2)
+        result = vw.test(self.input1, '--cb_explore_adf --dsjson')
+        self.assertEqual(result.status, ExecutionStatus.Failed)
+        self.assertEqual(result[0].attempts, 2)
+        self.assertEqual(vw._vw.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
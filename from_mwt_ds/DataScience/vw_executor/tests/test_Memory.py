@@ -0,0 +1,170 @@
+import asyncio
+import json
+import shutil
+import sys
+import unittest
+from pathlib import Path
+from vw_executor.memory import MemoryEstimator, MemoryBudget
+from vw_executor.pool import FuturesPool
+from vw_executor.scheduler import Scheduler
+from vw_executor.tests.test_Scheduler import _FakeJob, _Concurrency
+from vw_executor.vw import Vw, ExecutionStatus
+
+_MB = 1024 ** 2
+
+
+class _Usage:
+    def __init__(self, max_rss):
+        self.resource_usage = {'max_rss': max_rss}
+
+
+class _SizedJob(_FakeJob):
+    def __init__(self, name, size, opts, events, concurrency):
+        super().__init__(name, size, False, events, concurrency)
+        self.opts = opts
+
+    def __getitem__(self, i):
+        return _Usage(None)
+
+
+class TestMemoryEstimator(unittest.TestCase):
+    def test_estimate_grows_with_bits(self):
+        estimator = MemoryEstimator(overhead=0)
+        self.assertEqual(estimator.estimate('-b 10'), 2 ** 10 * 16)
+        self.assertEqual(estimator.estimate('-b 20'), 2 ** 20 * 16)
+        self.assertEqual(estimator.estimate({'--cb_explore_adf': None}), 2 ** 18 * 16)
+
+    def test_estimate_grows_with_reductions(self):
+        estimator = MemoryEstimator(overhead=0)
+        self.assertEqual(estimator.estimate('-b 10 --oaa 10'), 2 ** 10 * 256)
+        self.assertEqual(estimator.estimate('-b 10 --coin'), 2 ** 10 * 32)
+
+    def test_observe_corrects_estimate(self):
+        estimator = MemoryEstimator(overhead=0)
+        base = estimator.estimate('-b 10')
+        estimator.observe('-b 10', base * 3)
+        estimator.observe('-b 10', base * 2)
+        self.assertEqual(estimator.estimate('-b 10'), base * 3)
+        self.assertEqual(estimator.estimate('-b 10 -q ::'), base)
+        estimator.observe('-b 10', None)
+        self.assertEqual(estimator.estimate('-b 10'), base * 3)
+
+    def test_outliers_and_old_runs_are_forgotten(self):
+        estimator = MemoryEstimator(overhead=0, window=10)
+        base = estimator.estimate('-b 10')
+        estimator.observe('-b 10', base * 5)
+        for _ in range(9):
+            estimator.observe('-b 10', base * 2)
+        self.assertEqual(estimator.estimate('-b 10'), base * 2)
+        for _ in range(10):
+            estimator.observe('-b 10', base)
+        self.assertEqual(estimator.estimate('-b 10'), base)
+
+    def test_load(self):
+        estimator = MemoryEstimator(overhead=0)
+        base = estimator.estimate('-b 10')
+        estimator.load([('-b 10', base * 2), ('-b 10', None)])
+        self.assertEqual(estimator.estimate('-b 10'), base * 2)
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def test_admission(self):
+        budget = MemoryBudget(100 * _MB, MemoryEstimator(overhead=40 * _MB))
+        first = budget.try_acquire('-b 10', 0)
+        second = budget.try_acquire('-b 10', 1)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(budget.try_acquire('-b 10', 2))
+        budget.release('-b 10', first, None)
+        self.assertIsNotNone(budget.try_acquire('-b 10', 1))
+
+    def test_single_task_is_always_admitted(self):
+        budget = MemoryBudget(_MB)
+        self.assertIsNotNone(budget.try_acquire('-b 30', 0))
+        self.assertIsNone(budget.try_acquire('-b 10', 1))
+
+    def test_scheduler_respects_budget(self):
+        events = []
+        concurrency = _Concurrency()
+        first = _SizedJob('first', 4, '-b 24', events, concurrency)
+        second = _SizedJob('second', 4, '-b 24', events, concurrency)
+        estimator = MemoryEstimator(overhead=0)
+        budget = MemoryBudget(2 * 2 ** 24 * 16, estimator)
+        pool = FuturesPool(4)
+        try:
+            finished = list(Scheduler(pool, budget).run([first, second], False))
+        finally:
+            pool.close()
+        self.assertEqual(len(finished), 2)
+        self.assertEqual(concurrency.max, 2)
+        self.assertEqual(budget.in_use, 0)
+
+
+class TestResourceUsage(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    def test_binary_run_reports_max_rss(self):
+        cache = Path('.vw_cache_memory')
+        if cache.exists():
+            shutil.rmtree(cache)
+        vw = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', procs=2, handler=None,
+                memory_budget=1024 * _MB)
+        result = vw.test(self.input1, ['--cb_explore_adf --dsjson', '--cb_explore_adf --dsjson -b 10'])
+        for job in result:
+            self.assertEqual(job.status, ExecutionStatus.Success)
+            self.assertGreater(job[0].resource_usage['max_rss'], 0)
+        self.assertEqual(vw.memory_budget.in_use, 0)
+
+        restarted = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None,
+                       memory_budget=1024 * _MB)
+        for job in result:
+            self.assertEqual(restarted.memory_budget.estimator.estimate(job.opts),
+                             vw.memory_budget.estimator.estimate(job.opts))
+
+    def _assert_usage(self, usage):
+        self.assertEqual(set(usage), {'user_cpu_s', 'sys_cpu_s', 'max_rss', 'block_input', 'block_output',
+                                      'voluntary_switches', 'involuntary_switches'})
+        self.assertGreater(usage['user_cpu_s'] + usage['sys_cpu_s'], 0)
+        self.assertGreater(usage['max_rss'], 1024 * 1024)
+
+    def test_usage_is_persisted(self):
+        cache = Path('.vw_cache_usage')
+        if cache.exists():
+            shutil.rmtree(cache)
+        vw = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None)
+        job = vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        for task in job:
+            self._assert_usage(task.resource_usage)
+        self.assertAlmostEqual(job.resource_usage['user_cpu_s'], sum(t.resource_usage['user_cpu_s'] for t in job))
+        self.assertEqual(job.resource_usage['max_rss'], max(t.resource_usage['max_rss'] for t in job))
+
+        reloaded = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None).train(
+            [self.input1, self.input2], '--cb_explore_adf --dsjson')
+        self.assertEqual([t.attempts for t in reloaded], [0, 0])
+        self.assertEqual([t.resource_usage for t in reloaded], [t.resource_usage for t in job])
+        self.assertEqual(json.loads(vw.runs().resource_usage[0]), job[0].resource_usage)
+
+    def test_async_binary_usage(self):
+        cache = Path('.vw_cache_usage_async')
+        if cache.exists():
+            shutil.rmtree(cache)
+        vw = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None)
+        job = asyncio.run(vw.test_async(self.input1, '--cb_explore_adf --dsjson'))
+        self.assertEqual(job.status, ExecutionStatus.Success)
+        self._assert_usage(job[0].resource_usage)
+
+    def test_pyvw_usage(self):
+        cache = Path('.vw_cache_usage_pyvw')
+        if cache.exists():
+            shutil.rmtree(cache)
+        with Vw(cache, procs=2, handler=None) as vw:
+            single = vw.test(self.input1, '--cb_explore_adf --dsjson')
+            vw.batch_size = 2
+            batched = vw.test(self.input1, ['--cb_explore_adf --dsjson -l 0.1', '--cb_explore_adf --dsjson -l 0.2'])
+        for task in [single[0]] + [job[0] for job in batched]:
+            self._assert_usage(task.resource_usage)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import shutil
+import unittest
+import numpy as np
+from pathlib import Path
+from vw_executor.vw import Vw
+from vw_executor.optimizer import Optimizer, real, integer, categorical
+
+
+class TestOptimizer(unittest.TestCase):
+    inputs = ['vw_executor/tests/data/cb_100_0.json', 'vw_executor/tests/data/cb_100_1.json']
+    space = [
+        real('--learning_rate', 1e-3, 10, log=True),
+        integer('-b', 10, 18),
+        categorical('--cb_type', ['ips', 'mtr', 'dr'])
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        import multiprocessing
+        multiprocessing.set_start_method('spawn', force=True)
+
+    def test_dimensions(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            lr = self.space[0].sample(rng)
+            self.assertTrue(1e-3 <= lr <= 10)
+            self.assertAlmostEqual(self.space[0].from_unit(self.space[0].to_unit(lr)), lr)
+            b = self.space[1].sample(rng)
+            self.assertTrue(isinstance(b, int) and 10 <= b <= 18)
+            self.assertIn(self.space[2].sample(rng), ['ips', 'mtr', 'dr'])
+
+    def test_search_is_resumed(self):
+        cache = Path('.vw_cache_optimizer')
+        if cache.exists():
+            shutil.rmtree(cache)
+        with Vw(cache, procs=2, handler=None) as vw:
+            optimizer = Optimizer(vw, self.inputs, self.space, {'#base': '--cb_explore_adf --dsjson'},
+                                  n_initial=2, seed=0)
+            result = optimizer.run(3)
+            self.assertEqual(len(result), 6)
+            self.assertEqual(len({optimizer.to_opts(p).hash() for p, _ in optimizer.history}), 6)
+            self.assertIsNotNone(optimizer.best)
+
+            restarted = Optimizer(vw, self.inputs, self.space, {'#base': '--cb_explore_adf --dsjson'},
+                                  n_initial=2, seed=0)
+            self.assertEqual(len(restarted.history), 6)
+            self.assertEqual(len(restarted.run(1)), 8)
+
+    def test_failed_points_are_not_best(self):
+        cache = Path('.vw_cache_optimizer')
+        if cache.exists():
+            shutil.rmtree(cache)
+        with Vw(cache, procs=2, handler=None) as vw:
+            optimizer = Optimizer(vw, self.inputs, self.space, {'#base': '--cb_explore_adf --dsjson'},
+                                  n_initial=1, seed=0)
+            optimizer.tell({'--learning_rate': 0.1, '-b': 12, '--cb_type': 'ips'}, None)
+            self.assertIsNone(optimizer.best)
+            # failed points are not observations, so the next batch is still sampled randomly
+            self.assertEqual(len(optimizer.ask(2)), 2)
+            optimizer.tell({'--learning_rate': 1.0, '-b': 14, '--cb_type': 'mtr'}, 0.5)
+            self.assertEqual(optimizer.best['-b'], 14)
+
+            other = Optimizer(vw, self.inputs[:1], self.space, {'#base': '--cb_explore_adf --dsjson'})
+            self.assertEqual(len(other.history), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import time
+import unittest
+from threading import Event
+from vw_executor.pool import WorkerPool, FuturesPool, SeqPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import multiprocessing
+        multiprocessing.set_start_method('spawn', force=True)
+
+    def test_workers_are_reused(self):
+        pool = WorkerPool(1)
+        try:
+            pid = pool.apply(os.getpid)
+            self.assertNotEqual(pid, os.getpid())
+            self.assertEqual(pool.apply(os.getpid), pid)
+        finally:
+            pool.close()
+
+    def test_workers_are_recycled(self):
+        pool = WorkerPool(1, max_tasks=2)
+        try:
+            pids = [pool.apply(os.getpid) for _ in range(4)]
+            self.assertEqual(pids[0], pids[1])
+            self.assertEqual(pids[2], pids[3])
+            self.assertNotEqual(pids[1], pids[2])
+        finally:
+            pool.close()
+
+    def test_timeout_kills_worker(self):
+        pool = WorkerPool(1)
+        try:
+            pid = pool.apply(os.getpid)
+            with self.assertRaises(TimeoutError):
+                pool.apply(time.sleep, 5, timeout=0.2)
+            self.assertNotEqual(pool.apply(os.getpid), pid)
+        finally:
+            pool.close()
+
+    def test_error_is_propagated(self):
+        pool = WorkerPool(1)
+        try:
+            with self.assertRaises(RuntimeError):
+                pool.apply(int, 'not a number')
+            self.assertEqual(pool.apply(int, '1'), 1)
+        finally:
+            pool.close()
+
+    def test_closed_pool(self):
+        pool = WorkerPool(1)
+        pool.apply(os.getpid)
+        pool.close()
+        with self.assertRaises(RuntimeError):
+            pool.apply(os.getpid)
+
+
+def _sleep_and_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+class TestFuturesPool(unittest.TestCase):
+    def test_map(self):
+        pool = FuturesPool(2)
+        try:
+            self.assertEqual(pool.map(_sleep_and_return, [(0.02,), (0,)]), [0.02, 0])
+            self.assertEqual(pool.map(_sleep_and_return, [(0,)]), [0])
+        finally:
+            pool.close()
+
+    def test_as_completed(self):
+        pool = FuturesPool(2)
+        try:
+            self.assertEqual(list(pool.as_completed(_sleep_and_return, [(0.2,), (0,)])), [0, 0.2])
+        finally:
+            pool.close()
+
+    def test_cancel(self):
+        pool = FuturesPool(1)
+        started = Event()
+        release = Event()
+
+        def blocking():
+            started.set()
+            release.wait()
+            return 'done'
+
+        try:
+            running = pool.submit(blocking)
+            started.wait()
+            pending = pool.submit(_sleep_and_return, 0)
+            pool.cancel()
+            release.set()
+            self.assertTrue(pending.cancelled())
+            self.assertEqual(running.result(), 'done')
+        finally:
+            pool.close()
+
+    def test_seq_pool_submit(self):
+        pool = SeqPool()
+        self.assertEqual(pool.submit(_sleep_and_return, 0).result(), 0)
+        with self.assertRaises(ValueError):
+            pool.submit(int, 'not a number').result()
+
+
+if __name__ == '__main__':
+    unittest.main()
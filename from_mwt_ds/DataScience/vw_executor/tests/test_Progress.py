@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import time
+import unittest
+from pathlib import Path
+from threading import Lock
+from vw_executor.handlers import HandlerBase
+from vw_executor.loggers import MultiLogger
+from vw_executor.progress import ProgressMonitor
+from vw_executor.vw import Vw, ExecutionStatus
+
+
+class _Recorder(HandlerBase):
+    def __init__(self):
+        self.calls = []
+        self.finished = {}
+        self._lock = Lock()
+
+    def on_task_finish(self, job, task_idx):
+        with self._lock:
+            self.finished[task_idx] = len(self.calls)
+
+    def on_task_progress(self, job, task_idx, rows):
+        with self._lock:
+            self.calls.append((task_idx, time.monotonic(), rows))
+
+
+class _Task:
+    def __init__(self, path):
+        self.stdout = type('Output', (), {'path': path})()
+        self.attempts = 1
+
+
+class _Job:
+    def __init__(self, path, handler):
+        self._tasks = [_Task(path)]
+        self._handler = handler
+        self._logger = MultiLogger([])
+        self._tracer = None
+        self.name = 'job'
+
+    def __getitem__(self, i):
+        return self._tasks[i]
+
+
+class TestProgressMonitor(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path('.vw_cache_progress')
+        shutil.rmtree(self.folder, ignore_errors=True)
+        self.folder.mkdir()
+
+    def test_rows_are_coalesced(self):
+        handler = _Recorder()
+        job = _Job(self.folder.joinpath('stdout'), handler)
+        monitor = ProgressMonitor(0.2)
+        start = time.monotonic()
+        monitor.add(job, 0)
+        with open(self.folder.joinpath('stdout.pending'), 'w') as f:
+            f.write('loss     last          counter\n')
+            for i in range(1, 41):
+                f.write(f'{1 / i} {1 / i} {i} {i}.0 a b 6\n')
+                f.flush()
+                time.sleep(0.02)
+            f.write('\nfinished run\naverage loss = 0.025\n')
+        os.replace(self.folder.joinpath('stdout.pending'), self.folder.joinpath('stdout'))
+        monitor.remove(job, 0)
+        elapsed = time.monotonic() - start
+        monitor.stop()
+
+        self.assertEqual([r[0] for _, _, rows in handler.calls for r in rows], [str(i) for i in range(1, 41)])
+        self.assertLessEqual(len(handler.calls), elapsed / 0.2 + 1)
+        self.assertGreaterEqual(len(handler.calls), 2)
+        times = [t for _, t, _ in handler.calls[:-1]]
+        self.assertTrue(all(b - a >= 0.15 for a, b in zip(times, times[1:])))
+
+    def test_cached_task_is_not_reported(self):
+        handler = _Recorder()
+        job = _Job(self.folder.joinpath('stdout'), handler)
+        shutil.copy('vw_executor/tests/data/artifacts/stdout_cb.txt', self.folder.joinpath('stdout'))
+        job[0].attempts = 0
+        monitor = ProgressMonitor(0.05)
+        monitor.add(job, 0)
+        time.sleep(0.1)
+        monitor.remove(job, 0)
+        monitor.stop()
+        self.assertEqual(handler.calls, [])
+
+
+class TestLiveProgress(unittest.TestCase):
+    def setUp(self):
+        self.cache = Path('.vw_cache_progress_vw')
+        shutil.rmtree(self.cache, ignore_errors=True)
+        os.environ['VW_STUB_DELAY'] = '0.02'
+
+    def tearDown(self):
+        os.environ.pop('VW_STUB_DELAY')
+
+    def test_progress_of_running_task(self):
+        handler = _Recorder()
+        with Vw(self.cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=handler,
+                progress_interval=0.1) as vw:
+            result = vw.train(['vw_executor/tests/data/cb_100_0.json'], '--cb_explore_adf --dsjson --progress 10')
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertGreater(handler.finished[0], 1)
+        self.assertEqual([r[0] for _, _, rows in handler.calls for r in rows], list(result[0].loss_table.index))
+
+
+if __name__ == '__main__':
+    unittest.main()
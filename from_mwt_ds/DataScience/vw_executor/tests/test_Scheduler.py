@@ -0,0 +1,129 @@
+import time
+import unittest
+from threading import Lock
+from vw_executor.pool import FuturesPool, SeqPool
+from vw_executor.scheduler import Scheduler
+
+
+class _FakeJob:
+    def __init__(self, name, size, chain, events, concurrency, fail_at=None):
+        self.name = name
+        self.size = size
+        self.chain = chain
+        self.events = events
+        self.concurrency = concurrency
+        self.fail_at = fail_at
+        self.failed = None
+
+    def __len__(self):
+        return self.size
+
+    def dependencies(self, i):
+        return [i - 1] if self.chain and i > 0 else []
+
+    def _start(self):
+        self.events.append((self.name, 'job_start'))
+
+    def _start_task(self, i):
+        self.events.append((self.name, 'task_start', i))
+
+    def _run_task(self, i, reset):
+        self.concurrency.enter()
+        time.sleep(0.05)
+        self.concurrency.leave()
+
+    def _finish_task(self, i):
+        self.events.append((self.name, 'task_finish', i))
+        if i == self.fail_at and self.failed is None:
+            self.failed = i
+
+    def _finish(self):
+        self.events.append((self.name, 'job_finish'))
+        return self
+
+
+class _Concurrency:
+    def __init__(self):
+        self.lock = Lock()
+        self.current = 0
+        self.max = 0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def leave(self):
+        with self.lock:
+            self.current -= 1
+
+
+class TestScheduler(unittest.TestCase):
+    def _run(self, pool, jobs_spec):
+        events = []
+        concurrency = _Concurrency()
+        jobs = [_FakeJob(name, size, chain, events, concurrency, fail_at) for name, size, chain, fail_at in jobs_spec]
+        try:
+            finished = list(Scheduler(pool).run(jobs, False))
+        finally:
+            pool.close()
+        return jobs, finished, events, concurrency
+
+    def _assert_consistent(self, job, events):
+        job_events = [e[1:] for e in events if e[0] == job.name]
+        self.assertEqual(job_events[0], ('job_start',))
+        self.assertEqual(job_events[-1], ('job_finish',))
+        finishes = [e[1] for e in job_events if e[0] == 'task_finish']
+        self.assertEqual(finishes, sorted(finishes))
+        return finishes
+
+    def test_independent_tasks_run_in_parallel(self):
+        jobs, finished, events, concurrency = self._run(FuturesPool(4), [('test', 8, False, None)])
+        self.assertEqual(finished, jobs)
+        self.assertEqual(concurrency.max, 4)
+        self.assertEqual(self._assert_consistent(jobs[0], events), list(range(8)))
+
+    def test_chained_tasks_run_sequentially(self):
+        jobs, finished, events, concurrency = self._run(FuturesPool(4), [('train', 4, True, None)])
+        self.assertEqual(concurrency.max, 1)
+        self.assertEqual(self._assert_consistent(jobs[0], events), list(range(4)))
+
+    def test_tasks_are_packed_across_jobs(self):
+        jobs, finished, events, concurrency = self._run(
+            FuturesPool(3), [('train1', 3, True, None), ('train2', 3, True, None), ('train3', 3, True, None)])
+        self.assertEqual(len(finished), 3)
+        self.assertEqual(concurrency.max, 3)
+        for job in jobs:
+            self.assertEqual(self._assert_consistent(job, events), list(range(3)))
+
+    def test_ready_tasks_are_batched(self):
+        events = []
+        concurrency = _Concurrency()
+        jobs = [_FakeJob(f'test{i}', 5, False, events, concurrency) for i in range(2)]
+        batches = []
+
+        def run_batch(tasks, reset):
+            batches.append([(job.name, i) for job, i in tasks])
+            for job, i in tasks:
+                job._run_task(i, reset)
+
+        pool = FuturesPool(2)
+        try:
+            finished = list(Scheduler(pool, batch_size=4, batch_runner=run_batch).run(jobs, False))
+        finally:
+            pool.close()
+        self.assertEqual(len(finished), 2)
+        # last tasks are either batched together or submitted one by one depending on free workers
+        self.assertEqual([len(b) for b in batches][:2], [4, 4])
+        self.assertLessEqual(sum(len(b) for b in batches), 10)
+        for job in jobs:
+            self.assertEqual(self._assert_consistent(job, events), list(range(5)))
+
+    def test_failed_task_stops_job(self):
+        jobs, finished, events, _ = self._run(SeqPool(), [('train', 4, True, 1), ('test', 2, False, None)])
+        self.assertEqual(self._assert_consistent(jobs[0], events), [0, 1])
+        self.assertEqual(self._assert_consistent(jobs[1], events), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import shutil
+import unittest
+from pathlib import Path
+from vw_executor.vw import Vw
+from vw_executor.vw_opts import Grid
+from vw_executor.search import successive_halving, hyperband
+
+
+class TestSearch(unittest.TestCase):
+    inputs = ['vw_executor/tests/data/cb_100_0.json', 'vw_executor/tests/data/cb_100_1.json']
+    grid = Grid({
+        '#base': ['--cb_explore_adf --dsjson'],
+        '--epsilon': [0.1, 0.2, 0.3, 0.4]
+    })
+
+    @classmethod
+    def setUpClass(cls):
+        import multiprocessing
+        multiprocessing.set_start_method('spawn', force=True)
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_search')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+
+    def test_successive_halving(self):
+        with Vw(self.cache, handler=None) as vw:
+            result = successive_halving(vw, self.inputs, self.grid, eta=2)
+        self.assertEqual(len(result), 4)
+        self.assertEqual(list(result['!Files']), [2, 2, 1, 1])
+        self.assertTrue(result.iloc[0]['!Loss'] <= result.iloc[1]['!Loss'])
+        # survivors reuse models trained on the first file
+        self.assertEqual(len(list(self.cache.joinpath('cache-f').iterdir())), 6)
+
+    def test_empty_opts(self):
+        with Vw(self.cache, handler=None) as vw:
+            with self.assertRaises(ValueError):
+                successive_halving(vw, self.inputs, [])
+            with self.assertRaises(ValueError):
+                hyperband(vw, self.inputs, [])
+
+    def test_hyperband(self):
+        with Vw(self.cache, handler=None) as vw:
+            result = hyperband(vw, self.inputs, self.grid, eta=2, seed=0)
+        self.assertEqual(set(result['!Bracket']), {0, 1})
+        self.assertEqual(result[result['!Bracket'] == 0]['!Files'].min(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import unittest
+from pathlib import Path
+from vw_executor.vw import Vw, ExecutionStatus
+from vw_executor.vw_cache import VwCache
+
+
+def _reset(folder):
+    if folder.exists():
+        shutil.rmtree(folder)
+
+
+class TestSharedCache(unittest.TestCase):
+    folder = Path('.vw_cache_shared')
+    inputs = ['vw_executor/tests/data/cb_0.json', 'vw_executor/tests/data/cb_1.json']
+    opts = '--cb_explore_adf --dsjson'
+
+    def setUp(self):
+        _reset(self.folder)
+        self.shared = self.folder.joinpath('shared')
+
+    def _vw(self, name):
+        return Vw(self.folder.joinpath(name), procs=2, handler=None, shared_cache=self.shared)
+
+    def test_artifacts_are_published_and_fetched(self):
+        first = self._vw('first')
+        job = first.train(self.inputs, self.opts, ['-p'])
+        first.close()
+        for task in job:
+            for p in task._result_paths():
+                self.assertTrue(self.shared.joinpath(p).exists())
+        self.assertEqual(list(self.shared.rglob('*.pending')), [])
+
+        second = self._vw('second')
+        fetched = second.train(self.inputs, self.opts, ['-p'])
+        second.close()
+        self.assertEqual(fetched.status, ExecutionStatus.Success)
+        self.assertEqual(fetched.loss, job.loss)
+        for task in fetched:
+            self.assertEqual(task.attempts, 0)
+            self.assertTrue(task.outputs['-p'].exists())
+
+    def test_local_tier_is_checked_first(self):
+        local = self._vw('local')
+        job = local.train(self.inputs, self.opts)
+        local.close()
+        shutil.rmtree(self.shared)
+        cached = self._vw('local').train(self.inputs, self.opts)
+        self.assertEqual(cached.loss, job.loss)
+        self.assertEqual([t.attempts for t in cached], [0, 0])
+
+    def test_shared_artifacts_are_not_overwritten(self):
+        first = self._vw('first')
+        job = first.train(self.inputs, self.opts, ['-p'])
+        first.close()
+        shared_predictions = self.shared.joinpath(job[0].outputs_relative['-p'])
+        content = shared_predictions.read_bytes()
+
+        second = self._vw('second')
+        second.train(self.inputs, self.opts, ['-p'])
+        second._with(reset=True).train(self.inputs, self.opts, ['-p'])
+        second.close()
+        self.assertEqual(shared_predictions.read_bytes(), content)
+
+    def test_incomplete_shared_results_are_computed(self):
+        first = self._vw('first')
+        job = first.train(self.inputs, self.opts, ['-p'])
+        first.close()
+        os.remove(self.shared.joinpath(job[1].outputs_relative['-p']))
+        second = self._vw('second')
+        computed = second.train(self.inputs, self.opts, ['-p'])
+        second.close()
+        self.assertEqual([t.attempts for t in computed], [0, 1])
+        self.assertTrue(self.shared.joinpath(job[1].outputs_relative['-p']).exists())
+
+    def test_failed_results_are_not_published(self):
+        inputs = [self.inputs[0], 'vw_executor/tests/data/ccb_0.json']
+        opts = self.opts + ' --strict_parse'
+        first = self._vw('first')
+        failed = first.train(inputs, opts)
+        first.close()
+        self.assertEqual(failed[1].status, ExecutionStatus.Failed)
+        self.assertFalse(self.shared.joinpath(failed[1]._index_key).exists())
+
+        second = self._vw('second')
+        again = second.train(inputs, opts)
+        second.close()
+        self.assertEqual([t.attempts for t in again], [0, 1])
+
+    def test_fetch_without_shared_tier(self):
+        self.assertFalse(VwCache(self.folder.joinpath('local')).fetch([Path('cache-p/missing')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
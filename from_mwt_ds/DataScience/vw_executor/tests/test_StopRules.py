@@ -0,0 +1,99 @@
+import os
+import shutil
+import sys
+import unittest
+from pathlib import Path
+from vw_executor.artifacts import ProgressTail
+from vw_executor.stop_rules import NotFinite, LossAbove, WorseThanKth, AnyOf
+from vw_executor.vw import Vw, ExecutionStatus, _VwBin
+
+
+class _Task:
+    def __init__(self, input_file, loss_table=None):
+        self.input_file = input_file
+        self.loss_table = loss_table
+
+
+class TestStopRules(unittest.TestCase):
+    def test_not_finite(self):
+        rule = NotFinite()
+        self.assertIsNone(rule.check(None, 0, [('1', 0.5, 0.5)]))
+        self.assertIsNotNone(rule.check(None, 0, [('1', 0.5, 0.5), ('2', float('nan'), 0.5)]))
+        self.assertIsNotNone(rule.check(None, 0, [('1', float('inf'), 0.5)]))
+
+    def test_loss_above(self):
+        rule = LossAbove(1)
+        self.assertIsNone(rule.check(None, 0, [('1', 0.5, 0.5)]))
+        self.assertIsNotNone(rule.check(None, 0, [('1', 1.5, 1.5)]))
+
+    def test_worse_than_kth(self):
+        import pandas as pd
+        rule = WorseThanKth(2)
+        job = [_Task('a.json')]
+        self.assertIsNone(rule.check(job, 0, [('1', 10, 10)]))
+        for loss in [1, 2, 3]:
+            job = [_Task('a.json', pd.DataFrame({'i': ['1'], 'loss': [loss]}).set_index('i'))]
+            rule.record(job, 0)
+        self.assertIsNone(rule.check(job, 0, [('1', 2, 2)]))
+        self.assertIsNotNone(rule.check(job, 0, [('1', 2.5, 2.5)]))
+        self.assertIsNone(rule.check(job, 0, [('2', 2.5, 2.5)]))
+        self.assertIsNone(rule.check([_Task('b.json')], 0, [('1', 2.5, 2.5)]))
+
+    def test_any_of(self):
+        rule = AnyOf([LossAbove(1), NotFinite()])
+        self.assertIsNone(rule.check(None, 0, [('1', 0.5, 0.5)]))
+        self.assertIsNotNone(rule.check(None, 0, [('1', float('nan'), 0.5)]))
+
+
+class TestProgressTail(unittest.TestCase):
+    def test_incremental_read(self):
+        path = Path('.progress_tail.txt')
+        tail = ProgressTail(path)
+        self.assertEqual(tail.read(), [])
+        try:
+            with open(path, 'w') as f:
+                f.write('Num weight bits = 18\nloss     last          counter\n0.5 0.5 1 1.0 a b 6\n0.25 0.')
+                f.flush()
+                self.assertEqual(tail.read(), [('1', 0.5, 0.5)])
+                f.write('1 2 2.0 a b 6\n\nfinished run\n0.1 0.1 4 4.0\n')
+                f.flush()
+                self.assertEqual(tail.read(), [('2', 0.25, 0.1)])
+                self.assertEqual(tail.read(), [])
+            with open(path, 'w') as f:
+                f.write('loss     last          counter\n0.75 0.75 1 1.0 a b 6\n')
+            self.assertEqual(tail.read(), [('1', 0.75, 0.75)])
+        finally:
+            path.unlink()
+
+
+class TestEarlyTermination(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_stop')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+        os.environ['VW_STUB_DELAY'] = '0.02'
+        self.poll_interval = _VwBin.poll_interval
+        _VwBin.poll_interval = 0.05
+
+    def tearDown(self):
+        os.environ.pop('VW_STUB_DELAY')
+        _VwBin.poll_interval = self.poll_interval
+
+    def test_stopped_task_is_not_cached(self):
+        vw = Vw(self.cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None, stop_rule=[LossAbove(-10)])
+        result = vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        self.assertEqual(result.status, ExecutionStatus.Stopped)
+        self.assertEqual(result[0].status, ExecutionStatus.Stopped)
+        self.assertEqual(result.failed, result[0])
+        self.assertEqual(result[1].status, ExecutionStatus.NotStarted)
+        self.assertLess(result[0].runtime_s, 1.5)
+        self.assertEqual(len(list(self.cache.joinpath('cacheNone').glob('*.out.txt'))), 1)
+        self.assertFalse(result[0].stdout.path.exists())
+        self.assertEqual(list(self.cache.joinpath('cache-f').iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import shutil
+import unittest
+from pathlib import Path
+from vw_executor.stream import Stream
+from vw_executor.vw import Vw, ExecutionStatus
+from vw_executor.vw_opts import Grid
+
+
+def _lines(path):
+    with open(path) as f:
+        yield from f
+
+
+def _never():
+    raise AssertionError('Stream should not be consumed')
+    yield
+
+
+class TestStream(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_stream')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+
+    def test_stream_matches_file(self):
+        vw = Vw(self.cache, handler=None)
+        from_file = vw.test(self.input1, '--cb_explore_adf --dsjson')
+        from_stream = vw.test(_lines(self.input1), '--cb_explore_adf --dsjson')
+        self.assertEqual(from_stream.status, ExecutionStatus.Success)
+        self.assertEqual(from_stream.loss, from_file.loss)
+        self.assertTrue(from_stream.loss_table.equals(from_file.loss_table))
+
+    def test_named_stream_is_cached(self):
+        vw = Vw(self.cache, handler=None)
+        first = vw.train(Stream(_lines(self.input1), 'events', version=1), '--cb_explore_adf --dsjson')
+        second = vw.train(Stream(_never(), 'events', version=1), '--cb_explore_adf --dsjson')
+        self.assertEqual(second.status, ExecutionStatus.Success)
+        self.assertEqual(second.loss, first.loss)
+        self.assertNotEqual(first[0].stdout.path, vw.train(Stream(_lines(self.input2), 'events', version=2),
+                                                           '--cb_explore_adf --dsjson')[0].stdout.path)
+
+    def test_checkpoints(self):
+        vw = Vw(self.cache, handler=None)
+        result = vw.train([Stream(_lines(self.input1), 'first', checkpoint_every=30),
+                           Stream(_lines(self.input2), 'second')], '--cb_explore_adf --dsjson')
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertEqual([n for n, _ in result[0].checkpoints], [30, 60, 90])
+        for _, path in result[0].checkpoints:
+            self.assertTrue(path.exists())
+        self.assertEqual(result[1].checkpoints, [])
+        self.assertTrue(result.outputs['-f'][1].exists())
+
+        resumed = vw.train(Stream(_lines(self.input2), 'resumed'),
+                           f'--cb_explore_adf --dsjson -i {result[0].checkpoints[-1][1]}')
+        self.assertEqual(resumed.status, ExecutionStatus.Success)
+
+    def test_reusable_stream_in_grid(self):
+        vw = Vw(self.cache, handler=None)
+        grid = Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2]})
+        reusable = vw.test(Stream(lambda: _lines(self.input1)), grid)
+        self.assertEqual([j.status for j in reusable], [ExecutionStatus.Success] * 2)
+        one_shot = vw.test(Stream(_lines(self.input1)), grid)
+        self.assertEqual(sorted(j.status.name for j in one_shot), ['Failed', 'Success'])
+
+    def test_collection_is_named_by_content(self):
+        vw = Vw(self.cache, handler=None)
+        lines = list(_lines(self.input1))
+        self.assertEqual(Stream(lines).name, Stream(list(lines)).name)
+        self.assertNotEqual(Stream(lines).name, Stream(list(_lines(self.input2))).name)
+        self.assertNotEqual(Stream(lambda: lines).name, Stream(lambda: lines).name)
+        first = vw.train(Stream(lines), '--cb_explore_adf --dsjson')
+        second = vw.train(Stream(list(lines)), '--cb_explore_adf --dsjson')
+        self.assertEqual(first[0].stdout.path, second[0].stdout.path)
+
+    def test_multiline_text(self):
+        vw = Vw(self.cache, handler=None)
+        lines = ['shared |s a', '0:1:0.5 |a x', '|a y', '', 'shared |s b', '|a x', '1:0:0.5 |a y', ''] * 10
+        result = vw.test(Stream(lines), '--cb_explore_adf')
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertEqual(result[0].stdout.loss_table.index[-1], '16')
+
+    def test_streams_require_pyvw(self):
+        for vw in [Vw(self.cache, 'vw', handler=None), Vw(self.cache, handler=None, queue=True)]:
+            with self.assertRaises(ValueError):
+                vw.train(Stream(_never()), '--cb_explore_adf --dsjson')
+            vw.close()
+        job = Vw(self.cache, handler=None).train(Stream(_lines(self.input1)), '--cb_explore_adf --dsjson')
+        with self.assertRaises(ValueError):
+            job[0].create_human_readeable_symlink(self.cache.joinpath('results'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import shutil
+import sys
+import threading
+import unittest
+from pathlib import Path
+from vw_executor.trace import Tracer, bind, span, read, to_chrome
+from vw_executor.vw import Vw, ExecutionStatus
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path('.vw_cache_trace')
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_spans(self):
+        tracer = Tracer(self.folder.joinpath('trace.jsonl'))
+        with span('untraced', 'test') as s:
+            s['ignored'] = True
+        with tracer.span('outer', 'test', a=1) as s:
+            s['b'] = 2
+            with bind(tracer, job='j', task=0), span('inner', 'test', c=3):
+                ...
+        with span('after bind', 'test'):
+            ...
+        tracer.close()
+
+        events = read(self.folder.joinpath('trace.jsonl'))
+        self.assertEqual([e['name'] for e in events], ['inner', 'outer'])
+        self.assertEqual(events[0]['args'], {'job': 'j', 'task': 0, 'c': 3})
+        self.assertEqual(events[1]['args'], {'a': 1, 'b': 2})
+        self.assertGreaterEqual(events[1]['dur'], events[0]['dur'])
+        self.assertEqual(events[0]['thread'], threading.current_thread().name)
+
+        to_chrome(self.folder.joinpath('trace.jsonl'), self.folder.joinpath('trace.json'))
+        with open(self.folder.joinpath('trace.json')) as f:
+            chrome = json.load(f)['traceEvents']
+        self.assertEqual([e['ph'] for e in chrome], ['M', 'X', 'X'])
+        self.assertAlmostEqual(chrome[1]['ts'], events[0]['ts'] * 1e6)
+
+
+class TestVwTrace(unittest.TestCase):
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_trace_vw')
+        shutil.rmtree(self.cache, ignore_errors=True)
+
+    def test_phases_are_traced(self):
+        path = self.cache.joinpath('trace.jsonl')
+        with Vw(self.cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None, procs=2,
+                trace=path) as vw:
+            jobs = vw.train([self.input1, self.input2], ['--cb_explore_adf --dsjson', '--cb_explore_adf --dsjson -l 0.1'])
+            self.assertTrue(all(j.status == ExecutionStatus.Success for j in jobs))
+            vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        events = read(path)
+        names = [e['name'] for e in events]
+        self.assertEqual(names.count('planning'), 2)
+        self.assertEqual(names.count('job'), 3)
+        for name in ['queued', 'task', 'lookup', 'on_task_start', 'on_task_finish']:
+            self.assertEqual(names.count(name), 6, name)
+        for name in ['vw', 'spawn', 'parse', 'record']:
+            self.assertEqual(names.count(name), 4, name)
+        self.assertEqual(sorted(e['args']['hit'] for e in events if e['name'] == 'lookup'), [False] * 4 + [True] * 2)
+        spawn = next(e for e in events if e['name'] == 'spawn')
+        self.assertEqual(set(spawn['args']), {'job', 'task', 'pid'})
+        task = next(e for e in events if e['name'] == 'task' and e['args']['job'] == jobs[1].name and
+                    e['args']['task'] == 1)
+        self.assertEqual(task['args']['status'], 'Success')
+        inner = [e for e in events if e['args'].get('job') == jobs[1].name and e['args'].get('task') == 1 and
+                 e['name'] in ('lookup', 'vw', 'parse', 'record')]
+        self.assertEqual(len(inner), 4)
+        self.assertTrue(all(task['ts'] <= e['ts'] and e['ts'] + e['dur'] <= task['ts'] + task['dur'] for e in inner))
+
+
+if __name__ == '__main__':
+    unittest.main()
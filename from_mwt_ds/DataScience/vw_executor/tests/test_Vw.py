@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 from vw_executor.vw import *
 from vw_executor.vw_opts import Grid
 import pandas as pd
@@ -6,6 +7,10 @@ from pathlib import Path
 import shutil
 
 
+def stdout_files(folder):
+    return [p for p in folder.iterdir() if not p.name.endswith('.metrics.json')]
+
+
 def reset_cache_folder(path):
     p = Path(path)
     if p.exists() and p.is_dir():
@@ -542,6 +547,167 @@ class TestVw(unittest.TestCase):
         self.assertIsNotNone(result.iloc[0]['!Loss'])       
         self.assertIsNotNone(result.iloc[1]['!Loss'])
 
+    def test_grid_opts_train_iter(self):
+        vw = Vw('.vw_cache', handler=None)
+
+        result = list(vw.train_iter([self.input1, self.input2], Grid({
+            '#base': ['--cb_explore_adf --dsjson'],
+            '--epsilon': [0.1, 0.2, 0.3]
+        })))
+        self.assertEqual(len(result), 3)
+        self.assertEqual({j.opts['--epsilon'] for j in result}, {0.1, 0.2, 0.3})
+        for job in result:
+            self.assertTrue(isinstance(job, Job))
+            self.assertEqual(len(job), 2)
+            self.assertIsNotNone(job.loss)
+
+    def test_1str_opt_test_iter(self):
+        vw = Vw('.vw_cache', handler=None)
+
+        result = list(vw.test_iter(self.input1, '--cb_explore_adf --dsjson'))
+        self.assertEqual(len(result), 1)
+        self.assertIsNotNone(result[0].loss)
+
+    def test_grid_opts_train_async(self):
+        import asyncio
+        vw = Vw('.vw_cache', handler=None)
+
+        result = asyncio.run(vw.train_async([self.input1, self.input2], Grid({
+            '#base': ['--cb_explore_adf --dsjson'],
+            '--epsilon': [0.1, 0.2]
+        }), max_concurrency=2))
+        self.assertEqual(len(result), 2)
+        for job in result:
+            self.assertEqual(len(job), 2)
+            self.assertEqual(job.status, ExecutionStatus.Success)
+            self.assertIsNotNone(job.loss)
+
+    def test_binary_test_async(self):
+        import asyncio
+        import sys
+        cache = Path('.vw_cache_async')
+        reset_cache_folder(cache)
+        vw = Vw(cache, f'{sys.executable} vw_executor/tests/vw_stub.py', handler=None)
+
+        result = asyncio.run(vw.test_async([self.input1, self.input2], '--cb_explore_adf --dsjson'))
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertEqual(len(list(cache.joinpath('cacheNone').glob('*.out.txt'))), 2)
+        self.assertIsNotNone(result.loss)
+
+        result = asyncio.run(vw.train_async([self.input1, self.input_ccb], '--cb_explore_adf --dsjson --strict_parse'))
+        self.assertIsNotNone(result[0].loss)
+        self.assertIsNone(result.loss)
+        self.assertEqual(result[1], result.failed)
+
+    def test_batched_grid(self):
+        cache = Path('.vw_cache_batch')
+        reset_cache_folder(cache)
+        grid = Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2, 0.3, 0.4], '--power_t': [0, 0.5]})
+        batched = Vw(cache, procs=2, handler=None, batch_size=4).train([self.input1, self.input2], grid)
+        self.assertEqual(len(stdout_files(cache.joinpath('cacheNone'))), 16)
+        for job in batched:
+            self.assertEqual(job.status, ExecutionStatus.Success)
+            self.assertEqual(job[0].attempts, 1)
+
+        reference = Vw(cache, procs=2, handler=None, reset=True).train([self.input1, self.input2], grid)
+        self.assertEqual([j.loss for j in batched], [j.loss for j in reference])
+
+        failing = Vw(cache, procs=2, handler=None, batch_size=4).train(
+            [self.input1, self.input_ccb], Grid({'#base': ['--cb_explore_adf --dsjson --strict_parse'],
+                                                 '--epsilon': [0.1, 0.2, 0.3]}))
+        for job in failing:
+            self.assertEqual(job.status, ExecutionStatus.Failed)
+            self.assertEqual(job.failed, job[1])
+
+    def test_batch_errors_fail_tasks(self):
+        cache = Path('.vw_cache_batch')
+        reset_cache_folder(cache)
+        vw = Vw(cache, procs=2, handler=None, batch_size=4)
+
+        def run_batch(items):
+            raise EOFError('Worker died')
+
+        vw._vw.run_batch = run_batch
+        jobs = vw.train([self.input1], Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2, 0.3, 0.4]}))
+        for job in jobs:
+            self.assertEqual(job.status, ExecutionStatus.Failed)
+            self.assertEqual(job[0].attempts, 1)
+            self.assertIsNotNone(job[0].end_time)
+        vw.close()
+
+    def test_planning(self):
+        cache = Path('.vw_cache_plan')
+        reset_cache_folder(cache)
+        vw = Vw(cache, procs=2, handler=None)
+        grid = Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2], '--power_t': [0, 0.5]})
+        jobs = vw.train([self.input1, self.input2], grid, ['-p'])
+        self.assertIsNotNone(vw.last_planning_time)
+        logger = MultiLogger([])
+        for job in jobs:
+            for task in job:
+                opts, salt = task._checkpoint_key
+                self.assertEqual(task.stdout.path, cache.joinpath(vw._cache.get_path(opts, logger, None, salt)))
+                self.assertEqual(task.outputs['-f'], cache.joinpath(vw._cache.get_path(opts, logger, '-f', salt)))
+
+        exists, stated = Path.exists, []
+
+        def counting_exists(path, *args, **kwargs):
+            stated.append(path)
+            return exists(path, *args, **kwargs)
+
+        results = {p for job in jobs for task in job for p in [task.stdout.path, *task.outputs.values()]}
+        with mock.patch.object(Path, 'exists', counting_exists):
+            cached = vw.train([self.input1, self.input2], grid, ['-p'])
+        self.assertEqual([j.loss for j in cached], [j.loss for j in jobs])
+        self.assertEqual([t.attempts for j in cached for t in j], [0] * 8)
+        # results found by planning listings are not stat-ed again unless they can be evicted
+        self.assertFalse(results & set(stated))
+        with mock.patch.object(Path, 'exists', counting_exists):
+            Vw(cache, procs=2, handler=None, eviction=True).train([self.input1, self.input2], grid, ['-p'])
+        self.assertTrue(results <= set(stated))
+
+    def test_metrics_sidecar(self):
+        cache = Path('.vw_cache_sidecar')
+        reset_cache_folder(cache)
+        job = Vw(cache, procs=2, handler=None).train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        for task in job:
+            self.assertTrue(task.stdout.sidecar.exists())
+            task.stdout.path.write_text('')
+
+        reopened = Vw(cache, procs=2, handler=None).train([self.input1, self.input2], '--cb_explore_adf --dsjson')
+        self.assertEqual(reopened.loss, job.loss)
+        self.assertEqual(len(reopened[1].loss_table), len(job[1].loss_table))
+
+        rerun = Vw(cache, procs=2, handler=None, reset=True).train([self.input1, self.input2],
+                                                                  '--cb_explore_adf --dsjson')
+        self.assertEqual(rerun.loss, job.loss)
+        self.assertIn('average loss', rerun[1].stdout.path.read_text())
+
+    def test_cache_files(self):
+        cache = Path('.vw_cache_files')
+        reset_cache_folder(cache)
+        grid = Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2, 0.3]})
+        cached = Vw(cache, procs=2, handler=None, cache_files=True).train([self.input1, self.input2], grid)
+        self.assertEqual(len(list(cache.joinpath('cache--cache_file').iterdir())), 2)
+        for job in cached:
+            self.assertEqual(job.status, ExecutionStatus.Success)
+            self.assertIn('--cache_file', job[0].args)
+            self.assertNotIn(' -d ', job[0].args)
+
+        grid = Grid({'#base': ['--cb_explore_adf --dsjson'], '--epsilon': [0.1, 0.2, 0.3], '-b': [10, 12]})
+        cached = Vw(cache, procs=2, handler=None, cache_files=True).train([self.input1, self.input2], grid)
+        self.assertEqual(len(list(cache.joinpath('cache--cache_file').iterdir())), 6)
+        reference = Vw(cache, procs=2, handler=None).train([self.input1, self.input2], grid)
+        self.assertEqual([j.loss for j in cached], [j.loss for j in reference])
+
+    def test_cache_files_fallback(self):
+        cache = Path('.vw_cache_files')
+        reset_cache_folder(cache)
+        vw = Vw(cache, procs=2, handler=None, cache_files=True)
+        job = vw.train([self.input_ccb], '--cb_explore_adf --dsjson --strict_parse')
+        self.assertEqual(job.status, ExecutionStatus.Failed)
+        self.assertIn(' -d ', job[0].args)
+
     def test_e2e_test(self):
         cache = Path('.vw_cache_test')
         reset_cache_folder(cache)
@@ -550,25 +716,25 @@ class TestVw(unittest.TestCase):
         stdout_cache = cache.joinpath('cacheNone')
 
         result = vw.test(self.input1, '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 1)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 1)
+        self.assertEqual(len(list(cache.glob('cache*'))), 1)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 1)
         self.assertIsNotNone(result.loss)
 
         result = vw.test([self.input1, self.input2], '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 1)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 2)
+        self.assertEqual(len(list(cache.glob('cache*'))), 1)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 2)
         self.assertIsNotNone(result.loss)
 
         result = vw.test([self.input1, self.input2, self.input1], '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 1)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 2)
+        self.assertEqual(len(list(cache.glob('cache*'))), 1)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 2)
         self.assertIsNotNone(result.loss)
 
         result = vw._with(procs=1).test(
             [self.input1, self.input2, self.input1],
             ['--cb_explore_adf --dsjson', '--cb_explore_adf --dsjson --epsilon 0.5'])
-        self.assertEqual(len(list(cache.iterdir())), 1)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 4)
+        self.assertEqual(len(list(cache.glob('cache*'))), 1)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 4)
         self.assertIsNotNone(result[0].loss)
         self.assertIsNotNone(result[1].loss)
 
@@ -581,28 +747,28 @@ class TestVw(unittest.TestCase):
         model_cache = cache.joinpath('cache-f')
 
         result = vw.train(self.input1, '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 2)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 1)
+        self.assertEqual(len(list(cache.glob('cache*'))), 2)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 1)
         self.assertEqual(len(list(model_cache.iterdir())), 1)
         self.assertIsNotNone(result.loss)
 
         result = vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 2)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 2)
+        self.assertEqual(len(list(cache.glob('cache*'))), 2)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 2)
         self.assertEqual(len(list(model_cache.iterdir())), 2)
         self.assertIsNotNone(result.loss)
 
         result = vw.train([self.input1, self.input2, self.input1], '--cb_explore_adf --dsjson')
-        self.assertEqual(len(list(cache.iterdir())), 2)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 3)
+        self.assertEqual(len(list(cache.glob('cache*'))), 2)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 3)
         self.assertEqual(len(list(model_cache.iterdir())), 3)
         self.assertIsNotNone(result.loss)
 
         result = vw._with(procs=1).train(
             [self.input1, self.input2, self.input1],
             ['--cb_explore_adf --dsjson', '--cb_explore_adf --dsjson --epsilon 0.5'])
-        self.assertEqual(len(list(cache.iterdir())), 2)        
-        self.assertEqual(len(list(stdout_cache.iterdir())), 6)
+        self.assertEqual(len(list(cache.glob('cache*'))), 2)        
+        self.assertEqual(len(stdout_files(stdout_cache)), 6)
         self.assertEqual(len(list(model_cache.iterdir())), 6)
         self.assertIsNotNone(result[0].loss)
         self.assertIsNotNone(result[1].loss)
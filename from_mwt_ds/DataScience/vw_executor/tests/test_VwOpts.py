@@ -1,5 +1,5 @@
 import unittest
-from vw_executor.vw_opts import VwOpts, dimension, product, Grid
+from vw_executor.vw_opts import VwOpts, dimension, product, Grid, hash_items
 import pandas as pd
 
 
@@ -42,6 +42,13 @@ class TestStringHash(unittest.TestCase):
             VwOpts('--ccb_explore_adf --epsilon 0.1 --dsjson --l 0.2').hash(),
             VwOpts('--dsjson  --ccb_explore_adf --l 0.1 --epsilon 0.2  ').hash())
 
+    def test_hash_of_concatenated_items(self):
+        base = VwOpts({'#base': '--ccb_explore_adf --dsjson', '--epsilon': 0.1})
+        extra = VwOpts({'-d': 'file.txt', '-#': 'abc'})
+        self.assertEqual(
+            hash_items(base.items_to_hash() + extra.items_to_hash()),
+            VwOpts(dict(base, **extra)).hash())
+
 
 class TestToString(unittest.TestCase):
     def test_to_string(self):
@@ -0,0 +1,180 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from vw_executor.vw import Vw, ExecutionStatus, _VwQueue
+from vw_executor.vw_opts import Grid
+from vw_executor.work_queue import WorkQueue, serve
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.path = Path('.vw_queue_test')
+        if self.path.exists():
+            shutil.rmtree(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_claim_is_exclusive(self):
+        queue = WorkQueue(self.path)
+        first = queue.put({'args': '1'})
+        second = queue.put({'args': '2'})
+        self.assertEqual(queue.claim(), (first, {'args': '1'}))
+        self.assertEqual(WorkQueue(self.path).claim(), (second, {'args': '2'}))
+        self.assertIsNone(queue.claim())
+
+    def test_result_is_consumed(self):
+        queue = WorkQueue(self.path)
+        task_id = queue.put({})
+        queue.claim()
+        self.assertIsNone(queue.result(task_id))
+        queue.complete(task_id, {'status': 'ok'})
+        self.assertEqual(list(queue.claimed.iterdir()), [])
+        self.assertEqual(queue.result(task_id), {'status': 'ok'})
+        self.assertIsNone(queue.result(task_id))
+
+    def test_expired_claims_are_requeued(self):
+        queue = WorkQueue(self.path, lease=10)
+        task_id = queue.put({'args': '1'})
+        queue.claim()
+        self.assertEqual(queue.requeue_expired(), 0)
+        os.utime(queue.claimed.joinpath(f'{task_id}.json'), (0, 0))
+        self.assertEqual(queue.requeue_expired(), 1)
+        self.assertEqual(queue.claim(), (task_id, {'args': '1'}))
+
+    def test_cancel(self):
+        queue = WorkQueue(self.path)
+        task_id = queue.put({})
+        self.assertTrue(queue.cancel(task_id))
+        self.assertIsNone(queue.claim())
+
+    def test_stop(self):
+        queue = WorkQueue(self.path, lease=10)
+        pending = queue.put({})
+        queue.stop(pending)
+        self.assertIsNone(queue.claim())
+        self.assertEqual(queue.result(pending)['status'], 'stopped')
+
+        claimed = queue.put({})
+        queue.claim()
+        queue.stop(claimed)
+        self.assertTrue(queue.is_stopped(claimed))
+        # stopped task of a dead worker is not requeued
+        os.utime(queue.claimed.joinpath(f'{claimed}.json'), (0, 0))
+        self.assertEqual(queue.requeue_expired(), 0)
+        self.assertEqual(queue.result(claimed)['status'], 'stopped')
+        self.assertFalse(queue.is_stopped(claimed))
+
+    def test_serve_kills_stopped_task(self):
+        queue = WorkQueue(self.path)
+        task_id = queue.put({'x': 1})
+        cancelled = threading.Event()
+        killed = []
+
+        def run(descriptor):
+            queue.stop(task_id)
+            return {'status': 'stopped' if cancelled.wait(5) else 'ok'}
+
+        def cancel(descriptor):
+            killed.append(descriptor)
+            cancelled.set()
+
+        self.assertEqual(serve(queue, run, 0.01, max_tasks=1, cancel=cancel), 1)
+        self.assertEqual(killed, [{'x': 1}])
+        self.assertEqual(queue.result(task_id)['status'], 'stopped')
+
+    def test_serve(self):
+        queue = WorkQueue(self.path)
+        ids = [queue.put({'x': i}) for i in range(3)]
+        self.assertEqual(serve(queue, lambda d: {'status': 'ok', 'y': d['x'] * 2}, 0.01, max_idle=0.05), 3)
+        self.assertEqual([queue.result(i)['y'] for i in ids], [0, 2, 4])
+        task_id = queue.put({'x': 1})
+        self.assertEqual(serve(queue, lambda d: 1 / 0, 0.01, max_tasks=1), 1)
+        self.assertEqual(queue.result(task_id)['status'], 'error')
+
+
+class TestQueueMode(unittest.TestCase):
+    vw_path = f'{sys.executable} vw_executor/tests/vw_stub.py'
+
+    input1 = 'vw_executor/tests/data/cb_100_0.json'
+    input2 = 'vw_executor/tests/data/cb_100_1.json'
+
+    def setUp(self):
+        self.cache = Path('.vw_cache_queue')
+        if self.cache.exists():
+            shutil.rmtree(self.cache)
+        self.poll_interval = _VwQueue.poll_interval
+        _VwQueue.poll_interval = 0.05
+
+    def tearDown(self):
+        _VwQueue.poll_interval = self.poll_interval
+
+    def _workers(self, n, lease=60, vw=None, env=None):
+        return [subprocess.Popen([sys.executable, '-m', 'vw_executor', 'worker', str(self.cache),
+                                  '--poll_interval', '0.05', '--max_idle', '2', '--lease', str(lease)] +
+                                 (['--vw', vw] if vw is not None else []),
+                                 stdout=subprocess.PIPE, universal_newlines=True, env=env) for _ in range(n)]
+
+    def test_cancel_stops_remote_tasks(self):
+        vw = Vw(self.cache, procs=2, handler=None, queue=True)
+        workers = self._workers(1, vw=self.vw_path, env=dict(os.environ, VW_STUB_DELAY='0.1'))
+        result = []
+        thread = threading.Thread(target=lambda: result.append(
+            vw.train([self.input1, self.input2], '--cb_explore_adf --dsjson')))
+        try:
+            thread.start()
+            queue = vw._vw.queue
+            deadline = time.monotonic() + 10
+            while not any(queue.claimed.iterdir()) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            start = time.monotonic()
+            vw.cancel()
+            thread.join(5)
+            self.assertLess(time.monotonic() - start, 3)
+        finally:
+            workers[0].communicate()
+        self.assertEqual(result[0][0].status, ExecutionStatus.Stopped)
+        self.assertEqual(list(queue.pending.iterdir()), [])
+        self.assertEqual(list(queue.claimed.iterdir()), [])
+
+    def test_grid_is_drained_by_workers(self):
+        vw = Vw(self.cache, procs=8, handler=None, queue=True)
+        workers = self._workers(3)
+        try:
+            result = vw.train([self.input1, self.input2], Grid({'#base': ['--cb_explore_adf --dsjson'],
+                                                                '--power_t': [0, 0.5, 1]}))
+        finally:
+            outputs = [w.communicate()[0] for w in workers]
+        self.assertEqual(sum(int(o.split()[0]) for o in outputs), 6)
+        for job in result:
+            self.assertEqual(job.status, ExecutionStatus.Success)
+            self.assertIsNotNone(job.loss)
+        cached = Vw(self.cache, no_run=True, handler=None).train(
+            [self.input1, self.input2], '--cb_explore_adf --dsjson --power_t 0')
+        self.assertEqual(cached.loss, result[0].loss)
+
+    def test_expired_claim_is_executed_by_another_worker(self):
+        queue = WorkQueue(self.cache.joinpath('queue'))
+        crashed = self.cache.joinpath('crashed')
+        task_id = queue.put({'args': f'--cb_explore_adf --dsjson -d {self.input1}', 'out_path': str(crashed),
+                             'cwd': os.getcwd()})
+        queue.claim()
+        os.utime(queue.claimed.joinpath(f'{task_id}.json'), (0, 0))
+        workers = self._workers(1, lease=0.5)
+        try:
+            result = Vw(self.cache, handler=None, queue=True).test(self.input1, '--cb_explore_adf --dsjson')
+        finally:
+            output = workers[0].communicate()[0]
+        self.assertEqual(result.status, ExecutionStatus.Success)
+        self.assertEqual(output.split()[0], '2')
+        self.assertTrue(crashed.exists())
+        self.assertEqual(queue.result(task_id)['status'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+# Minimal stand-in for vw binary: runs pyvw with command line arguments, vw logs go to stderr.
+# If VW_STUB_DELAY is set, examples of -d file are fed one by one with given delay (in seconds).
+# If VW_STUB_CHILD is set, a sleeping child process is started and its pid is written to the given file.
+import os
+import subprocess
+import sys
+import time
+from vowpalwabbit import pyvw
+
+args = sys.argv[1:]
+child = os.environ.get('VW_STUB_CHILD')
+if child is not None:
+    with open(child, 'w') as f:
+        f.write(str(subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']).pid))
+delay = os.environ.get('VW_STUB_DELAY')
+if delay is None or '-d' not in args:
+    pyvw.Workspace(arg_list=args).finish()
+else:
+    i = args.index('-d')
+    data = args[i + 1]
+    ws = pyvw.Workspace(arg_list=args[:i] + args[i + 2:])
+    with open(data) as f:
+        for line in f:
+            ex = ws.parse(line)
+            ws.learn(ex)
+            ws.finish_example(ex)
+            time.sleep(float(delay))
+    ws.finish()
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple, Union
+
+_bound: ContextVar[Optional[Tuple['Tracer', Dict[str, Any]]]] = ContextVar('vw_executor_trace', default=None)
+
+
+class Tracer:
+    '''
+    Writes spans of executor phases (planning, queueing, cache lookup, vw process, parsing, handler callbacks)
+    to JSONL file, one event per line: name, category, start (unix time), duration (seconds),
+    process and thread that executed the phase, and arguments (job name, task index, etc.).
+    '''
+    path: Path
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def emit(self, name: str, category: str, start: float, end: float, **args: Any) -> None:
+        thread = threading.current_thread()
+        event = {'name': name, 'cat': category, 'ts': start, 'dur': end - start, 'pid': os.getpid(),
+                 'tid': thread.native_id, 'thread': thread.name, 'args': args}
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a')
+            self._file.write(line)
+            self._file.flush()
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        '''
+        Emits the span of the with block. Yielded dict can be updated with arguments known only at the end.
+        '''
+        start = time.time()
+        try:
+            yield args
+        finally:
+            self.emit(name, category, start, time.time(), **args)
+
+    @contextmanager
+    def bind(self, **args: Any) -> Iterator[None]:
+        '''
+        Adds arguments to spans of the module level span() within the with block (in the current thread or coroutine).
+        '''
+        outer = _bound.get()
+        token = _bound.set((self, {**(outer[1] if outer is not None and outer[0] is self else {}), **args}))
+        try:
+            yield
+        finally:
+            _bound.reset(token)
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        return read(self.path)
+
+    def to_chrome(self, path: Union[str, Path]) -> None:
+        self.events()
+        to_chrome(self.path, path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def span(name: str, category: str, tracer: Optional[Tracer] = None, **args: Any) -> ContextManager:
+    '''
+    Span of the given tracer or of the tracer bound to the current thread or coroutine, no-op if there is none.
+    '''
+    bound = _bound.get()
+    if tracer is None and bound is not None:
+        tracer, bound_args = bound
+        args = {**bound_args, **args}
+    return tracer.span(name, category, **args) if tracer is not None else nullcontext({})
+
+
+def bind(tracer: Optional[Tracer], **args: Any) -> ContextManager:
+    return tracer.bind(**args) if tracer is not None else nullcontext()
+
+
+def read(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def to_chrome(source: Union[str, Path], target: Union[str, Path]) -> None:
+    '''
+    Converts JSONL trace to Chrome trace event format (chrome://tracing, Perfetto).
+    '''
+    events = read(source)
+    threads = {(e['pid'], e['tid']): e['thread'] for e in events}
+    trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+             for (pid, tid), name in threads.items()]
+    trace += [{'name': e['name'], 'cat': e['cat'], 'ph': 'X', 'ts': e['ts'] * 1e6, 'dur': e['dur'] * 1e6,
+               'pid': e['pid'], 'tid': e['tid'], 'args': e['args']} for e in events]
+    with open(target, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
@@ -1,23 +1,37 @@
+import asyncio
 import enum
 import multiprocessing
+from contextlib import contextmanager
 from pathlib import Path
 import subprocess
 import time
 import os
+import signal
+import sys
 
 import pandas as pd
 
-from vw_executor.artifacts import Output, Predictions, Model8, Model9, Model
-from vw_executor.pool import SeqPool, MultiThreadPool, Pool
+from vw_executor.artifacts import Output, Predictions, Model8, Model9, Model, ProgressTail
+from vw_executor.pool import SeqPool, FuturesPool, Pool, WorkerPool
+from vw_executor.scheduler import Scheduler
 from vw_executor.loggers import MultiLogger, ILogger
 from vw_executor.vw_cache import VwCache
 from vw_executor.handlers import MultiHandler, HandlerBase, ProgressBars
-from vw_executor.vw_opts import VwOpts, InteractiveGrid, VwOptsLike, GridLike
-
-from typing import Callable, Iterable, Optional, Union, Dict, Any, Type, List, Generator
+from vw_executor.vw_opts import VwOpts, InteractiveGrid, VwOptsLike, GridLike, hash_items
+from vw_executor.memory import MemoryBudget
+from vw_executor.work_queue import WorkQueue, serve
+from vw_executor.stream import Stream, run_stream
+from vw_executor.stop_rules import StopRule, AnyOf, ProgressRow
+from vw_executor.progress import ProgressMonitor
+from vw_executor.trace import Tracer, bind, span
+
+from typing import Callable, Iterable, Iterator, Optional, Union, Dict, Any, Type, List, Generator, Set, Tuple
 from itertools import chain
+from threading import Lock, Thread
 from abc import ABC, abstractmethod
 
+Monitor = Callable[[List[ProgressRow]], Optional[str]]
+
 
 def _save(txt: Union[str, Iterable[str]], path: Path) -> None:
     with open(path, 'w') as f:
@@ -32,6 +46,43 @@ class ExecutionStatus(enum.Enum):
     Running = 2
     Success = 3
     Failed = 4
+    Stopped = 5
+    Timeout = 6
+
+
+class TaskTimeout(Exception):
+    timeout: Optional[float]
+
+    def __init__(self, timeout: Optional[float], message: Optional[str] = None):
+        super().__init__(message or f'Timeout of {timeout} seconds is exceeded')
+        self.timeout = timeout
+
+
+class TaskStopped(Exception):
+    reason: str
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TaskFailed(Exception):
+    '''
+    vw process exited with non-zero code or was killed by a signal (negative code), e.g. by OOM killer.
+    '''
+    returncode: int
+    resource_usage: Dict[str, Any]
+
+    def __init__(self, returncode: int, resource_usage: Optional[Dict[str, Any]] = None):
+        if returncode == -signal.SIGKILL:
+            message = 'vw is killed by SIGKILL (out of memory?)'
+        elif returncode < 0:
+            message = f'vw is killed by signal {-returncode}'
+        else:
+            message = f'vw exited with code {returncode}'
+        super().__init__(message)
+        self.returncode = returncode
+        self.resource_usage = resource_usage or {}
 
 
 class _VwCore(ABC):
@@ -41,41 +92,308 @@ class _VwCore(ABC):
         self.path = path
 
     @abstractmethod
-    def run(self, args: str) -> Union[str, List[str]]:
+    def run(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        ...
+
+    async def run_async(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.run, args, out_path, monitor, timeout)
+
+    def run_batch(self, items: List[Tuple[str, Path]]) -> List[Union[Dict[str, Any], Exception]]:
+        result = []
+        for args, out_path in items:
+            try:
+                result.append(self.run(args, out_path))
+            except Exception as e:
+                result.append(e)
+        return result
+
+    def kill(self, out_paths: Optional[Iterable[Path]] = None) -> None:
+        '''
+        Kills running processes of the given tasks (all if None), their tasks are stopped.
+        '''
+        ...
+
+    def close(self) -> None:
         ...
 
 
+def _exit_code(status: int) -> int:
+    return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+
+def _max_rss_bytes(max_rss: int) -> int:
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+_USAGE_FIELDS = {
+    'user_cpu_s': 'ru_utime',
+    'sys_cpu_s': 'ru_stime',
+    'block_input': 'ru_inblock',
+    'block_output': 'ru_oublock',
+    'voluntary_switches': 'ru_nvcsw',
+    'involuntary_switches': 'ru_nivcsw',
+}
+
+
+def _usage(usage: Any) -> Dict[str, Any]:
+    '''
+    Resource usage of the process from rusage: cpu seconds, peak memory in bytes, block I/O operations
+    and context switches.
+    '''
+    return dict({k: getattr(usage, f) for k, f in _USAGE_FIELDS.items()}, max_rss=_max_rss_bytes(usage.ru_maxrss))
+
+
+def _wait(process: subprocess.Popen, timeout: Optional[float] = None) -> Dict[str, Any]:
+    '''
+    Waits for the process like Popen.wait, but reaps it with wait4 in order to get its resource usage.
+    '''
+    if not hasattr(os, 'wait4'):
+        process.wait(timeout)
+        return {}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        pid, status, usage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        if pid != 0:
+            process.returncode = _exit_code(status)
+            return _usage(usage)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        delay = min(delay * 2, remaining, 0.05)
+        time.sleep(delay)
+
+
+def _wait_async(process: subprocess.Popen) -> asyncio.Future:
+    '''
+    Asynchronous version of _wait. Process is reaped in a dedicated thread (like asyncio ThreadedChildWatcher does,
+    but with wait4), so the event loop is never blocked and resource usage is kept.
+    '''
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(usage: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        if not future.done():
+            future.set_exception(error) if error is not None else future.set_result(usage)
+
+    def wait() -> None:
+        try:
+            usage, error = _wait(process), None
+        except BaseException as e:
+            usage, error = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, usage, error)
+        except RuntimeError:
+            # event loop is already closed, nobody is waiting for the result
+            ...
+
+    Thread(target=wait, name=f'vw-wait-{process.pid}', daemon=True).start()
+    return future
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> Optional[int]:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def _measured(fn: Callable, *args, **kwargs) -> Dict[str, Any]:
+    '''
+    Runs fn in the current (worker) process and returns its resource usage in the format of _wait.
+    Peak memory is reset before the run where it is supported (Linux), otherwise it is the peak of the process.
+    '''
+    try:
+        import resource
+    except ImportError:
+        fn(*args, **kwargs)
+        return {}
+    reset = _reset_peak_rss()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    fn(*args, **kwargs)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    result = {k: getattr(after, f) - getattr(before, f) for k, f in _USAGE_FIELDS.items()}
+    result['max_rss'] = (_peak_rss() if reset else None) or _max_rss_bytes(after.ru_maxrss)
+    return result
+
+
+_NEW_SESSION = os.name == 'posix'
+
+
+def _kill(process: Union[subprocess.Popen, asyncio.subprocess.Process]) -> None:
+    '''
+    Kills the process together with its process group, so children of vw (e.g. shell wrappers) do not survive it.
+    '''
+    try:
+        if _NEW_SESSION:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        ...
+
+
+def _wait_for(deadline: Optional[float], poll_interval: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return poll_interval
+    remaining = deadline - time.monotonic()
+    return remaining if poll_interval is None else min(remaining, poll_interval)
+
+
 class _VwBin(_VwCore):
+    poll_interval: float = 0.5
+
     def __init__(self, path: Path):
         super().__init__(path)
-
-    def run(self, args: str, out_path: Path) -> str:
+        self._processes: Dict[subprocess.Popen, Path] = {}
+        self._killed: Set[subprocess.Popen] = set()
+        self._lock = Lock()
+
+    def _spawn(self, command: str, out_path: Path, stdout_file, stderr_file,
+               cwd: Optional[str] = None) -> subprocess.Popen:
+        with span('spawn', 'vw') as s, self._lock:
+            process = subprocess.Popen(
+                command.split(),
+                universal_newlines=True,
+                encoding='utf-8',
+                stdout=stdout_file,
+                stderr=stderr_file,
+                start_new_session=_NEW_SESSION,
+                cwd=cwd
+            )
+            self._processes[process] = out_path
+            s['pid'] = process.pid
+        return process
+
+    def _forget(self, process: subprocess.Popen) -> bool:
+        '''
+        Removes the process from the running ones, returns True if it was killed by kill().
+        '''
+        with self._lock:
+            self._processes.pop(process, None)
+            killed = process in self._killed
+            self._killed.discard(process)
+        return killed
+
+    def kill(self, out_paths: Optional[Iterable[Path]] = None) -> None:
+        out_paths = None if out_paths is None else set(out_paths)
+        with self._lock:
+            for process, out_path in self._processes.items():
+                if out_paths is None or out_path in out_paths:
+                    self._killed.add(process)
+                    _kill(process)
+
+    def close(self) -> None:
+        self.kill()
+
+    def run(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None, cwd: Optional[str] = None) -> Dict[str, Any]:
         command = f'{self.path} {args}'
-        stdout_file = open(out_path.parent / (out_path.name + '.out.txt'), 'w')
+        deadline = None if timeout is None else time.monotonic() + timeout
         stderr_temp = out_path.parent / (out_path.name + '.pending')
-        stderr_file = open(stderr_temp, 'w')
+        stopped = None
+        with open(out_path.parent / (out_path.name + '.out.txt'), 'w') as stdout_file, \
+                open(stderr_temp, 'w') as stderr_file:
+            process = self._spawn(command, out_path, stdout_file, stderr_file, cwd)
+            try:
+                tail = ProgressTail(stderr_temp) if monitor is not None else None
+                while True:
+                    wait_for = _wait_for(deadline, self.poll_interval if monitor is not None else None)
+                    if wait_for is not None and wait_for <= 0:
+                        raise TaskTimeout(timeout)
+                    try:
+                        usage = _wait(process, wait_for)
+                        break
+                    except subprocess.TimeoutExpired:
+                        if tail is not None:
+                            stopped = monitor(tail.read())
+                            if stopped is not None:
+                                _kill(process)
+                                _wait(process)
+                                break
+            except BaseException:
+                if process.returncode is None:
+                    _kill(process)
+                    _wait(process)
+                raise
+            finally:
+                if self._forget(process):
+                    stopped = 'Cancelled'
 
-        process = subprocess.Popen(
-            command.split(),
-            universal_newlines=True,
-            encoding='utf-8',
-            stdout=stdout_file,
-            stderr=stderr_file
-        )
+        if stopped is not None:
+            raise TaskStopped(stopped)
+        os.replace(stderr_temp, out_path)
+        if process.returncode != 0:
+            raise TaskFailed(process.returncode, usage)
 
-        returncode = process.wait()
-        stdout_file.close()
-        stderr_file.close()
+        return usage
 
+    async def run_async(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+                        timeout: Optional[float] = None, cwd: Optional[str] = None) -> Dict[str, Any]:
+        command = f'{self.path} {args}'
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stderr_temp = out_path.parent / (out_path.name + '.pending')
+        stopped = None
+        with open(out_path.parent / (out_path.name + '.out.txt'), 'w') as stdout_file, \
+                open(stderr_temp, 'w') as stderr_file:
+            process = self._spawn(command, out_path, stdout_file, stderr_file, cwd)
+            waiter = _wait_async(process)
+            try:
+                tail = ProgressTail(stderr_temp) if monitor is not None else None
+                while True:
+                    wait_for = _wait_for(deadline, self.poll_interval if monitor is not None else None)
+                    if wait_for is not None and wait_for <= 0:
+                        raise TaskTimeout(timeout)
+                    try:
+                        usage = await asyncio.wait_for(asyncio.shield(waiter), wait_for)
+                        break
+                    except asyncio.TimeoutError:
+                        if tail is not None:
+                            stopped = monitor(tail.read())
+                            if stopped is not None:
+                                _kill(process)
+                                await waiter
+                                break
+            except BaseException:
+                # killed process is reaped by the waiter thread, so cancellation does not block the event loop
+                if not waiter.done():
+                    _kill(process)
+                raise
+            finally:
+                if self._forget(process):
+                    stopped = 'Cancelled'
+
+        if stopped is not None:
+            raise TaskStopped(stopped)
         os.replace(stderr_temp, out_path)
+        if process.returncode != 0:
+            raise TaskFailed(process.returncode, usage)
 
-        return []
+        return usage
+
+
+def _init_pyvw() -> None:
+    from vowpalwabbit import pyvw
 
 
-def _run_pyvw(args: str, filename=None) -> Iterable[str]:
+def _run_pyvw(args: str, filename=None, cwd: Optional[str] = None) -> Iterable[str]:
     import traceback
 
     from vowpalwabbit import pyvw
+    if cwd is not None:
+        os.chdir(cwd)
     try:
         execution = pyvw.Workspace(args, enable_logging=True)
     except Exception as e:
@@ -98,14 +416,189 @@ def _run_pyvw(args: str, filename=None) -> Iterable[str]:
         return result
 
 
+def _run_pyvw_measured(args: str, filename: Path, cwd: Optional[str] = None) -> Dict[str, Any]:
+    return _measured(_run_pyvw, args, filename, cwd)
+
+
+def _run_pyvw_batch(items: List[Tuple[str, Path]]) -> List[Union[Dict[str, Any], str]]:
+    '''
+    Resource usage of every successful item or its error message.
+    '''
+    result = []
+    for args, filename in items:
+        try:
+            result.append(_run_pyvw_measured(args, filename))
+        except Exception as e:
+            result.append(f'{type(e).__name__}: {e}')
+    return result
+
+
 class _VwPy(_VwCore):
-    def __init__(self):
+    workers: WorkerPool
+
+    def __init__(self, procs: int = 1, max_tasks: Optional[int] = None):
+        super().__init__(None)
+        self.workers = WorkerPool(procs, max_tasks, initializer=_init_pyvw)
+        self._killed: Set[Path] = set()
+        self._lock = Lock()
+
+    @contextmanager
+    def _cancellable(self, paths: List[Path]) -> Iterator[None]:
+        '''
+        Turns death of the worker that was killed by kill() into TaskStopped.
+        '''
+        try:
+            yield
+        except (EOFError, OSError):
+            with self._lock:
+                if any(p in self._killed for p in paths):
+                    raise TaskStopped('Cancelled')
+            raise
+        finally:
+            with self._lock:
+                self._killed.difference_update(paths)
+
+    def run(self, args: str, filename: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            with self._cancellable([filename]):
+                return self.workers.apply(_run_pyvw_measured, args, filename=filename, timeout=timeout,
+                                          tags=[filename])
+        except TimeoutError:
+            raise TaskTimeout(timeout)
+
+    def run_batch(self, items: List[Tuple[str, Path]]) -> List[Union[Dict[str, Any], Exception]]:
+        paths = [p for _, p in items]
+        try:
+            with self._cancellable(paths):
+                results = self.workers.apply(_run_pyvw_batch, items, tags=paths)
+        except TaskStopped as e:
+            return [e] * len(items)
+        return [RuntimeError(r) if isinstance(r, str) else r for r in results]
+
+    def kill(self, out_paths: Optional[Iterable[Path]] = None) -> None:
+        with self._lock:
+            self._killed.update(self.workers.kill(out_paths))
+
+    def close(self) -> None:
+        self.kill()
+        self.workers.close()
+
+
+class _VwQueue(_VwCore):
+    '''
+    Puts tasks into the work queue and waits for their results. Tasks are executed by `vw-executor worker` processes.
+    '''
+    poll_interval: float = 0.5
+    queue: WorkQueue
+
+    def __init__(self, path: Path, lease: float = 60):
+        super().__init__(None)
+        self.queue = WorkQueue(path, lease)
+        self._tasks: Dict[str, Path] = {}
+        self._lock = Lock()
+
+    def run(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        task_id = self.queue.put({'args': args, 'out_path': str(out_path), 'cwd': os.getcwd(), 'timeout': timeout})
+        with self._lock:
+            self._tasks[task_id] = out_path
+        try:
+            result = self.queue.wait(task_id, self.poll_interval)
+        except BaseException:
+            self.queue.cancel(task_id)
+            raise
+        finally:
+            with self._lock:
+                self._tasks.pop(task_id, None)
+        return _remote_result(result, timeout)
+
+    def kill(self, out_paths: Optional[Iterable[Path]] = None) -> None:
+        out_paths = None if out_paths is None else set(out_paths)
+        with self._lock:
+            stopped = [t for t, p in self._tasks.items() if out_paths is None or p in out_paths]
+        for task_id in stopped:
+            self.queue.stop(task_id)
+
+
+def _remote_result(result: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+    if result['status'] == 'timeout':
+        raise TaskTimeout(timeout)
+    if result['status'] == 'failed':
+        raise TaskFailed(result['returncode'], result.get('resource_usage'))
+    if result['status'] == 'stopped':
+        raise TaskStopped(result['reason'])
+    if result['status'] == 'error':
+        raise RuntimeError(f'{result["error"]} (worker {result["worker"]})')
+    return result.get('resource_usage', {})
+
+
+def _run_descriptor(core: Union[_VwBin, _VwPy], descriptor: Dict[str, Any]) -> Dict[str, Any]:
+    args, out_path, cwd, timeout = descriptor['args'], Path(descriptor['out_path']), descriptor['cwd'], \
+        descriptor.get('timeout')
+    target = _descriptor_target(descriptor)
+    try:
+        if isinstance(core, _VwPy):
+            with core._cancellable([target]):
+                usage = core.workers.apply(_run_pyvw_measured, args, filename=out_path, cwd=cwd, timeout=timeout,
+                                           tags=[target])
+        else:
+            usage = core.run(args, target, timeout=timeout, cwd=cwd)
+    except (TaskTimeout, TimeoutError):
+        return {'status': 'timeout'}
+    except TaskStopped as e:
+        return {'status': 'stopped', 'reason': e.reason}
+    except TaskFailed as e:
+        return {'status': 'failed', 'returncode': e.returncode, 'resource_usage': e.resource_usage}
+    return {'status': 'ok', 'resource_usage': usage}
+
+
+def _descriptor_target(descriptor: Dict[str, Any]) -> Path:
+    return Path(descriptor['cwd']).joinpath(descriptor['out_path'])
+
+
+def _cancel_descriptor(core: Union[_VwBin, _VwPy], descriptor: Dict[str, Any]) -> None:
+    '''
+    Kills running execution of the descriptor, it results in stopped status.
+    '''
+    core.kill([_descriptor_target(descriptor)])
+
+
+def serve_queue(cache_path: Union[str, Path],
+                path: Optional[Union[str, Path]] = None,
+                lease: float = 60,
+                poll_interval: float = 1,
+                max_idle: Optional[float] = None,
+                max_tasks: Optional[int] = None) -> int:
+    '''
+    Executes tasks from the work queue of the cache folder until max_idle seconds without tasks
+    or max_tasks tasks are completed. Returns number of completed tasks.
+    '''
+    core = _VwBin(path) if path is not None else _VwPy(1)
+    try:
+        return serve(WorkQueue(Path(cache_path).joinpath('queue'), lease),
+                     lambda descriptor: _run_descriptor(core, descriptor), poll_interval, max_idle, max_tasks,
+                     lambda descriptor: _cancel_descriptor(core, descriptor))
+    finally:
+        core.close()
+
+
+class _VwStream(_VwCore):
+    '''
+    Feeds examples of the stream to in-process pyvw.
+    '''
+    stream: Stream
+
+    def __init__(self, stream: Stream, checkpoint: Callable[[int], Path]):
         super().__init__(None)
+        self.stream = stream
+        self.checkpoint = checkpoint
+
+    def run(self, args: str, out_path: Path, monitor: Optional[Monitor] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        run_stream(args, self.stream.open(), out_path, self.stream.checkpoint_every, self.checkpoint)
+        return {}
 
-    def run(self, args: str, filename=None) -> Iterable[str]:
-        from multiprocessing import Pool
-        with Pool(1) as p:
-            return p.apply(_run_pyvw, [args], {"filename": filename})
 
 def symlink(source:Path, link_name:Path):
     import os
@@ -127,11 +620,35 @@ def create_symlink_if_exists(source:Path, link_name):
     if source.exists():
         symlink(source, link_name)
 
+class Limits:
+    '''
+    Wall-clock limits of tasks and jobs in seconds and number of retries of transient failures
+    (errors raised by the execution and timeouts) with exponential backoff.
+    '''
+    task_timeout: Optional[float]
+    job_timeout: Optional[float]
+    retries: int
+    backoff: float
+
+    def __init__(self,
+                 task_timeout: Optional[float] = None,
+                 job_timeout: Optional[float] = None,
+                 retries: int = 0,
+                 backoff: float = 1.0):
+        self.task_timeout = task_timeout
+        self.job_timeout = job_timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def delay(self, attempt: int) -> float:
+        return self.backoff * 2 ** attempt
+
+
 class Task:
     job: 'Job'
     _logger: MultiLogger
     _no_run: bool
-    input_file: Path
+    input_file: Union[Path, Stream]
     input_folder: Path
     status: ExecutionStatus
     model_file: Optional[Path]
@@ -139,6 +656,9 @@ class Task:
     args: str
     start_time: Optional[float]
     end_time: Optional[float]
+    attempts: int
+    resource_usage: Dict[str, Any]
+    checkpoints: List[Tuple[int, Path]]
     stdout: Output
     outputs_relative: Dict[str, Path]
     outputs:  Dict[str, Path]
@@ -146,7 +666,7 @@ class Task:
     def __init__(self,
                  job: 'Job',
                  logger: MultiLogger,
-                 input_file: Path,
+                 input_file: Union[Path, Stream],
                  input_folder: Path,
                  model_file: Optional[Path],
                  model_folder: Path,
@@ -161,9 +681,14 @@ class Task:
         self.model_folder = model_folder
         self._order_position = order_position
         self._no_run = no_run
-        self.args = str(self._prepare_args(self.job.cache))
+        self._opts = self._prepare_args(self.job.cache)
+        self.args = str(self._opts)
         self.start_time = None
         self.end_time = None
+        self.attempts = 0
+        self.resource_usage = {}
+        self.checkpoints = []
+        self._queued_at = None
     
     def create_human_readeable_symlink(
         self,
@@ -171,6 +696,8 @@ class Task:
         translate_output: Dict[str, str] = {"-p": "predictions.txt", "-f": "final_regressor.vwmodel",
         "--extra_metrics": "extra_metrics.json", "--invert_hash": "invert_hash.txt", "--readable_model": "readable_model.txt"},
         create_symlink: Callable = create_symlink_if_exists) -> Path:
+        if isinstance(self.input_file, Stream):
+            raise ValueError("Symlinks cannot be created for stream inputs")
         if self.input_file.parent == self.input_file:
             raise ValueError("Input files cannot be on the root folder")
 
@@ -218,7 +745,7 @@ class Task:
         if self.model_file:
             create_symlink(self.model_folder.joinpath(self.model_file).absolute(), task_dir / "input_regressor.vwmodel")
         
-        vw_opts = self._prepare_args(self.job.cache)
+        vw_opts = VwOpts(dict(self._opts))
         for o in self.outputs.keys():
             vw_opts[o] = translate_output[o] + ".repro"
 
@@ -232,52 +759,255 @@ class Task:
         opts = self.job.opts.copy()
         opts[self.job.input_mode] = self.input_file
 
-        input_full = self.input_folder.joinpath(self.input_file)
-
-        salt = input_full.stat().st_size
+        if isinstance(self.input_file, Stream):
+            input_full = None
+            salt = self.input_file.version
+        else:
+            input_full = self.input_folder.joinpath(self.input_file)
+            salt = cache.fingerprint(input_full)
         if self.model_file:
             opts['-i'] = self.model_file
 
-        self.outputs_relative = {o: cache.get_path(opts, self._logger, o, salt) for o in self.job.outputs.keys()}
+        args_hash = self.job._hash(opts, salt)
+        self.outputs_relative = {o: cache.path_for(args_hash, o) for o in self.job.outputs.keys()}
         self.outputs = {o: cache.path.joinpath(p) for o, p in self.outputs_relative.items()}
 
-        self.stdout = Output(cache.path.joinpath(cache.get_path(opts, self._logger, None, salt)))
+        self._index_key = str(cache.path_for(args_hash))
+        self.stdout = Output(cache.path.joinpath(self._index_key))
+        self._checkpoint_key = opts.copy(), salt
+        self._listed_at_planning, self._missing_at_planning = self._check_listings(cache)
 
         if self.model_file:
             opts['-i'] = self.model_folder.joinpath(self.model_file)
 
         opts[self.job.input_mode] = input_full
+        if self.job.input_mode == '--cache_file' and '--passes' not in str(opts).split():
+            # examples are read from cache file only if there are passes over data
+            opts['--passes'] = 1
         opts = VwOpts(dict(opts, **self.outputs))
         return opts
 
-    def _execute(self) -> Union[str, Iterable[str]]:
-        self._logger.debug(f'Executing: {self.args}')
-        return self.job.core.run(self.args, self.stdout.path)
+    def _check_listings(self, cache: VwCache) -> Tuple[bool, Optional[Path]]:
+        '''
+        Whether result files are checked against planning listings, and the first missing one.
+        '''
+        for p in self._result_paths():
+            listing = cache.listing(p.parts[0])
+            if listing is None:
+                return False, None
+            if p.name not in listing:
+                return True, cache.path.joinpath(p)
+        return True, None
+
+    def _checkpoint(self, examples: int) -> Path:
+        opts, salt = self._checkpoint_key
+        result = self.job.cache.path.joinpath(self.job.cache.get_path(opts, self._logger, '-f', f'{salt}:{examples}'))
+        self.checkpoints.append((examples, result))
+        return result
 
-    def run(self, reset: bool) -> None:
+    def _core(self) -> _VwCore:
+        if isinstance(self.input_file, Stream):
+            return _VwStream(self.input_file, self._checkpoint)
+        return self.job.core
+
+    def _monitor(self) -> Optional[Monitor]:
+        rule = self.job.stop_rule
+        if rule is None:
+            return None
+        task_idx = self._order_position
+        return lambda rows: rule.check(self.job, task_idx, rows) if rows else None
+
+    def _retry(self, error: Exception) -> Optional[float]:
+        if isinstance(error, TaskStopped) or isinstance(self.input_file, Stream) or \
+                self.attempts > self.job.limits.retries or self.job._timed_out():
+            return None
+        delay = self.job.limits.delay(self.attempts - 1)
+        self._logger.warning(f'Attempt {self.attempts} failed: {error}. Retrying in {delay} seconds')
+        return delay
+
+    def _execute(self) -> Dict[str, Any]:
+        while True:
+            self._logger.debug(f'Executing: {self.args}')
+            self.attempts += 1
+            try:
+                with span('vw', 'vw', attempt=self.attempts):
+                    return self._core().run(self.args, self.stdout.path, self._monitor(), self.job._task_timeout())
+            except Exception as e:
+                delay = self._retry(e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def _execute_async(self) -> Dict[str, Any]:
+        while True:
+            self._logger.debug(f'Executing: {self.args}')
+            self.attempts += 1
+            try:
+                with span('vw', 'vw', attempt=self.attempts):
+                    return await self._core().run_async(self.args, self.stdout.path, self._monitor(),
+                                                        self.job._task_timeout())
+            except Exception as e:
+                delay = self._retry(e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def _result_paths(self) -> List[Path]:
+        return [Path(self._index_key)] + list(self.outputs_relative.values())
+
+    def _cache_paths(self) -> List[str]:
+        cache = self.job.cache.path.resolve()
+        result = [self._index_key] + [str(p) for p in self.outputs_relative.values()]
+        if self.model_file:
+            result.append(str(self.model_file))
+        if not isinstance(self.input_file, Stream):
+            input_full = self.input_folder.joinpath(self.input_file).resolve()
+            if cache in input_full.parents:
+                result.append(str(input_full.relative_to(cache)))
+        return result
+
+    def _lease(self) -> Optional[str]:
+        cache = self.job.cache
+        return cache.index.lease(self._cache_paths()) if cache.evictable else None
+
+    def _release(self, lease: Optional[str]) -> None:
+        if lease is not None:
+            self.job.cache.index.release(lease)
+
+    def _trace_queued(self) -> None:
+        tracer = self.job._tracer
+        if tracer is not None and self._queued_at is not None:
+            tracer.emit('queued', 'task', self._queued_at, time.time(), job=self.job.name, task=self._order_position)
+        self._queued_at = None
+
+    def _lookup(self, reset: bool) -> bool:
+        with span('lookup', 'cache') as s:
+            started = self._start(reset)
+            s['hit'] = not started
+        return started
+
+    @contextmanager
+    def _traced(self) -> Iterator[None]:
+        with bind(self.job._tracer, job=self.job.name, task=self._order_position):
+            self._trace_queued()
+            with span('task', 'task') as s:
+                try:
+                    yield
+                finally:
+                    s.update(status=self.status.name, attempts=self.attempts)
+
+    def _start(self, reset: bool) -> bool:
         self.status = ExecutionStatus.Running
         result_files = list(self.outputs.values()) + [self.stdout.path]
-        not_exist = next((p for p in result_files if not p.exists()), None)
+        listed, missing = self._listed_at_planning, self._missing_at_planning
+        self._listed_at_planning, self._missing_at_planning = False, None
+        if listed and (missing or not self.job.cache.evictable):
+            # planning listings are trusted, found files are stat-ed again only if they can be evicted since then
+            not_exist = missing
+        else:
+            not_exist = next((p for p in result_files if not p.exists()), None)
+        if not_exist and not reset and self.job.cache.fetch(self._result_paths()):
+            self._logger.debug(f'Result of vw execution is taken from shared cache: {self.args}')
+            self.job.cache.fetch([Path(f'{self._index_key}.metrics.json')])
+            not_exist = None
         self.start_time = time.time()
         if reset or not_exist:
             if not_exist:
                 self._logger.debug(f'{not_exist} had not been found.')
             if self._no_run:
                 raise Exception('Result is not found, and execution is deprecated')
-
-            try:
-                result = self._execute()
-                assert result == []
-                self.status = ExecutionStatus.Success if self.stdout.loss is not None else ExecutionStatus.Failed
-            except:
-                self.status = ExecutionStatus.Failed
-                raise
-            finally:
-                self.end_time = time.time()
+            for p in self.outputs.values():
+                # outputs are rewritten in place, so links to the shared cache should not be written through
+                if p.exists() and p.stat().st_nlink > 1:
+                    p.unlink()
+            if self.stdout.sidecar.exists():
+                self.stdout.sidecar.unlink()
+            self.stdout = Output(self.stdout.path)
+            return True
         else:
             self._logger.debug(f'Result of vw execution is found: {self.args}')
             self.end_time = time.time()
-            self.status = ExecutionStatus.Success if self.stdout.loss is not None else ExecutionStatus.Failed
+            recorded = self.job.cache.index.run(self._index_key)
+            if recorded is not None:
+                status, self.resource_usage = recorded
+                self.status = ExecutionStatus[status]
+            else:
+                self.status = ExecutionStatus.Success if self.stdout.loss is not None else ExecutionStatus.Failed
+                self._record(None, replace=False)
+            return False
+
+    def _record(self, runtime_s: Optional[float], replace: bool = True) -> None:
+        _, salt = self._checkpoint_key
+        self.job.cache.index.record(
+            self._index_key, str(self.job.opts), self.job.opts.hash(), str(self.input_file),
+            None if salt is None else str(salt), self.status.name, runtime_s, self.loss, self.metrics,
+            {o: (str(self.outputs_relative[o]), p.stat().st_size if p.exists() else None)
+             for o, p in self.outputs.items()},
+            replace, self.resource_usage)
+
+    def _finish(self, resource_usage: Dict[str, Any], failed: bool = False) -> None:
+        self.resource_usage = resource_usage
+        with span('parse', 'artifacts'):
+            self.status = ExecutionStatus.Success if self.stdout.loss is not None and not failed \
+                else ExecutionStatus.Failed
+            self.stdout.save_sidecar()
+        with span('record', 'cache'):
+            self._record(time.time() - self.start_time)
+            self.job.cache.compress([self.stdout.path] + [p for o, p in self.outputs.items() if o == '-p'])
+            if self.status == ExecutionStatus.Success:
+                # failures can be transient, so they are kept local and never served to other users
+                self.job.cache.publish(self._result_paths() + [Path(f'{self._index_key}.metrics.json')])
+
+    def _stop(self, reason: str, status: ExecutionStatus = ExecutionStatus.Stopped) -> None:
+        self._logger.info(f'Task is {status.name.lower()}: {reason}')
+        self.status = status
+        for p in self.outputs.values():
+            if p.exists():
+                p.unlink()
+
+    def run(self, reset: bool) -> None:
+        with self._traced():
+            lease = self._lease()
+            try:
+                if self._lookup(reset):
+                    try:
+                        self._finish(self._execute())
+                    except TaskStopped as e:
+                        self._stop(e.reason)
+                    except TaskTimeout as e:
+                        self._stop(str(e), ExecutionStatus.Timeout)
+                    except TaskFailed as e:
+                        self._logger.error(str(e))
+                        self._finish(e.resource_usage, failed=True)
+                    except:
+                        self.status = ExecutionStatus.Failed
+                        raise
+                    finally:
+                        self.end_time = time.time()
+            finally:
+                self._release(lease)
+
+    async def run_async(self, reset: bool) -> None:
+        with self._traced():
+            lease = self._lease()
+            try:
+                if self._lookup(reset):
+                    try:
+                        self._finish(await self._execute_async())
+                    except TaskStopped as e:
+                        self._stop(e.reason)
+                    except TaskTimeout as e:
+                        self._stop(str(e), ExecutionStatus.Timeout)
+                    except TaskFailed as e:
+                        self._logger.error(str(e))
+                        self._finish(e.resource_usage, failed=True)
+                    except:
+                        self.status = ExecutionStatus.Failed
+                        raise
+                    finally:
+                        self.end_time = time.time()
+            finally:
+                self._release(lease)
 
     def reset_stdout(self) -> None:
         self.stdout.path.unlink()
@@ -329,6 +1059,11 @@ class Job:
     failed: Optional[Task]
     status: ExecutionStatus
     outputs: Dict[str, List[Path]]
+    stop_rule: Optional[StopRule]
+    limits: Limits
+    _deadline: Optional[float]
+    _progress: Optional[ProgressMonitor]
+    _tracer: Optional[Tracer]
 
     def __init__(self,
                  vw: _VwCore,
@@ -337,7 +1072,9 @@ class Job:
                  outputs: List[str],
                  input_mode: str,
                  handler: HandlerBase,
-                 logger: MultiLogger):
+                 logger: MultiLogger,
+                 stop_rule: Optional[StopRule] = None,
+                 limits: Optional[Limits] = None):
         self.core = vw
         self.cache = cache
         self.opts = opts
@@ -348,31 +1085,128 @@ class Job:
         self._handler = handler
         self.status = ExecutionStatus.NotStarted
         self.outputs = {o: [] for o in outputs}
+        self.stop_rule = stop_rule
+        self.limits = limits or Limits()
+        self._deadline = None
+        self._progress = None
+        self._tracer = None
+        self._started_at = None
         self._tasks = []
+        self._opts_items = opts.items_to_hash()
+
+    def _hash(self, opts: VwOpts, salt: Optional[Union[int, str]]) -> str:
+        '''
+        Hash of task opts (job opts with input and model) and salt, items of job opts are computed once per job.
+        '''
+        extra = {k: v for k, v in opts.items() if k not in self.opts or v is not self.opts[k]}
+        if any(k in self.opts for k in extra):
+            return VwOpts(dict(opts, **{'-#': salt})).hash()
+        return hash_items(self._opts_items + VwOpts(dict(extra, **{'-#': salt})).items_to_hash())
+
+    def dependencies(self, i: int) -> List[int]:
+        return []
 
-    def run(self, reset: bool) -> 'Job':
-        self._handler.on_job_start(self)
+    def _timed_out(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _task_timeout(self) -> Optional[float]:
+        if self._deadline is None:
+            return self.limits.task_timeout
+        if self._timed_out():
+            raise TaskTimeout(self.limits.job_timeout, f'Job timeout of {self.limits.job_timeout} seconds is exceeded')
+        remaining = self._deadline - time.monotonic()
+        return remaining if self.limits.task_timeout is None else min(remaining, self.limits.task_timeout)
+
+    def _start(self) -> None:
+        self._started_at = time.time()
+        with span('on_job_start', 'handler', self._tracer, job=self.name):
+            self._handler.on_job_start(self)
         self._logger.info('Starting job...')
         self.status = ExecutionStatus.Running
-        for i, t in enumerate(self._tasks):
-            self._logger.info(f'Starting task {i}...     File name: {t.input_file}')
+        if self.limits.job_timeout is not None:
+            self._deadline = time.monotonic() + self.limits.job_timeout
+
+    def _start_task(self, i: int) -> None:
+        self._logger.info(f'Starting task {i}...     File name: {self[i].input_file}')
+        self[i]._queued_at = time.time()
+        with span('on_task_start', 'handler', self._tracer, job=self.name, task=i):
             self._handler.on_task_start(self, i)
-            try:
-                t.run(reset)
-            finally:
-                self._handler.on_task_finish(self, i)
-                self._logger.info(f'Task {i} is finished: {t.status}')
-                for p in t.outputs:
-                    self.outputs[p].append(t.outputs[p])
-                if t.status == ExecutionStatus.Failed:
-                    self.failed = t
-                    break
+        if self._progress is not None:
+            self._progress.add(self, i)
+
+    def _finish_task(self, i: int) -> None:
+        t = self[i]
+        if self._progress is not None:
+            self._progress.remove(self, i)
+        with span('on_task_finish', 'handler', self._tracer, job=self.name, task=i):
+            self._handler.on_task_finish(self, i)
+        self._logger.info(f'Task {i} is finished: {t.status}')
+        for p in t.outputs:
+            self.outputs[p].append(t.outputs[p])
+        if t.status in (ExecutionStatus.Failed, ExecutionStatus.Stopped, ExecutionStatus.Timeout) and \
+                self.failed is None:
+            self.failed = t
+        elif t.status == ExecutionStatus.Success and self.stop_rule is not None:
+            self.stop_rule.record(self, i)
+
+    def _run_task(self, i: int, reset: bool) -> None:
+        try:
+            self[i].run(reset)
+        except Exception:
+            if self[i].status != ExecutionStatus.Failed:
+                raise
 
+    async def _run_task_async(self, i: int, reset: bool) -> None:
+        try:
+            await self[i].run_async(reset)
+        except Exception:
+            if self[i].status != ExecutionStatus.Failed:
+                raise
+
+    def _finish(self) -> 'Job':
         self.status = self.failed.status if self.failed is not None else ExecutionStatus.Success
         self._logger.info(f'Job is finished: {self.status}')
-        self._handler.on_job_finish(self)
+        with span('on_job_finish', 'handler', self._tracer, job=self.name):
+            self._handler.on_job_finish(self)
+        if self._tracer is not None and self._started_at is not None:
+            self._tracer.emit('job', 'job', self._started_at, time.time(), job=self.name, status=self.status.name)
         return self
 
+    def run(self, reset: bool) -> 'Job':
+        self._start()
+        for i, t in enumerate(self._tasks):
+            self._start_task(i)
+            try:
+                t.run(reset)
+            finally:
+                self._finish_task(i)
+                if self.failed is not None:
+                    break
+        return self._finish()
+
+    async def run_async(self, reset: bool, semaphore: asyncio.Semaphore) -> 'Job':
+        async def run_task(i: int) -> bool:
+            for d in self.dependencies(i):
+                if not await runs[d] or self[d].status != ExecutionStatus.Success:
+                    return False
+            async with semaphore:
+                if self.failed is not None:
+                    return False
+                self._start_task(i)
+                await self._run_task_async(i, reset)
+                return True
+
+        self._start()
+        runs = {i: asyncio.ensure_future(run_task(i)) for i in range(len(self))}
+        try:
+            for i in range(len(self)):
+                if await runs[i]:
+                    self._finish_task(i)
+        finally:
+            for r in runs.values():
+                r.cancel()
+        return self._finish()
+
     def __getitem__(self, i) -> Task:
         return self._tasks[i]
 
@@ -399,6 +1233,18 @@ class Job:
     def metrics(self) -> pd.DataFrame:
         return pd.DataFrame([t.metrics for t in self._tasks])
 
+    @property
+    def resource_usage(self) -> Dict[str, Any]:
+        '''
+        Resource usage of tasks: total cpu time, block I/O and context switches, maximum of peak memory.
+        '''
+        usages = [t.resource_usage for t in self._tasks if t.resource_usage]
+        result = {k: sum(u[k] for u in usages if k in u) for k in _USAGE_FIELDS if any(k in u for u in usages)}
+        max_rss = [u['max_rss'] for u in usages if u.get('max_rss')]
+        if max_rss:
+            result['max_rss'] = max(max_rss)
+        return result
+
     def predictions(self, key: str, problem) -> Generator[Dict, None, None]:
         if not problem:
             raise ValueError('Problem should be defined for job')
@@ -418,8 +1264,10 @@ class TestJob(Job):
                  input_mode: str,
                  no_run: bool,
                  handler: HandlerBase,
-                 logger: MultiLogger):
-        super().__init__(vw, cache, opts, outputs, input_mode, handler, logger)
+                 logger: MultiLogger,
+                 stop_rule: Optional[StopRule] = None,
+                 limits: Optional[Limits] = None):
+        super().__init__(vw, cache, opts, outputs, input_mode, handler, logger, stop_rule, limits)
         for i, f in enumerate(files):
             self._tasks.append(Task(self, self._logger, f, input_dir, None, cache.path, order_position=i, no_run=no_run))
 
@@ -435,14 +1283,68 @@ class TrainJob(Job):
                  input_mode: str,
                  no_run: bool,
                  handler: HandlerBase,
-                 logger: MultiLogger):
+                 logger: MultiLogger,
+                 stop_rule: Optional[StopRule] = None,
+                 limits: Optional[Limits] = None):
         if '-f' not in outputs:
             outputs.append('-f')
-        super().__init__(vw, cache, opts, outputs, input_mode, handler, logger)
+        super().__init__(vw, cache, opts, outputs, input_mode, handler, logger, stop_rule, limits)
         for i, f in enumerate(files):
             model = None if i == 0 else self._tasks[i - 1].outputs_relative['-f']
             self._tasks.append(Task(self, self._logger, f, input_dir, model, cache.path, order_position=i, no_run=no_run))
 
+    def dependencies(self, i: int) -> List[int]:
+        return [i - 1] if i > 0 else []
+
+
+def _run_batch(core: _VwCore, tasks: List[Tuple[Job, int]], reset: bool) -> None:
+    '''
+    Executes tasks with a single call of the core. Timeouts, retries and stop rules are not applied.
+    '''
+    to_run = []
+    leases = []
+    try:
+        for job, i in tasks:
+            if isinstance(job[i].input_file, Stream):
+                job._run_task(i, reset)
+                continue
+            leases.append((job[i], job[i]._lease()))
+            with bind(job._tracer, job=job.name, task=i):
+                job[i]._trace_queued()
+                try:
+                    if job[i]._lookup(reset):
+                        to_run.append(job[i])
+                except Exception as e:
+                    job[i]._logger.error(str(e))
+                    job[i].status = ExecutionStatus.Failed
+                    job[i].end_time = time.time()
+        for t in to_run:
+            t.attempts += 1
+            t._logger.debug(f'Executing: {t.args}')
+        tracer = next((job._tracer for job, _ in tasks), None)
+        with span('batch', 'vw', tracer, size=len(to_run)):
+            try:
+                results = core.run_batch([(t.args, t.stdout.path) for t in to_run]) if to_run else []
+            except Exception as e:
+                # e.g. worker process died, none of the tasks is finished
+                results = [e] * len(to_run)
+        for t, result in zip(to_run, results):
+            with bind(t.job._tracer, job=t.job.name, task=t._order_position):
+                if isinstance(result, TaskStopped):
+                    t._stop(result.reason)
+                elif isinstance(result, TaskFailed):
+                    t._logger.error(str(result))
+                    t._finish(result.resource_usage, failed=True)
+                elif isinstance(result, Exception):
+                    t._logger.error(str(result))
+                    t.status = ExecutionStatus.Failed
+                else:
+                    t._finish(result)
+            t.end_time = time.time()
+    finally:
+        for task, lease in leases:
+            task._release(lease)
+
 
 def _assert_path_is_supported(path: Union[str, Path]) -> Path:
     if ' -' in str(path):
@@ -450,6 +1352,14 @@ def _assert_path_is_supported(path: Union[str, Path]) -> Path:
     return Path(path)
 
 
+def _to_input(input: Union[str, Path, Stream, Iterable[str]]) -> Union[Path, Stream]:
+    if isinstance(input, Stream):
+        return input
+    if isinstance(input, (str, Path)):
+        return _assert_path_is_supported(input)
+    return Stream(input)
+
+
 class Vw:
     _cache: VwCache
     _vw: _VwCore
@@ -459,6 +1369,16 @@ class Vw:
     handler: HandlerBase
     reset: bool
     last_job: Optional[Job]
+    last_planning_time: Optional[float]
+    worker_max_tasks: Optional[int]
+    stop_rule: Optional[StopRule]
+    memory_budget: Optional[MemoryBudget]
+    limits: Limits
+    batch_size: int
+    cache_files: bool
+    _progress: Optional[ProgressMonitor]
+    tracer: Optional[Tracer]
+    _schedulers: Set[Scheduler]
 
     def __init__(self,
                  cache_path: Union[str, Path],
@@ -467,15 +1387,54 @@ class Vw:
                  no_run: bool = False,
                  reset: bool = False,
                  handler: Optional[HandlerBase] = ProgressBars(),
-                 logger: Optional[ILogger] = None):
-        self._cache = VwCache(_assert_path_is_supported(cache_path))
-        self._vw = _VwBin(path) if path is not None else _VwPy()
+                 logger: Optional[ILogger] = None,
+                 worker_max_tasks: Optional[int] = 1000,
+                 stop_rule: Optional[Union[StopRule, List[StopRule]]] = None,
+                 memory_budget: Optional[int] = None,
+                 task_timeout: Optional[float] = None,
+                 job_timeout: Optional[float] = None,
+                 retries: int = 0,
+                 retry_backoff: float = 1.0,
+                 queue: bool = False,
+                 queue_lease: float = 60,
+                 daemon: Union[bool, str, Path] = False,
+                 batch_size: int = 1,
+                 cache_files: bool = False,
+                 compression: Optional[str] = None,
+                 shared_cache: Optional[Union[str, Path]] = None,
+                 progress_interval: Optional[float] = 1.0,
+                 trace: Optional[Union[str, Path]] = None,
+                 eviction: bool = False):
+        self._cache = VwCache(_assert_path_is_supported(cache_path), compression, shared_cache, eviction)
+        if daemon:
+            from vw_executor.daemon import _VwDaemon, default_socket
+            self._vw = _VwDaemon(default_socket(self._cache.path) if daemon is True else Path(daemon))
+        elif queue:
+            self._vw = _VwQueue(self._cache.path.joinpath('queue'), queue_lease)
+        else:
+            self._vw = _VwBin(path) if path is not None else _VwPy(procs, worker_max_tasks)
         self.logger = logger or MultiLogger([])
-        self.pool = SeqPool() if procs == 1 else MultiThreadPool(procs)
+        self.pool = SeqPool() if procs == 1 else FuturesPool(procs)
+        self._cache.fingerprints.procs = procs
         self.no_run = no_run
         self.handler = handler or MultiHandler([])
         self.reset = reset
         self.last_job = None
+        self.last_planning_time = None
+        self.worker_max_tasks = worker_max_tasks
+        self.stop_rule = AnyOf(stop_rule) if isinstance(stop_rule, list) else stop_rule
+        self.memory_budget = MemoryBudget(memory_budget) if memory_budget is not None else None
+        if self.memory_budget is not None:
+            self.memory_budget.estimator.load(
+                (opts, usage.get('max_rss')) for opts, usage in self._cache.index.resource_usage())
+        self.limits = Limits(task_timeout, job_timeout, retries, retry_backoff)
+        self.batch_size = batch_size
+        self.cache_files = cache_files
+        self._cache_locks = {}
+        self._cache_locks_lock = Lock()
+        self._progress = ProgressMonitor(progress_interval) if progress_interval is not None else None
+        self.tracer = Tracer(trace) if trace is not None else None
+        self._schedulers = set()
 
     def _with(self,
               cache_path: Optional[Union[str, Path]] = None,
@@ -485,24 +1444,179 @@ class Vw:
               reset: Optional[bool] = None,
               handler: Optional[HandlerBase] = None,
               logger: Optional[ILogger] = None) -> 'Vw':
-        return Vw(cache_path or self._cache.path,
-                  path or self._vw.path,
-                  procs or self.pool.procs,
-                  no_run if no_run is not None else self.no_run,
-                  reset if reset is not None else self.reset,
-                  handler or self.handler,
-                  logger or self.logger)
-
-    def _run_impl(self,
-                  inputs: List[Path],
-                  opts: VwOptsLike,
-                  outputs: List[str],
-                  input_mode: str,
-                  input_dir: Union[Path, str],
-                  job_type: Type) -> Job:
+        result = Vw(cache_path or self._cache.path,
+                    path or self._vw.path,
+                    procs or self.pool.procs,
+                    no_run if no_run is not None else self.no_run,
+                    reset if reset is not None else self.reset,
+                    handler or self.handler,
+                    logger or self.logger,
+                    self.worker_max_tasks,
+                    self.stop_rule)
+        if cache_path is None:
+            result._cache = self._cache
+        else:
+            result._cache.compression = self._cache.compression
+            result._cache.shared = self._cache.shared
+            result._cache.eviction = self._cache.eviction
+        if path is None:
+            result._vw = self._vw
+        if procs is None:
+            result.pool = self.pool
+        result.memory_budget = self.memory_budget
+        result.limits = self.limits
+        result.batch_size = self.batch_size
+        result.cache_files = self.cache_files
+        result._cache_locks = self._cache_locks
+        result._cache_locks_lock = self._cache_locks_lock
+        result._progress = self._progress
+        result.tracer = self.tracer
+        return result
+
+    def cancel(self) -> None:
+        for scheduler in list(self._schedulers):
+            scheduler.cancel()
+        self.pool.cancel()
+        self._vw.kill()
+
+    def close(self) -> None:
+        self._vw.kill()
+        self.pool.close()
+        self._vw.close()
+        self._cache.flush()
+        if self._progress is not None:
+            self._progress.stop()
+        if self.tracer is not None:
+            self.tracer.close()
+
+    def runs(self, where: Optional[str] = None, params: Iterable[Any] = (), **equals: Any) -> pd.DataFrame:
+        return self._cache.index.query(where, params, **equals)
+
+    def pin(self, name: str, jobs: Union[Job, List[Job]]) -> None:
+        '''
+        Protects artifacts of jobs from eviction until unpin(name).
+        '''
+        jobs = jobs if isinstance(jobs, list) else [jobs]
+        self._cache.index.pin(name, [p for job in jobs for task in job._tasks for p in task._cache_paths()])
+
+    def unpin(self, name: str) -> None:
+        self._cache.index.unpin(name)
+
+    def __enter__(self) -> 'Vw':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _create_job(self,
+                    inputs: List[Path],
+                    opts: VwOptsLike,
+                    outputs: List[str],
+                    input_mode: str,
+                    input_dir: Union[Path, str],
+                    job_type: Type) -> Job:
         job = job_type(self._vw, self._cache, inputs, Path(input_dir), VwOpts(opts), outputs, input_mode, self.no_run,
-                       self.handler, self.logger)
-        return job.run(self.reset)
+                       self.handler, self.logger, self.stop_rule, self.limits)
+        job._progress = self._progress
+        job._tracer = self.tracer
+        return job
+
+    def _build_cache_files(self,
+                           inputs: List[Path],
+                           input_dir: Path,
+                           cache_cmds: List[str]) -> Dict[str, Optional[List[Path]]]:
+        with self._cache_locks_lock:
+            locks = [self._cache_locks.setdefault(c, Lock()) for c in sorted(set(cache_cmds))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            builder = self._with()
+            builder.handler = MultiHandler([])
+            builder.cache_files = False
+            jobs = builder._run_on_dict(inputs, sorted(set(cache_cmds)), ['--cache_file'], '-d', input_dir, TestJob)
+        finally:
+            for lock in locks:
+                lock.release()
+        result = {}
+        for job in jobs:
+            if job.status == ExecutionStatus.Success:
+                result[str(job.opts)] = job.outputs['--cache_file']
+            else:
+                self.logger.warning(f'Cache files for {job.opts} are not built, input files are used instead')
+                result[str(job.opts)] = None
+        return result
+
+    def _create_jobs(self,
+                     inputs: List[Union[Path, Stream]],
+                     points: List[VwOptsLike],
+                     outputs: List[str],
+                     input_mode: str,
+                     input_dir: Union[Path, str],
+                     job_type: Type) -> List[Job]:
+        start = time.perf_counter()
+        with span('planning', 'vw', self.tracer, points=len(points)), self._cache.planning():
+            result = self._plan_jobs(inputs, points, outputs, input_mode, input_dir, job_type)
+        self.last_planning_time = time.perf_counter() - start
+        self.logger.info(f'{len(result)} jobs are planned in {self.last_planning_time:.3f}s')
+        return result
+
+    def _plan_jobs(self,
+                   inputs: List[Union[Path, Stream]],
+                   points: List[VwOptsLike],
+                   outputs: List[str],
+                   input_mode: str,
+                   input_dir: Union[Path, str],
+                   job_type: Type) -> List[Job]:
+        if not isinstance(self._vw, _VwPy) and any(isinstance(i, Stream) for i in inputs):
+            raise ValueError('Streams are fed to in-process pyvw, they cannot be used with vw binary, queue or daemon')
+        self._cache.fingerprints.prefetch(Path(input_dir).joinpath(i) for i in inputs if not isinstance(i, Stream))
+        if not self.cache_files or input_mode != '-d' or any(isinstance(i, Stream) for i in inputs):
+            return [self._create_job(inputs, point, outputs, input_mode, input_dir, job_type) for point in points]
+        cache_cmds = [VwOpts(point).to_cache_cmd() for point in points]
+        cache_files = self._build_cache_files(inputs, Path(input_dir), cache_cmds)
+        result = []
+        for point, cmd in zip(points, cache_cmds):
+            files = cache_files[cmd]
+            if files is None:
+                result.append(self._create_job(inputs, point, outputs, input_mode, input_dir, job_type))
+            else:
+                result.append(self._create_job(files, point, outputs, '--cache_file', '', job_type))
+        return result
+
+    def _schedule(self, jobs: List[Job]) -> Generator[Job, None, None]:
+        scheduler = Scheduler(self.pool, self.memory_budget, self.batch_size,
+                              lambda tasks, reset: _run_batch(self._vw, tasks, reset),
+                              lambda tasks: self._vw.kill(job[i].stdout.path for job, i in tasks))
+        self._schedulers.add(scheduler)
+        try:
+            yield from scheduler.run(jobs, self.reset)
+        finally:
+            self._schedulers.discard(scheduler)
+
+    def _run_on_dict_iter(self,
+                          inputs: Union[str, Path, List[Union[Path, str]]],
+                          opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                          outputs: List[str],
+                          input_mode: str,
+                          input_dir: Union[str, Path],
+                          job_type: Type) -> Generator[Job, None, None]:
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+        inputs = [_to_input(i) for i in inputs]
+        input_dir = Path(input_dir)
+        if isinstance(opts, pd.DataFrame):
+            opts = opts.loc[:, ~opts.columns.str.startswith('!')].to_dict('records')
+        elif not isinstance(opts, list):
+            opts = [opts]
+        self.handler.on_start(inputs, opts)
+        jobs = self._create_jobs(inputs, opts, outputs, input_mode, input_dir, job_type)
+        result = []
+        try:
+            for job in self._schedule(jobs):
+                result.append(job)
+                yield job
+        finally:
+            self.handler.on_finish(result)
 
     def _run_on_dict(self,
                      inputs: Union[str, Path, List[Union[Path, str]]],
@@ -513,15 +1627,18 @@ class Vw:
                      job_type: Type) -> Union[Job, List[Job]]:
         if not isinstance(inputs, list):
             inputs = [inputs]
-        inputs = [_assert_path_is_supported(i) for i in inputs]
+        inputs = [_to_input(i) for i in inputs]
         input_dir = Path(input_dir)
         if isinstance(opts, list):
             self.handler.on_start(inputs, opts)
-            args = [(inputs, point, outputs, input_mode, input_dir, job_type) for point in opts]
-            result = self.pool.map(self._run_impl, args)
+            result = self._create_jobs(inputs, opts, outputs, input_mode, input_dir, job_type)
+            jobs = result
         else:
             self.handler.on_start(inputs, [opts])
-            result = self._run_impl(inputs, opts, outputs, input_mode, input_dir, job_type)
+            jobs = self._create_jobs(inputs, [opts], outputs, input_mode, input_dir, job_type)
+            result = jobs[0]
+        for _ in self._schedule(jobs):
+            ...
         self.handler.on_finish(result)
         return result
 
@@ -587,6 +1704,68 @@ class Vw:
             return self._interact(inputs, opts, outputs or [], input_mode, input_dir, TestJob)
         return self._run(inputs, opts, outputs or [], input_mode, input_dir, TestJob)
 
+    async def _run_async(self,
+                         inputs: Union[str, Path, List[Union[Path, str]]],
+                         opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                         outputs: List[str],
+                         input_mode: str,
+                         input_dir: Union[Path, str],
+                         job_type: Type,
+                         max_concurrency: Optional[int]) -> Union[Job, List[Job], pd.DataFrame]:
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+        inputs = [_to_input(i) for i in inputs]
+        if isinstance(opts, pd.DataFrame):
+            points = opts.loc[:, ~opts.columns.str.startswith('!')].to_dict('records')
+        elif isinstance(opts, list):
+            points = opts
+        else:
+            points = [opts]
+        semaphore = asyncio.Semaphore(max_concurrency or self.pool.procs)
+        self.handler.on_start(inputs, points)
+        jobs = await asyncio.get_running_loop().run_in_executor(
+            None, self._create_jobs, inputs, points, outputs, input_mode, input_dir, job_type)
+        await asyncio.gather(*[job.run_async(self.reset, semaphore) for job in jobs])
+        result = jobs if isinstance(opts, (list, pd.DataFrame)) else jobs[0]
+        self.handler.on_finish(result)
+        if isinstance(opts, pd.DataFrame):
+            return pd.DataFrame([t.to_dict() for t in result]).set_index(opts.index)
+        return result
+
+    async def train_async(self,
+                          inputs:  Union[str, Path, List[Union[Path, str]]],
+                          opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                          outputs: Optional[List[str]] = None,
+                          input_mode: str = '-d',
+                          input_dir: Union[Path, str] = '',
+                          max_concurrency: Optional[int] = None) -> Union[Job, List[Job], pd.DataFrame]:
+        return await self._run_async(inputs, opts, outputs or [], input_mode, input_dir, TrainJob, max_concurrency)
+
+    async def test_async(self,
+                         inputs:  Union[str, Path, List[Union[Path, str]]],
+                         opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                         outputs: Optional[List[str]] = None,
+                         input_mode: str = '-d',
+                         input_dir: Union[Path, str] = '',
+                         max_concurrency: Optional[int] = None) -> Union[Job, List[Job], pd.DataFrame]:
+        return await self._run_async(inputs, opts, outputs or [], input_mode, input_dir, TestJob, max_concurrency)
+
+    def train_iter(self,
+                   inputs:  Union[str, Path, List[Union[Path, str]]],
+                   opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                   outputs: Optional[List[str]] = None,
+                   input_mode: str = '-d',
+                   input_dir: Union[Path, str] = '') -> Generator[Job, None, None]:
+        return self._run_on_dict_iter(inputs, opts, outputs or [], input_mode, input_dir, TrainJob)
+
+    def test_iter(self,
+                  inputs:  Union[str, Path, List[Union[Path, str]]],
+                  opts: Union[pd.DataFrame, VwOptsLike, GridLike],
+                  outputs: Optional[List[str]] = None,
+                  input_mode: str = '-d',
+                  input_dir: Union[Path, str] = '') -> Generator[Job, None, None]:
+        return self._run_on_dict_iter(inputs, opts, outputs or [], input_mode, input_dir, TestJob)
+
     def _interact(self,
                   inputs: Union[str, Path, List[Union[Path, str]]],
                   opts: InteractiveGrid,
@@ -1,28 +1,202 @@
+import os
+import shutil
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from threading import Lock, local
 
+from vw_executor.compression import compress
+from vw_executor.fingerprints import Fingerprints
+from vw_executor.index import RunIndex
 from vw_executor.loggers import MultiLogger
 from vw_executor.vw_opts import VwOptsLike, VwOpts
 
-from typing import Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+
+def _place(source: Path, target: Path, link: bool) -> None:
+    '''
+    Atomically places a hard link (if possible) or a copy of source at target.
+    '''
+    temp = target.parent / f'{target.name}.{uuid.uuid4().hex}.pending'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if link:
+            try:
+                os.link(source, temp)
+            except OSError:
+                shutil.copyfile(source, temp)
+        else:
+            shutil.copyfile(source, temp)
+        os.replace(temp, target)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+
+class _Plan:
+    fingerprints: Dict[Path, str]
+    listings: Dict[str, Set[str]]
+    folders: Set[str]
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.listings = {}
+        self.folders = set()
+
+
+EVICTION_MARKER = 'eviction'
 
 
 class VwCache:
+    '''
+    Folder with vw artifacts. If shared is set, it is a second tier (e.g. team cache on network storage):
+    artifacts that are missing locally are taken from it, and newly computed artifacts are published to it.
+    '''
     path: Path
+    shared: Optional[Path]
+    fingerprints: Fingerprints
+    index: RunIndex
+    compression: Optional[str]
+    eviction: bool
 
-    def __init__(self, path: Union[str, Path]):
+    def __init__(self,
+                 path: Union[str, Path],
+                 compression: Optional[str] = None,
+                 shared: Optional[Union[str, Path]] = None,
+                 eviction: bool = False):
         self.path = Path(path)
+        self.eviction = eviction
         self.path.mkdir(parents=True, exist_ok=True)
+        if eviction:
+            # every process that opens the folder from now on leases artifacts of its tasks
+            self.path.joinpath(EVICTION_MARKER).touch()
+        self.shared = Path(shared) if shared is not None else None
+        self.fingerprints = Fingerprints(self.path.joinpath('fingerprints.json'))
+        self.index = RunIndex(self.path.joinpath('index.sqlite'))
+        if compression not in (None, 'gzip', 'xz'):
+            raise ValueError(f'Unsupported compression: {compression}')
+        self.compression = compression
+        self._background = None
+        self._pending: List[Future] = []
+        self._lock = Lock()
+        self._local = local()
+
+    @property
+    def evictable(self) -> bool:
+        '''
+        Artifacts can be evicted if the folder has ever been opened with eviction enabled.
+        Only then tasks lease artifacts they use.
+        '''
+        return self.eviction or self.path.joinpath(EVICTION_MARKER).exists()
+
+    def _submit(self, fn: Callable, *args) -> None:
+        with self._lock:
+            if self._background is None:
+                # single thread: artifacts are published only after they are compressed
+                self._background = ThreadPoolExecutor(1, thread_name_prefix='vw-cache')
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(self._background.submit(fn, *args))
+
+    def compress(self, paths: Iterable[Path]) -> None:
+        '''
+        Compresses completed text artifacts in a background thread if compression ('gzip' or 'xz') is enabled.
+        '''
+        if self.compression is None:
+            return
+        for p in paths:
+            self._submit(compress, p, self.compression)
+
+    def fetch(self, paths: Iterable[Path]) -> bool:
+        '''
+        Takes artifacts (paths relative to the cache) from the shared tier if all of them are there.
+        '''
+        if self.shared is None:
+            return False
+        paths = list(paths)
+        if not all(self.shared.joinpath(p).exists() for p in paths):
+            return False
+        try:
+            for p in paths:
+                if not self.path.joinpath(p).exists():
+                    _place(self.shared.joinpath(p), self.path.joinpath(p), link=True)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _publish(self, paths: List[Path]) -> None:
+        for p in paths:
+            source = self.path.joinpath(p)
+            if source.exists() and not self.shared.joinpath(p).exists():
+                _place(source, self.shared.joinpath(p), link=False)
+
+    def publish(self, paths: Iterable[Path]) -> None:
+        '''
+        Copies artifacts (paths relative to the cache) to the shared tier in a background thread.
+        '''
+        if self.shared is not None:
+            self._submit(self._publish, list(paths))
+
+    def flush(self) -> None:
+        '''
+        Waits for background compression and publishing.
+        '''
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for f in pending:
+            f.result()
+
+    @contextmanager
+    def planning(self) -> Iterator[None]:
+        '''
+        Within planning, every input file is fingerprinted once, and every cache folder is created and listed once.
+        '''
+        outer = getattr(self._local, 'plan', None)
+        self._local.plan = _Plan()
+        try:
+            yield
+        finally:
+            self._local.plan = outer
+
+    def fingerprint(self, path: Path) -> str:
+        plan = getattr(self._local, 'plan', None)
+        if plan is None:
+            return self.fingerprints.get(path)
+        if path not in plan.fingerprints:
+            plan.fingerprints[path] = self.fingerprints.get(path)
+        return plan.fingerprints[path]
+
+    def listing(self, context: str) -> Optional[Set[str]]:
+        '''
+        Names of files in the cache folder, listed once per planning. None outside of planning.
+        '''
+        plan = getattr(self._local, 'plan', None)
+        if plan is None:
+            return None
+        if context not in plan.listings:
+            try:
+                plan.listings[context] = set(os.listdir(self.path.joinpath(context)))
+            except FileNotFoundError:
+                plan.listings[context] = set()
+        return plan.listings[context]
 
     def _get_path(self, context: str, args_hash: str) -> Path:
-        folder = self.path.joinpath(context)
-        folder.mkdir(parents=True, exist_ok=True)
-        return Path(context).joinpath(args_hash)
+        plan = getattr(self._local, 'plan', None)
+        if plan is None or context not in plan.folders:
+            self.path.joinpath(context).mkdir(parents=True, exist_ok=True)
+            if plan is not None:
+                plan.folders.add(context)
+        return Path(context, args_hash)
+
+    def path_for(self, args_hash: str, output: Optional[str] = None) -> Path:
+        return self._get_path(f'cache{output}', args_hash)
 
     def get_path(self,
                  opts: VwOptsLike,
                  logger: MultiLogger,
                  output: Optional[str] = None,
-                 salt: Optional[int] = None) -> Path:
+                 salt: Optional[Union[int, str]] = None) -> Path:
         args_hash = VwOpts(dict(opts, **{'-#': salt})).hash()
         result = self._get_path(f'cache{output}', args_hash)
         logger.debug(f'Generating path for opts: {str(opts)}, output: {output}. Result: {result}')
@@ -1,11 +1,29 @@
 import hashlib
 import pandas as pd
+from pathlib import PurePath
 
 from typing import Dict, Union, Any, List, Iterable
 
 VwOptsLike = Union[str, Dict[str, Any]]
 
 
+def _is_null(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, (str, int, PurePath)):
+        return False
+    if isinstance(value, float):
+        return value != value
+    return pd.isnull(value)
+
+
+def hash_items(items: List[str]) -> str:
+    '''
+    Hash of option items does not depend on their order, so items of several option sets can be concatenated.
+    '''
+    return hashlib.md5(' '.join(sorted(items)).strip().encode('utf-8')).hexdigest()
+
+
 class VwOpts(dict):
     def __init__(self, opts: VwOptsLike):
         if isinstance(opts, str):
@@ -13,7 +31,7 @@ class VwOpts(dict):
         super().__init__(opts)
 
     def __str__(self) -> str:
-        not_none = {k: v for k, v in self.items() if v is not None and not pd.isnull(v)}
+        not_none = {k: v for k, v in self.items() if not _is_null(v)}
         return ' '.join(['{0} {1}'.format(str(key).strip(), str(value).strip()) if not key.startswith('#')
                         else str(value) for key, value in not_none.items()])
 
@@ -24,8 +42,10 @@ class VwOpts(dict):
         return int(self.hash(), 16)
 
     def hash(self) -> str:
-        items = [i.strip() for i in f' {str(self)}'.split(' -')]
-        return hashlib.md5(' '.join(sorted(items)).strip().encode('utf-8')).hexdigest()   
+        return hash_items(self.items_to_hash())
+
+    def items_to_hash(self) -> List[str]:
+        return [i.strip() for i in f' {str(self)}'.split(' -')]
 
     def to_cache_cmd(self) -> str:
         import argparse
@@ -0,0 +1,182 @@
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+from threading import Event, Thread
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+_STOPPED = {'status': 'stopped', 'reason': 'Cancelled'}
+
+
+def _write_atomic(path: Path, content: Dict[str, Any]) -> None:
+    temp = path.parent / f'.{path.name}.{uuid.uuid4().hex}'
+    with open(temp, 'w') as f:
+        json.dump(content, f)
+    os.replace(temp, path)
+
+
+class WorkQueue:
+    '''
+    Work queue on top of shared folder: pending/ contains task descriptors, claimed/ - descriptors of running tasks,
+    done/ - results, stopped/ - markers of claimed tasks that should be killed by their workers.
+    Tasks are claimed by atomic rename from pending/ to claimed/.
+    Claimed descriptors are touched by the running worker, and claims that were not touched for lease seconds
+    are moved back to pending/.
+    '''
+    path: Path
+    lease: float
+
+    def __init__(self, path: Path, lease: float = 60):
+        self.path = Path(path)
+        self.lease = lease
+        self.pending = self.path.joinpath('pending')
+        self.claimed = self.path.joinpath('claimed')
+        self.done = self.path.joinpath('done')
+        self.stopped = self.path.joinpath('stopped')
+        for folder in [self.pending, self.claimed, self.done, self.stopped]:
+            folder.mkdir(parents=True, exist_ok=True)
+
+    def put(self, descriptor: Dict[str, Any]) -> str:
+        task_id = f'{time.time_ns():020d}-{uuid.uuid4().hex}'
+        _write_atomic(self.pending.joinpath(f'{task_id}.json'), descriptor)
+        return task_id
+
+    def cancel(self, task_id: str) -> bool:
+        try:
+            self.pending.joinpath(f'{task_id}.json').unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stop(self, task_id: str) -> None:
+        '''
+        Withdraws pending task or asks the worker of claimed task to kill it, result of the task is stopped.
+        '''
+        if self.cancel(task_id):
+            self.complete(task_id, _STOPPED)
+        else:
+            self.stopped.joinpath(f'{task_id}.json').touch()
+
+    def is_stopped(self, task_id: str) -> bool:
+        return self.stopped.joinpath(f'{task_id}.json').exists()
+
+    def claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        for entry in sorted(p.name for p in self.pending.glob('*.json')):
+            pending = self.pending.joinpath(entry)
+            claimed = self.claimed.joinpath(entry)
+            try:
+                # touch before rename: claim with old modification time would be requeued as expired right away
+                os.utime(pending)
+                os.rename(pending, claimed)
+                with open(claimed) as f:
+                    return claimed.stem, json.load(f)
+            except (FileNotFoundError, FileExistsError):
+                continue
+        return None
+
+    def heartbeat(self, task_id: str) -> None:
+        try:
+            os.utime(self.claimed.joinpath(f'{task_id}.json'))
+        except FileNotFoundError:
+            ...
+
+    def complete(self, task_id: str, result: Dict[str, Any]) -> None:
+        _write_atomic(self.done.joinpath(f'{task_id}.json'), result)
+        try:
+            self.claimed.joinpath(f'{task_id}.json').unlink()
+        except FileNotFoundError:
+            ...
+
+    def result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        path = self.done.joinpath(f'{task_id}.json')
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        path.unlink()
+        try:
+            self.stopped.joinpath(f'{task_id}.json').unlink()
+        except FileNotFoundError:
+            ...
+        return result
+
+    def requeue_expired(self) -> int:
+        result = 0
+        expired = time.time() - self.lease
+        for claimed in self.claimed.glob('*.json'):
+            try:
+                if claimed.stat().st_mtime >= expired:
+                    continue
+                if self.is_stopped(claimed.stem):
+                    # worker of the stopped task is gone, it is not executed again
+                    self.complete(claimed.stem, _STOPPED)
+                    continue
+                os.rename(claimed, self.pending.joinpath(claimed.name))
+                result += 1
+            except (FileNotFoundError, FileExistsError):
+                ...
+        return result
+
+    def wait(self, task_id: str, poll_interval: float = 0.5) -> Dict[str, Any]:
+        while True:
+            result = self.result(task_id)
+            if result is not None:
+                return result
+            self.requeue_expired()
+            time.sleep(poll_interval)
+
+
+def serve(queue: WorkQueue,
+          run: Callable[[Dict[str, Any]], Dict[str, Any]],
+          poll_interval: float = 1,
+          max_idle: Optional[float] = None,
+          max_tasks: Optional[int] = None,
+          cancel: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    '''
+    Worker loop: claims tasks from the queue and completes them with result of run(descriptor).
+    If the task is stopped meanwhile, cancel(descriptor) is called to kill it.
+    Exits after max_idle seconds without tasks or after max_tasks tasks. Returns number of completed tasks.
+    '''
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    completed = 0
+    idle_since = time.monotonic()
+    while max_tasks is None or completed < max_tasks:
+        claimed = queue.claim()
+        if claimed is None:
+            queue.requeue_expired()
+            if max_idle is not None and time.monotonic() - idle_since >= max_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+        task_id, descriptor = claimed
+        stop = Event()
+        heartbeat = Thread(target=_heartbeat,
+                           args=(queue, task_id, stop, min(queue.lease / 3, poll_interval),
+                                 None if cancel is None else lambda: cancel(descriptor)),
+                           daemon=True)
+        heartbeat.start()
+        try:
+            result = run(descriptor)
+        except Exception as e:
+            result = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+        finally:
+            stop.set()
+            heartbeat.join()
+        queue.complete(task_id, dict(result, worker=name))
+        completed += 1
+        idle_since = time.monotonic()
+    return completed
+
+
+def _heartbeat(queue: WorkQueue, task_id: str, stop: Event, interval: float,
+               cancel: Optional[Callable[[], None]]) -> None:
+    while not stop.wait(interval):
+        queue.heartbeat(task_id)
+        if cancel is not None and queue.is_stopped(task_id):
+            cancel()
+            cancel = None